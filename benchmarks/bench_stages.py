@@ -0,0 +1,591 @@
+"""
+Offline stage benchmarks on synthetic media.
+
+Measures latency and throughput of keyframe extraction, audio extraction,
+Whisper transcription, frame analysis and OCR across a parameter matrix, plus
+keyframe precision/recall against the synthetic videos' known cuts and the
+text gate's precision/recall against synthetic text frames. The `backends`
+stage compares the eager / int8 / ONNX inference backends on a fixed frame set,
+and `memory` measures worker-pool RSS / PSS vs worker count, with and without
+shared weights.
+
+    python -m benchmarks.bench_stages                        # everything, full matrix
+    python -m benchmarks.bench_stages --quick --stages extract,audio
+    python -m benchmarks.compare benchmarks/results/A.json benchmarks/results/B.json
+
+Results are written as JSON to benchmarks/results/<timestamp>_<git sha>.json
+so two commits can be compared with benchmarks/compare.py.
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import itertools
+import statistics
+import subprocess
+from contextlib import redirect_stdout
+
+from benchmarks.synthetic import PRESETS, generate_preset, keyframe_accuracy
+
+MEDIA_DIR = "benchmarks/media"
+RESULTS_DIR = "benchmarks/results"
+SCHEMA_VERSION = 1
+
+# Parameter matrix per stage. Every combination is run on every video.
+MATRIX = {
+    "extract": {
+        "hist_threshold": [0.20, 0.28, 0.40],
+        "ssim_threshold": [0.85, 0.89, 0.93],
+        "min_frame_interval": [4, 8, 15],
+    },
+    "extract_budget": {
+        "hist_threshold": [0.28],
+        "ssim_threshold": [0.89],
+        "min_frame_interval": [8],
+        "max_keyframes": [5, 10, 20],
+        "frame_store": ["raw", "jpeg", None],
+    },
+    "audio": {},
+    "transcribe": {
+        "model_name": ["tiny", "base"],
+    },
+    "analyze": {
+        "caption_num_beams": [1, 3, 4],
+        "caption_max_tokens": [20, 45],
+        "num_workers": [1, 2, 4],
+        "pipeline": [False, True],
+    },
+    "text_gate": {
+        "text_fraction": [0.1, 0.3, 0.6],
+    },
+    "ocr": {
+        "ocr_mode": ["full", "regions"],
+        "text_fraction": [0.1, 0.3, 0.6],
+    },
+    "backends": {
+        "backend": ["eager", "int8", "onnx"],
+    },
+    "memory": {
+        "workers": [1, 2, 4],
+        "share_weights": [False, True],
+    },
+}
+
+QUICK_MATRIX = {
+    "extract": {
+        "hist_threshold": [0.28],
+        "ssim_threshold": [0.89],
+        "min_frame_interval": [4, 8],
+    },
+    "extract_budget": {
+        "hist_threshold": [0.28],
+        "ssim_threshold": [0.89],
+        "min_frame_interval": [8],
+        "max_keyframes": [10],
+    },
+    "audio": {},
+    "transcribe": {
+        "model_name": ["tiny"],
+    },
+    "analyze": {
+        "caption_num_beams": [1, 3],
+        "caption_max_tokens": [45],
+        "num_workers": [1],
+        "pipeline": [False, True],
+    },
+    "text_gate": {
+        "text_fraction": [0.3],
+    },
+    "ocr": {
+        "ocr_mode": ["full", "regions"],
+        "text_fraction": [0.3],
+    },
+    "backends": {
+        "backend": ["eager", "int8", "onnx"],
+    },
+    "memory": {
+        "workers": [1, 2],
+        "share_weights": [False, True],
+    },
+}
+
+
+def _combinations(grid):
+    keys = list(grid)
+    for values in itertools.product(*(grid[k] for k in keys)):
+        yield dict(zip(keys, values))
+
+
+def _timed(func, *args, **kwargs):
+    """Run quietly; return (result, wall seconds, cpu seconds)."""
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    with redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    return result, time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+
+def _git_info():
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True).stdout.strip())
+        return {"sha": sha, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"sha": "unknown", "dirty": None}
+
+
+def _host_info():
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _record(stage, video, params, walls, cpus, work, unit, extra=None):
+    median = statistics.median(walls)
+    return {
+        "stage": stage,
+        "video": video,
+        "params": params,
+        "repeats": len(walls),
+        "latency_s": {"median": round(median, 4), "min": round(min(walls), 4),
+                      "all": [round(w, 4) for w in walls]},
+        "cpu_s": round(statistics.median(cpus), 4),
+        "throughput": {"value": round(work / median, 3) if median > 0 else None, "unit": unit},
+        "extra": extra or {},
+    }
+
+
+# ── Stages ────────────────────────────────────────────────────────────────
+
+def bench_extract(videos, grid, repeats, workdir, stage="extract"):
+    from processing.video_frame_extraction.mp4_specialization import extract_frames
+
+    records = []
+    for truth in videos:
+        name = os.path.splitext(os.path.basename(truth["path"]))[0]
+        for params in _combinations(grid):
+            walls, cpus, detected = [], [], []
+            for _ in range(repeats):
+                out = os.path.join(workdir, f"extract_{name}")
+                shutil.rmtree(out, ignore_errors=True)
+                detected, wall, cpu = _timed(extract_frames, truth["path"], out, **params)
+                walls.append(wall)
+                cpus.append(cpu)
+            accuracy = keyframe_accuracy(detected, truth["cuts"],
+                                         tolerance=max(3, params.get("min_frame_interval", 0)))
+            records.append(_record(stage, name, params, walls, cpus,
+                                   truth["frame_count"], "frames/s", accuracy))
+            print(f"  {stage} {name} {params} → {records[-1]['latency_s']['median']:.3f}s "
+                  f"P={accuracy['precision']:.2f} R={accuracy['recall']:.2f}")
+    return records
+
+
+def bench_audio(videos, grid, repeats, workdir):
+    from downloadRes.reel.audio import downloadAudio
+
+    records = []
+    for truth in videos:
+        if not truth["has_audio"]:
+            continue
+        name = os.path.splitext(os.path.basename(truth["path"]))[0]
+        for params in _combinations(grid):
+            walls, cpus = [], []
+            for _ in range(repeats):
+                _, wall, cpu = _timed(downloadAudio, truth["path"],
+                                      output_folder=os.path.join(workdir, f"audio_{name}"), **params)
+                walls.append(wall)
+                cpus.append(cpu)
+            records.append(_record("audio", name, params, walls, cpus,
+                                   truth["duration"], "audio s/s"))
+            print(f"  audio {name} → {records[-1]['latency_s']['median']:.3f}s")
+    return records
+
+
+def bench_transcribe(videos, grid, repeats, workdir):
+    from processing.audio_transcription.transcribe import transcribe_audio
+
+    records = []
+    for truth in videos:
+        name = os.path.splitext(os.path.basename(truth["path"]))[0]
+        audio_path = os.path.join(workdir, f"audio_{name}", "audio.mp3")
+        if not os.path.exists(audio_path):
+            continue  # needs the audio stage output
+        for params in _combinations(grid):
+            walls, cpus = [], []
+            for _ in range(repeats):
+                _, wall, cpu = _timed(transcribe_audio, file_path=audio_path, **params)
+                walls.append(wall)
+                cpus.append(cpu)
+            records.append(_record("transcribe", name, params, walls, cpus,
+                                   truth["duration"], "audio s/s"))
+            print(f"  transcribe {name} {params} → {records[-1]['latency_s']['median']:.3f}s")
+    return records
+
+
+def bench_analyze(videos, grid, repeats, workdir):
+    from processing.video_frame_extraction.mp4_specialization import extract_frames
+    from processing.video_frame_extraction.keyframe_store import frame_names
+    from processing.cpu_plan import cpu_budget, make_layout
+    from processing.video_transcription.frame_analyzer import analyze_frames_directory, load_models
+    from processing.video_transcription.parallel_analyzer import analyze_frames_parallel, warm_pool, shutdown_pools
+    from processing.video_transcription.pipeline import DEFAULT_WORKERS
+
+    with redirect_stdout(io.StringIO()):
+        models = load_models()
+    cores, cpus, _ = cpu_budget()
+
+    records = []
+    for truth in videos:
+        name = os.path.splitext(os.path.basename(truth["path"]))[0]
+        frames_dir = os.path.join(workdir, f"frames_{name}")
+        shutil.rmtree(frames_dir, ignore_errors=True)
+        with redirect_stdout(io.StringIO()):
+            extract_frames(truth["path"], frames_dir, hist_threshold=0.28,
+                           ssim_threshold=0.89, min_frame_interval=8)
+        num_frames = len(frame_names(frames_dir))
+        output_json = os.path.join(workdir, f"refined_{name}.json")
+
+        for params in _combinations(grid):
+            params = dict(params)
+            num_workers = params.pop("num_workers", 1)
+            pipelined = params.pop("pipeline", False)
+            params["pipeline"] = DEFAULT_WORKERS if pipelined else None
+            layout = None
+            if num_workers > 1:
+                # pinned workers splitting the cores evenly; model loading is not timed
+                threads = max(1, cores // num_workers)
+                layout = make_layout(cores, cpus[:cores], num_workers, threads, cores)
+                with redirect_stdout(io.StringIO()):
+                    warm_pool(layout)
+            walls, cpu_times = [], []
+            for _ in range(repeats):
+                if layout:
+                    _, wall, cpu = _timed(analyze_frames_parallel, frames_dir, output_json, layout,
+                                          frame_cache=False, **params)
+                else:
+                    _, wall, cpu = _timed(analyze_frames_directory, frames_dir, output_json,
+                                          models=models, frame_cache=False, **params)
+                walls.append(wall)
+                cpu_times.append(cpu)
+            if layout:
+                shutdown_pools()
+            params["num_workers"] = num_workers
+            params["pipeline"] = pipelined
+            records.append(_record("analyze", name, params, walls, cpu_times, num_frames, "frames/s",
+                                   {"frames": num_frames,
+                                    "per_frame_s": round(statistics.median(walls) / max(num_frames, 1), 4)}))
+            print(f"  analyze {name} {params} → {records[-1]['latency_s']['median']:.3f}s "
+                  f"({num_frames} frames)")
+    return records
+
+
+TEXT_FRAMES = 60
+
+
+def _text_frames(workdir, text_fraction):
+    from benchmarks.synthetic import generate_text_frames
+    return generate_text_frames(os.path.join(workdir, f"text_frames_{text_fraction}"),
+                                count=TEXT_FRAMES, text_fraction=text_fraction)
+
+
+def bench_text_gate(videos, grid, repeats, workdir):
+    """Cost of the text-presence gate and how often it is right (no OCR model needed)."""
+    import cv2
+    from processing.video_transcription.text_regions import find_text_regions
+
+    records = []
+    for params in _combinations(grid):
+        truth = _text_frames(workdir, params["text_fraction"])
+        images = [cv2.imread(item["path"]) for item in truth]
+        walls, cpus = [], []
+        for _ in range(repeats):
+            boxes, wall, cpu = _timed(lambda: [find_text_regions(img) for img in images])
+            walls.append(wall)
+            cpus.append(cpu)
+
+        flagged = [bool(b) for b in boxes]
+        has_text = [bool(item["text"]) for item in truth]
+        tp = sum(f and t for f, t in zip(flagged, has_text))
+        area = [sum(w * h for _, _, w, h in b) / (img.shape[0] * img.shape[1]) for b, img in zip(boxes, images)]
+        extra = {
+            "precision": round(tp / sum(flagged), 4) if any(flagged) else 0.0,
+            "recall": round(tp / sum(has_text), 4) if any(has_text) else 0.0,
+            "frames_skipped": len(flagged) - sum(flagged),
+            "ocr_area_fraction": round(sum(area) / len(area), 4),
+        }
+        records.append(_record("text_gate", "text_frames", params, walls, cpus, len(images), "frames/s", extra))
+        print(f"  text_gate {params} → {records[-1]['latency_s']['median'] * 1000 / len(images):.2f} ms/frame, "
+              f"P={extra['precision']:.2f} R={extra['recall']:.2f}, {extra['frames_skipped']} frames skipped")
+    return records
+
+
+def _word_recall(found, expected):
+    """Fraction of the drawn words that OCR returned (case-insensitive)."""
+    expected_words = " ".join(expected).lower().split()
+    if not expected_words:
+        return None
+    found_words = " ".join(found).lower().split()
+    return sum(word in found_words for word in expected_words) / len(expected_words)
+
+
+def bench_ocr(videos, grid, repeats, workdir):
+    """OCR stage alone: full-frame readtext vs gated, region-cropped OCR."""
+    import cv2
+    import easyocr
+    from processing.video_transcription.text_regions import read_text
+
+    with redirect_stdout(io.StringIO()):
+        reader = easyocr.Reader(["en"], gpu=False)
+
+    records = []
+    for params in _combinations(grid):
+        truth = _text_frames(workdir, params["text_fraction"])
+        images = [cv2.imread(item["path"]) for item in truth]
+        walls, cpus = [], []
+        for _ in range(repeats):
+            texts, wall, cpu = _timed(lambda: [read_text(reader, img, params["ocr_mode"]) for img in images])
+            walls.append(wall)
+            cpus.append(cpu)
+        recalls = [r for r in (_word_recall(t, item["text"]) for t, item in zip(texts, truth)) if r is not None]
+        extra = {"word_recall": round(sum(recalls) / len(recalls), 4) if recalls else None}
+        records.append(_record("ocr", "text_frames", params, walls, cpus, len(images), "frames/s", extra))
+        print(f"  ocr {params} → {records[-1]['latency_s']['median']:.3f}s for {len(images)} frames, "
+              f"word recall {extra['word_recall']}")
+    return records
+
+
+BACKEND_FRAMES = 20
+
+
+def _token_f1(a, b):
+    a, b = a.lower().split(), b.lower().split()
+    common = sum(min(a.count(w), b.count(w)) for w in set(a))
+    return 2 * common / (len(a) + len(b)) if a and b else float(a == b)
+
+
+def bench_backends(videos, grid, repeats, workdir):
+    """
+    Eager fp32 vs int8 vs ONNX Runtime on a fixed frame set: load/export time,
+    per-model latency, and agreement with the eager outputs (captions, object
+    classes) plus OCR word recall against the drawn text.
+    """
+    import cv2
+    import torch
+    from PIL import Image
+    from processing.video_transcription.frame_analyzer import load_models
+    from processing.video_transcription.text_regions import read_text
+
+    truth = _text_frames(workdir, 0.5)[:BACKEND_FRAMES]
+    images = [cv2.imread(item["path"]) for item in truth]
+    pils = [Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB)) for img in images]
+
+    def run_models(models):
+        yolo, processor, model, ocr = models
+        timings = {"yolo": [], "blip": [], "ocr": []}
+        outputs = []
+        for item, img, pil in zip(truth, images, pils):
+            start = time.perf_counter()
+            classes = {result.names[int(box.cls)] for result in yolo(item["path"], verbose=False)
+                       for box in result.boxes if float(box.conf) >= 0.5}
+            timings["yolo"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            with torch.no_grad():
+                ids = model.generate(**processor(images=pil, return_tensors="pt"),
+                                     max_new_tokens=45, num_beams=3, do_sample=False)
+            caption = processor.decode(ids[0], skip_special_tokens=True).strip()
+            timings["blip"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            texts = read_text(ocr, img, "regions")
+            timings["ocr"].append(time.perf_counter() - start)
+            outputs.append((classes, caption, texts))
+        return outputs, timings
+
+    backends = [params["backend"] for params in _combinations(grid)]
+    if "eager" in backends:
+        backends.remove("eager")
+    backends.insert(0, "eager")        # the reference for the agreement numbers
+
+    records = []
+    reference = None
+    for backend in backends:
+        models, load_s, _ = _timed(load_models, backend=backend)
+        walls, cpus = [], []
+        for _ in range(repeats):
+            (outputs, timings), wall, cpu = _timed(run_models, models)
+            walls.append(wall)
+            cpus.append(cpu)
+        if reference is None:
+            reference = outputs
+
+        recalls = [r for r in (_word_recall(texts, item["text"]) for (_, _, texts), item in zip(outputs, truth))
+                   if r is not None]
+        extra = {
+            "load_s": round(load_s, 2),
+            "ms_per_frame": {name: round(1000 * statistics.median(t), 1) for name, t in timings.items()},
+            "caption_agreement": round(statistics.mean(_token_f1(c, ref[1]) for (_, c, _), ref in zip(outputs, reference)), 4),
+            "object_agreement": round(statistics.mean(float(o == ref[0]) for (o, _, _), ref in zip(outputs, reference)), 4),
+            "word_recall": round(sum(recalls) / len(recalls), 4) if recalls else None,
+        }
+        records.append(_record("backends", "text_frames", {"backend": backend}, walls, cpus, len(images),
+                               "frames/s", extra))
+        del models
+
+    print(f"\n  {'backend':<8} {'load s':>7} {'yolo ms':>8} {'blip ms':>8} {'ocr ms':>7} "
+          f"{'frames/s':>9} {'captions':>9} {'objects':>8} {'ocr recall':>10}")
+    for record in records:
+        e = record["extra"]
+        ms = e["ms_per_frame"]
+        print(f"  {record['params']['backend']:<8} {e['load_s']:>7.1f} {ms['yolo']:>8.1f} {ms['blip']:>8.1f} "
+              f"{ms['ocr']:>7.1f} {record['throughput']['value']:>9.2f} {e['caption_agreement']:>9.2f} "
+              f"{e['object_agreement']:>8.2f} {e['word_recall'] if e['word_recall'] is not None else '-':>10}")
+    return records
+
+
+MEMORY_FRAMES = 8
+
+
+def bench_memory(videos, grid, repeats, workdir):
+    """
+    Resident memory of the frame-analysis worker pool vs worker count, with and
+    without shared weights. RSS counts shared pages in every worker; PSS splits
+    them between the workers mapping them, so total PSS is the real footprint.
+    """
+    from processing.cpu_plan import cpu_budget, make_layout
+    from processing.video_transcription.parallel_analyzer import analyze_frames_parallel, warm_pool, shutdown_pools
+    from processing.video_transcription.shared_weights import memory_usage
+
+    truth = _text_frames(workdir, 0.5)[:MEMORY_FRAMES]
+    frames_dir = os.path.dirname(truth[0]["path"])
+    frame_files = [os.path.basename(item["path"]) for item in truth]
+    cores, cpus, _ = cpu_budget()
+
+    records = []
+    for params in _combinations(grid):
+        workers = params["workers"]
+        layout = make_layout(cores, cpus[:cores], workers, max(1, cores // workers), cores)
+        with redirect_stdout(io.StringIO()):
+            pids = warm_pool(layout, share_weights=params["share_weights"])
+        walls, cpu_times = [], []
+        for _ in range(repeats):
+            _, wall, cpu = _timed(analyze_frames_parallel, frames_dir, None, layout, frame_files=frame_files,
+                                  share_weights=params["share_weights"], frame_cache=False)
+            walls.append(wall)
+            cpu_times.append(cpu)
+
+        usage = [memory_usage(pid) for pid in sorted(pids)]
+        extra = {
+            "workers_rss_mb": round(sum(u["rss"] for u in usage), 1),
+            "workers_pss_mb": round(sum(u["pss"] for u in usage), 1),
+            "workers_uss_mb": round(sum(u["uss"] for u in usage), 1),
+            "per_worker_rss_mb": [u["rss"] for u in usage],
+            "parent_rss_mb": memory_usage()["rss"],
+        }
+        shutdown_pools()
+        records.append(_record("memory", "text_frames", params, walls, cpu_times, len(frame_files),
+                               "frames/s", extra))
+        print(f"  memory {params} → RSS {extra['workers_rss_mb']:.0f} MB, PSS {extra['workers_pss_mb']:.0f} MB, "
+              f"USS {extra['workers_uss_mb']:.0f} MB over {len(usage)} worker(s)")
+    return records
+
+
+def bench_extract_budget(videos, grid, repeats, workdir):
+    """Keyframe budget mode: bounded keyframe counts, precision/recall of the kept cuts."""
+    return bench_extract(videos, grid, repeats, workdir, stage="extract_budget")
+
+
+STAGES = {
+    "extract": bench_extract,
+    "extract_budget": bench_extract_budget,
+    "audio": bench_audio,
+    "transcribe": bench_transcribe,
+    "analyze": bench_analyze,
+    "text_gate": bench_text_gate,
+    "ocr": bench_ocr,
+    "backends": bench_backends,
+    "memory": bench_memory,
+}
+
+
+def run(stages, presets, repeats=3, quick=False, output=None):
+    matrix = QUICK_MATRIX if quick else MATRIX
+    workdir = os.path.join(MEDIA_DIR, "work")
+    os.makedirs(workdir, exist_ok=True)
+
+    print("Generating synthetic media...")
+    videos = []
+    for preset in presets:
+        path = os.path.join(MEDIA_DIR, f"{preset}.mp4")
+        truth_path = path + ".truth.json"
+        if os.path.exists(path) and os.path.exists(truth_path):
+            with open(truth_path) as f:
+                videos.append(json.load(f))
+        else:
+            videos.append(generate_preset(preset, MEDIA_DIR))
+
+    results = []
+    errors = {}
+    for stage in stages:
+        print(f"\n[{stage}]")
+        try:
+            results.extend(STAGES[stage](videos, matrix[stage], repeats, workdir))
+        except ImportError as e:
+            # Stage dependencies (whisper, torch, ...) not installed here
+            errors[stage] = f"{type(e).__name__}: {e}"
+            print(f"  skipped: {errors[stage]}")
+
+    report = {
+        "schema": SCHEMA_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": _git_info(),
+        "host": _host_info(),
+        "repeats": repeats,
+        "quick": quick,
+        "results": results,
+        "errors": errors,
+    }
+
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d_%H%M%S')}_{report['git']['sha']}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic media.")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help=f"comma-separated subset of: {', '.join(STAGES)}")
+    parser.add_argument("--videos", default=",".join(PRESETS),
+                        help=f"comma-separated subset of: {', '.join(PRESETS)}")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="small parameter matrix")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<time>_<sha>.json)")
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    presets = [v.strip() for v in args.videos.split(",") if v.strip()]
+    for stage in stages:
+        if stage not in STAGES:
+            parser.error(f"unknown stage: {stage}")
+    for preset in presets:
+        if preset not in PRESETS:
+            parser.error(f"unknown video preset: {preset}")
+
+    run(stages, presets, repeats=args.repeats, quick=args.quick, output=args.output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Compare two benchmark result files (e.g. from two commits).
+
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/new.json
+    python -m benchmarks.compare base.json new.json --threshold 0.15 --fail-on-regression
+
+Cases are matched on (stage, video, params). A case regresses when its median
+latency grows by more than `threshold`, or when keyframe precision/recall drops.
+"""
+
+import sys
+import json
+import argparse
+
+
+def _key(record):
+    return (record["stage"], record["video"], json.dumps(record["params"], sort_keys=True))
+
+
+def compare(base, new, threshold=0.10):
+    """Return a list of row dicts for cases present in both reports."""
+    base_cases = {_key(r): r for r in base["results"]}
+    rows = []
+    for record in new["results"]:
+        old = base_cases.get(_key(record))
+        if old is None:
+            continue
+        before = old["latency_s"]["median"]
+        after = record["latency_s"]["median"]
+        change = (after - before) / before if before > 0 else 0.0
+
+        accuracy_drop = [
+            metric for metric in ("precision", "recall", "word_recall", "caption_agreement", "object_agreement")
+            if metric in old["extra"] and record["extra"].get(metric, 0) < old["extra"][metric]
+        ]
+        rows.append({
+            "stage": record["stage"],
+            "video": record["video"],
+            "params": record["params"],
+            "before_s": before,
+            "after_s": after,
+            "change": change,
+            "regression": change > threshold or bool(accuracy_drop),
+            "accuracy_drop": accuracy_drop,
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative latency increase that counts as a regression (default 0.10)")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="exit with status 1 if any case regressed")
+    args = parser.parse_args(argv)
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"base: {base['git']['sha']} ({base['created']})   new: {new['git']['sha']} ({new['created']})")
+    if base["host"] != new["host"]:
+        print("⚠️ Warning: results come from different hosts; timings may not be comparable.")
+
+    rows = compare(base, new, args.threshold)
+    print(f"\n{'stage':<11} {'video':<8} {'before s':>9} {'after s':>9} {'change':>8}  params")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        if row["accuracy_drop"]:
+            flag += f" ({'/'.join(row['accuracy_drop'])} dropped)"
+        params = ", ".join(f"{k}={v}" for k, v in row["params"].items())
+        print(f"{row['stage']:<11} {row['video']:<8} {row['before_s']:>9.3f} {row['after_s']:>9.3f} "
+              f"{row['change']:>+7.1%}  {params}{flag}")
+
+    regressions = sum(row["regression"] for row in rows)
+    print(f"\n{len(rows)} cases compared, {regressions} regressed.")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+CLI startup benchmark.
+
+For each command, runs a fresh interpreter with `-X importtime` that imports
+main.py plus that command's stage modules (without running any stage), and
+reports total import time, the slowest modules, and whether any heavy ML
+library got loaded. Also times `python main.py --help` end to end.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeats 10 --output benchmarks/results/startup.json
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+# Libraries that must only load when a stage actually runs
+HEAVY_MODULES = [
+    "torch", "whisper", "ultralytics", "transformers", "easyocr",
+    "google.generativeai", "instaloader", "moviepy", "skimage",
+]
+
+# What each command imports before it starts working
+COMMAND_IMPORTS = {
+    "startup": [],
+    "download": ["downloadRes.download", "downloadRes.reel.downloadReel"],
+    "refine": ["processing.registry"],
+    "summarize": ["summarization.backends", "summarization.gemini_summarizer"],
+}
+
+_LINE = re.compile(r"import time:\s+(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+
+def _probe_script(modules):
+    imports = "".join(f"import {m}\n" for m in ["main"] + modules)
+    return imports + (
+        "import sys, json\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+
+
+def measure_imports(modules):
+    """Return (total cumulative µs of top-level imports, slowest modules, heavy modules loaded)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _probe_script(modules)],
+        capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "probe failed")
+
+    total_us = 0
+    modules_us = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules_us.append((name, int(self_us), int(cumulative_us)))
+        if len(indent) <= 1:   # top-level import (not nested under another one)
+            total_us += int(cumulative_us)
+
+    slowest = sorted(modules_us, key=lambda m: m[2], reverse=True)[:10]
+    heavy = json.loads(proc.stdout.strip().splitlines()[-1])
+    return total_us, slowest, heavy
+
+
+def time_help(repeats):
+    walls = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "main.py", "--help"], capture_output=True, check=True)
+        walls.append(time.perf_counter() - start)
+    return walls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure CLI startup and per-command import cost.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    results = {"commands": {}, "help_wall_s": None}
+    failed = False
+
+    print(f"{'command':<10} {'import ms':>10}  heavy modules loaded")
+    for command, modules in COMMAND_IMPORTS.items():
+        try:
+            totals, heavy = [], []
+            for _ in range(args.repeats):
+                total_us, slowest, heavy = measure_imports(modules)
+                totals.append(total_us)
+        except RuntimeError as e:
+            print(f"{command:<10} {'-':>10}  error: {e}")
+            results["commands"][command] = {"error": str(e)}
+            continue
+
+        median_ms = statistics.median(totals) / 1000
+        results["commands"][command] = {
+            "import_ms": round(median_ms, 2),
+            "heavy_modules": heavy,
+            "slowest": [{"module": n, "self_ms": s / 1000, "cumulative_ms": c / 1000} for n, s, c in slowest],
+        }
+        failed = failed or bool(heavy)
+        print(f"{command:<10} {median_ms:>10.1f}  {', '.join(heavy) if heavy else 'none'}")
+
+    walls = time_help(args.repeats)
+    results["help_wall_s"] = round(statistics.median(walls), 4)
+    print(f"\n`python main.py --help`: {results['help_wall_s'] * 1000:.0f} ms (median of {args.repeats})")
+
+    startup = results["commands"].get("startup", {})
+    if startup.get("slowest"):
+        print("\nSlowest imports at startup:")
+        for m in startup["slowest"]:
+            print(f"  {m['cumulative_ms']:>8.1f} ms  {m['module']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+    if failed:
+        print("\n❌ A heavy library is imported before any stage runs.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""
+Synthetic test media with known ground truth.
+
+Each video is a sequence of scenes. A scene is a textured background with a few
+shapes and a small moving "talking head" blob (motion that should NOT trigger a
+keyframe). Scene starts are the ground-truth cuts. The audio track alternates
+tone bursts ("speech") and silence, and is muxed in with ffmpeg.
+
+Text frames (for OCR benchmarks) are single keyframe-like images, some with a
+burned-in caption band and/or a title, with the drawn text as ground truth.
+"""
+
+import os
+import json
+import wave
+import subprocess
+import numpy as np
+import cv2
+
+SAMPLE_RATE = 16000
+
+# name → (duration_s, num_scenes, fps, width, height)
+PRESETS = {
+    "short": (10, 5, 30, 640, 360),
+    "fastcut": (10, 20, 30, 640, 360),
+    "long": (60, 12, 30, 640, 360),
+}
+
+
+def _ffmpeg_exe():
+    """ffmpeg shipped with moviepy (imageio-ffmpeg), else the one on PATH."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+
+def _scene_background(rng, width, height):
+    base = rng.integers(0, 256, size=3)
+    background = np.empty((height, width, 3), dtype=np.uint8)
+    background[:] = base
+    # low-frequency texture so SSIM has structure to compare
+    noise = rng.integers(0, 40, size=(height // 20 + 1, width // 20 + 1, 3), dtype=np.uint8)
+    noise = cv2.resize(noise, (width, height), interpolation=cv2.INTER_LINEAR)
+    background = cv2.add(background, noise)
+
+    for _ in range(rng.integers(2, 6)):
+        color = tuple(int(c) for c in rng.integers(0, 256, size=3))
+        x1, y1 = int(rng.integers(0, width)), int(rng.integers(0, height))
+        x2, y2 = int(rng.integers(0, width)), int(rng.integers(0, height))
+        if rng.random() < 0.5:
+            cv2.rectangle(background, (x1, y1), (x2, y2), color, -1)
+        else:
+            cv2.circle(background, (x1, y1), int(rng.integers(20, 120)), color, -1)
+    return background
+
+
+def _write_tone_wav(path, duration, num_scenes, seed):
+    """Alternate 440–880 Hz tone bursts and silence, one pattern per scene."""
+    rng = np.random.default_rng(seed)
+    total = int(duration * SAMPLE_RATE)
+    audio = np.zeros(total, dtype=np.float32)
+    scene_len = total // num_scenes
+    t = np.arange(scene_len) / SAMPLE_RATE
+    for s in range(num_scenes):
+        freq = 440 + 440 * rng.random()
+        tone = 0.3 * np.sin(2 * np.pi * freq * t)
+        tone[int(scene_len * 0.6):] = 0.0           # trailing silence
+        audio[s * scene_len:(s + 1) * scene_len] = tone
+
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes((audio * 32767).astype(np.int16).tobytes())
+
+
+def generate_video(
+    path,
+    duration=10,
+    num_scenes=5,
+    fps=30,
+    width=640,
+    height=360,
+    with_audio=True,
+    seed=0
+):
+    """
+    Write a synthetic MP4 and return its ground truth:
+        {"path", "fps", "frame_count", "duration", "cuts": [frame indices], "has_audio"}
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    rng = np.random.default_rng(seed)
+    frame_count = int(duration * fps)
+    scene_len = frame_count // num_scenes
+    cuts = [s * scene_len for s in range(num_scenes)]
+
+    silent_path = path if not with_audio else path + ".silent.mp4"
+    writer = cv2.VideoWriter(silent_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open VideoWriter for {silent_path}")
+
+    background = None
+    for i in range(frame_count):
+        if i in cuts:
+            background = _scene_background(rng, width, height)
+        frame = background.copy()
+        # small wobbling blob: talking-head style micro-motion within a scene
+        cx = width // 2 + int(6 * np.sin(i / 3))
+        cy = height // 2 + int(4 * np.cos(i / 4))
+        cv2.ellipse(frame, (cx, cy), (40, 55), 0, 0, 360, (200, 170, 150), -1)
+        writer.write(frame)
+    writer.release()
+
+    has_audio = False
+    if with_audio:
+        wav_path = path + ".wav"
+        _write_tone_wav(wav_path, frame_count / fps, num_scenes, seed)
+        try:
+            subprocess.run(
+                [_ffmpeg_exe(), "-y", "-loglevel", "error", "-i", silent_path, "-i", wav_path,
+                 "-c:v", "copy", "-c:a", "aac", "-shortest", path],
+                check=True
+            )
+            has_audio = True
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"⚠️ Could not mux audio ({e}); video will be silent.")
+            os.replace(silent_path, path)
+        finally:
+            for tmp in (wav_path, silent_path):
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+    truth = {
+        "path": path,
+        "fps": fps,
+        "frame_count": frame_count,
+        "duration": frame_count / fps,
+        "cuts": cuts,
+        "has_audio": has_audio,
+    }
+    with open(path + ".truth.json", "w") as f:
+        json.dump(truth, f, indent=2)
+    return truth
+
+
+def generate_preset(name, out_dir, seed=0):
+    duration, num_scenes, fps, width, height = PRESETS[name]
+    return generate_video(
+        os.path.join(out_dir, f"{name}.mp4"),
+        duration=duration, num_scenes=num_scenes, fps=fps,
+        width=width, height=height, seed=seed
+    )
+
+
+WORDS = ["the", "best", "way", "to", "cook", "pasta", "daily", "vlog", "follow", "for", "more",
+         "today", "we", "try", "new", "recipe", "part", "wait", "end", "how", "make", "money"]
+
+
+def _draw_caption(frame, text, y, scale, rng):
+    font = cv2.FONT_HERSHEY_DUPLEX
+    (tw, th), _ = cv2.getTextSize(text, font, scale, 2)
+    x = max(4, (frame.shape[1] - tw) // 2)
+    if rng.random() < 0.5:
+        # caption band behind the text
+        cv2.rectangle(frame, (x - 8, y - th - 8), (x + tw + 8, y + 8), (0, 0, 0), -1)
+        cv2.putText(frame, text, (x, y), font, scale, (255, 255, 255), 2, cv2.LINE_AA)
+    else:
+        # outlined text straight on the scene
+        cv2.putText(frame, text, (x, y), font, scale, (0, 0, 0), 5, cv2.LINE_AA)
+        cv2.putText(frame, text, (x, y), font, scale, (255, 255, 255), 2, cv2.LINE_AA)
+
+
+def generate_text_frames(out_dir, count=40, text_fraction=0.3, width=640, height=360, seed=0):
+    """
+    Write `count` JPEG frames; about `text_fraction` of them carry text.
+    Returns ground truth [{"path", "text": [lines] (empty if textless)}].
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    truth = []
+    for i in range(count):
+        frame = _scene_background(rng, width, height)
+        cv2.ellipse(frame, (width // 2, height // 2), (40, 55), 0, 0, 360, (200, 170, 150), -1)
+        lines = []
+        if rng.random() < text_fraction:
+            if rng.random() < 0.4:
+                title = " ".join(rng.choice(WORDS, size=int(rng.integers(1, 4)))).upper()
+                _draw_caption(frame, title, int(height * 0.14), 0.9, rng)
+                lines.append(title)
+            caption = " ".join(rng.choice(WORDS, size=int(rng.integers(3, 7))))
+            _draw_caption(frame, caption, int(height * 0.88), 0.7, rng)
+            lines.append(caption)
+        path = os.path.join(out_dir, f"text_{i:04d}.jpg")
+        cv2.imwrite(path, frame)
+        truth.append({"path": path, "text": lines})
+    return truth
+
+
+def keyframe_accuracy(detected, cuts, tolerance=3):
+    """
+    Precision / recall of detected keyframe indices against ground-truth cuts.
+    A detection matches a cut if it lies within `tolerance` frames after it
+    (one-to-one, greedy in time order).
+    """
+    unmatched = sorted(cuts)
+    matched = 0
+    for d in sorted(detected):
+        for c in unmatched:
+            if 0 <= d - c <= tolerance:
+                unmatched.remove(c)
+                matched += 1
+                break
+    precision = matched / len(detected) if detected else 0.0
+    recall = matched / len(cuts) if cuts else 0.0
+    return {"precision": round(precision, 4), "recall": round(recall, 4),
+            "detected": len(detected), "cuts": len(cuts)}
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.synthetic  → writes the presets to benchmarks/media/
+    for preset in PRESETS:
+        info = generate_preset(preset, "benchmarks/media")
+        print(f"{preset}: {info['frame_count']} frames, {len(info['cuts'])} cuts, audio={info['has_audio']}")
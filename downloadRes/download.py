@@ -1,26 +1,23 @@
 import re
-import os
+
+CONTENT_TYPES = {"p": "Post", "reel": "Reel", "reels": "Reel"}
 
 def get_instagram_content_type(url):
-    # Extract the path part after instagram.com
-    match = re.search(r'instagram\.com/([^/]+)/([^/]+)/', url)
+    # The path segment before the shortcode: /p/<code>/ or /reel(s)/<code>/ (optionally after /<user>/)
+    match = re.search(r'instagram\.com/(?:[^/]+/)?(p|reels?)/[^/?]+', url)
     if not match:
         return "Unknown"
-    
-    # The second group is the content type (post or reel)
-    content_type = match.group(1)
-    return content_type.capitalize()  # Returns "Post" or "Reel"
+    return CONTENT_TYPES[match.group(1)]  # Returns "Post" or "Reel"
 
-def download(url):
+def download(url, ingestion_dir="ingestion"):
     content_type = get_instagram_content_type(url)
     print(f"----- Downloadeing {content_type} Ingestion -----")
     if content_type == "Post":
-        print("Logic not implemented for Post downloads yet.")
-        # from downloadRes.post.downloadPosts import extract_metadata
-        # extract_metadata(url)
+        from downloadRes.post.downloadPost import DownloadPost as download_post_ingestion
+        download_post_ingestion(url, ingestion_dir)
     elif content_type == "Reel":
         from downloadRes.reel.downloadReel import DownloadReel as download_reel_ingestion
-        download_reel_ingestion(url)
+        download_reel_ingestion(url, ingestion_dir)
     else:
         print("Unsupported content type or invalid URL.")
     print("---")
\ No newline at end of file
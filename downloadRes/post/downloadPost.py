@@ -0,0 +1,29 @@
+import os
+from downloadRes.post.metadata import extract_post_metadata
+from downloadRes.post.media import fetch_items
+from downloadRes.reel.audio import downloadAudio
+from tracing import span
+
+
+def DownloadPost(url, ingestion_dir="ingestion"):
+    """
+    Single-image, single-video and carousel posts. Every item is fetched
+    concurrently over one session:
+
+        ingestion/metadata.json               post metadata + the item list
+        ingestion/post/images/item_01.jpg     image items (analyzed as frames directly)
+        ingestion/post/item_02/video.mp4      video items (+ audio.mp3), refined like a reel
+    """
+    os.makedirs(ingestion_dir, exist_ok=True)
+    with span("metadata"):
+        items = extract_post_metadata(url, os.path.join(ingestion_dir, "metadata.json"))
+
+    def extract_audio(item, path):
+        if item["type"] == "video":
+            with span("audio_extract", item=item["index"]):
+                downloadAudio(path, os.path.dirname(path))
+
+    with span("media", items=len(items)):
+        fetch_items(items, ingestion_dir, on_fetched=extract_audio)
+    kinds = [item["type"] for item in items]
+    print(f"Post downloaded: {kinds.count('image')} image(s), {kinds.count('video')} video(s)")
@@ -0,0 +1,52 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = 4          # carousel items fetched at the same time (Instagram allows up to 20 per post)
+CHUNK_SIZE = 64 * 1024
+TIMEOUT_S = 30
+
+
+def media_session(max_workers=MAX_WORKERS):
+    """One requests.Session for every item: connections to the CDN are kept alive and reused."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def fetch(session, url, path):
+    """Stream url to path; a partial file never takes the final name."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    part = path + ".part"
+    with session.get(url, stream=True, timeout=TIMEOUT_S) as r:
+        r.raise_for_status()
+        with open(part, "wb") as f:
+            for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+    os.replace(part, path)
+    return path
+
+
+def fetch_items(items, ingestion_dir, on_fetched=None, max_workers=MAX_WORKERS):
+    """
+    Download every item ({"url", "file"}) into ingestion_dir concurrently.
+    `on_fetched(item, path)` runs on the download thread as soon as that item is
+    on disk (e.g. audio extraction of a video), overlapping with the other
+    downloads. Returns the paths in item order; the first failure is raised
+    after the other downloads have finished.
+    """
+    def run(session, item):
+        path = fetch(session, item["url"], os.path.join(ingestion_dir, item["file"]))
+        if on_fetched is not None:
+            on_fetched(item, path)
+        return path
+
+    with media_session(max_workers) as session, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(run, session, item) for item in items]
+    return [future.result() for future in futures]
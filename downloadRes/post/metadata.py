@@ -0,0 +1,53 @@
+import json
+
+from downloadRes.reel.metadata import extract_shortcode
+
+
+def post_item_path(index, is_video):
+    """Where item `index` (1-based) of a post lives, relative to the ingestion dir."""
+    if is_video:
+        return f"post/item_{index:02d}/video.mp4"
+    return f"post/images/item_{index:02d}.jpg"
+
+
+def extract_post_metadata(url, output_path="ingestion/metadata.json"):
+    """
+    Saves the post's metadata, including one entry per carousel item, and
+    returns the items: [{"index", "type": "image" | "video", "url", "file"}, ...].
+    """
+    import instaloader  # imported on use: keeps CLI startup light
+
+    L = instaloader.Instaloader()
+    shortcode = extract_shortcode(url)
+    post = instaloader.Post.from_shortcode(L.context, shortcode)
+
+    if post.typename == "GraphSidecar":
+        nodes = [(node.is_video, node.video_url if node.is_video else node.display_url)
+                 for node in post.get_sidecar_nodes()]
+    else:
+        nodes = [(post.is_video, post.video_url if post.is_video else post.url)]
+
+    items = [
+        {
+            "index": index,
+            "type": "video" if is_video else "image",
+            "url": media_url,
+            "file": post_item_path(index, is_video)
+        }
+        for index, (is_video, media_url) in enumerate(nodes, start=1)
+    ]
+
+    metadata = {
+        "type": "post",
+        "caption": post.caption,
+        "Creator": post.owner_username,
+        "likes": post.likes,
+        "date": str(post.date_utc),
+        "shortcode": shortcode,
+        "items": [{key: item[key] for key in ("index", "type", "file")} for item in items]
+    }
+
+    with open(output_path, "w") as f:
+        json.dump(metadata, f, indent=2)
+
+    return items
@@ -1,15 +1,20 @@
-from moviepy import VideoFileClip
 import os
 
-def downloadAudio(input_path):
+def downloadAudio(input_path, output_folder="ingestion"):
+    from moviepy import VideoFileClip  # imported on use: keeps CLI startup light
+
 # Define input and output paths
     input_file = input_path
-    output_folder = "ingestion"
     os.makedirs(output_folder, exist_ok=True)
 
     # Extract audio and save as MP3
     video_clip = VideoFileClip(input_file)
     audio_clip = video_clip.audio
+    if audio_clip is None:
+        # Silent clips (common in carousel posts) have nothing to transcribe
+        video_clip.close()
+        print(f"No audio track in {input_file}")
+        return None
     output_file = os.path.join(output_folder, "audio.mp3")
     audio_clip.write_audiofile(output_file, codec='mp3', bitrate='320k')
 
@@ -17,4 +22,5 @@ def downloadAudio(input_path):
     audio_clip.close()
     video_clip.close()
 
-    print(f"Audio successfully extracted to {output_file}")
\ No newline at end of file
+    print(f"Audio successfully extracted to {output_file}")
+    return output_file
\ No newline at end of file
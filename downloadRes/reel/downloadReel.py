@@ -1,10 +1,16 @@
-# import os
+import os
 from downloadRes.reel.metadata import extract_metadata
 from downloadRes.reel.video import downloadVideo
 from downloadRes.reel.audio import downloadAudio
+from tracing import span
 
 downloadedReelName = "ingestion/video.mp4"
-def DownloadReel(url):
-    extracted_video_url = extract_metadata(url)
-    downloadVideo(extracted_video_url, downloadedReelName)
-    downloadAudio(downloadedReelName)
\ No newline at end of file
+def DownloadReel(url, ingestion_dir="ingestion"):
+    os.makedirs(ingestion_dir, exist_ok=True)
+    video_path = os.path.join(ingestion_dir, os.path.basename(downloadedReelName))
+    with span("metadata"):
+        extracted_video_url = extract_metadata(url, os.path.join(ingestion_dir, "metadata.json"))
+    with span("video"):
+        downloadVideo(extracted_video_url, video_path)
+    with span("audio_extract"):
+        downloadAudio(video_path, ingestion_dir)
\ No newline at end of file
@@ -1,12 +1,14 @@
-import instaloader
 import json
 import re
 
-def extract_metadata(url):
-    def extract_shortcode(url):
-        pattern = r'instagram\.com/(?:[^/]+/)?(?:reel|p)/([^/?]+)'
-        match = re.search(pattern, url)
-        return match.group(1) if match else None
+def extract_shortcode(url):
+    pattern = r'instagram\.com/(?:[^/]+/)?(?:reels?|p)/([^/?]+)'
+    match = re.search(pattern, url)
+    return match.group(1) if match else None
+
+
+def extract_metadata(url, output_path="ingestion/metadata.json"):
+    import instaloader  # imported on use: keeps CLI startup light
 
     L = instaloader.Instaloader()
     shortcode = extract_shortcode(url)  # From URL
@@ -24,7 +26,7 @@ def extract_metadata(url):
         "video_url": post.video_url
     }
 
-    with open(f"ingestion/metadata.json", "w") as f:
+    with open(output_path, "w") as f:
         json.dump(metadata, f, indent=2)
 
     return post.video_url   
\ No newline at end of file
@@ -1,32 +1,255 @@
-from downloadRes.download import download
-from processing.registry import refinement_process
-from clean_cache import clear_existing_data
-from summarization.gemini_summarizer import ReelSummarizer
-import time
+"""
+SocialArchive command line.
+
+    python main.py                        # prompt for a URL and run everything
+    python main.py all <url>              # download → refine → summarize (as a resumable job)
+    python main.py resume                 # finish jobs interrupted by a crash or failure
+    python main.py download <url>         # only fetch video, audio and metadata
+    python main.py refine                 # transcribe + extract + analyze frames (skips unchanged stages)
+    python main.py refine --dry-run       # show which stages would recompute
+    python main.py refine --budget 60     # model tiers picked to fit 60 s (processing/budget.py)
+    python main.py summarize              # summarize existing artifacts
+    python main.py serve                  # long-running service with warm models
+
+Each command imports only what it needs: heavy ML libraries (whisper, torch,
+ultralytics, transformers, easyocr, google.generativeai) are loaded when a stage
+actually runs, never at startup.
+"""
 
 import os
-import certifi
+import sys
+import time
+import argparse
 
-os.environ['REQUESTS_CA_BUNDLE'] = certifi.where()
-os.environ['SSL_CERT_FILE'] = certifi.where()   
+from tracing import span, start_run, end_run, print_summary, load_trace
 
-if __name__ == "__main__":
-    start = time.perf_counter()
+TRANSCRIPTION_PATH = "./artifacts/transcription.txt"
+FRAMES_PATH = "./artifacts/refined_frames.jsonl"
+METADATA_PATH = "./ingestion/metadata.json"
+
+
+def _use_certifi():
+    import certifi
+
+    os.environ['REQUESTS_CA_BUNDLE'] = certifi.where()
+    os.environ['SSL_CERT_FILE'] = certifi.where()
+
+
+def cmd_download(args):
+    from downloadRes.download import download
+
+    _use_certifi()
+    with span("download"):
+        download(args.url)
+
+
+def _parse_overrides(assignments):
+    """['analyze_frames.caption_num_beams=4', ...] → {'analyze_frames': {'caption_num_beams': 4}}"""
+    import json
+
+    overrides = {}
+    for assignment in assignments or []:
+        name, _, value = assignment.partition("=")
+        stage, _, param = name.partition(".")
+        if not (stage and param and value):
+            raise SystemExit(f"--set expects stage.param=value, got '{assignment}'")
+        try:
+            value = json.loads(value)
+        except ValueError:
+            pass   # plain string
+        overrides.setdefault(stage, {})[param] = value
+    return overrides
+
+
+def cmd_refine(args):
+    from processing.registry import refinement_process
+
+    overrides = _parse_overrides(args.set)
+    budget = {"budget_s": args.budget, "budget_kind": args.budget_kind}
+    if args.dry_run:
+        refinement_process(overrides=overrides, force=args.force, dry_run=True, **budget)
+        return
+    with span("refine"):
+        refinement_process(overrides=overrides, force=args.force, **budget)
+
+
+def cmd_summarize(args):
+    from summarization.backends import get_summarizer
+
+    _use_certifi()
+    with span("summarize"):
+        summary = get_summarizer(args.backend).generate_summary(   # backend chosen by SUMMARIZER_BACKEND
+            TRANSCRIPTION_PATH,
+            FRAMES_PATH,
+            METADATA_PATH,
+            mode=args.mode   # long reels are summarized window by window (map-reduce)
+        )
+    if args.print:
+        print(summary)
+
+
+def _worker(args):
+    from functools import lru_cache
+    from service.job_queue import JobQueue
+    from service.worker import Worker
+    from summarization.backends import get_summarizer
+
+    # one summarizer for every job this worker runs
+    return Worker(JobQueue(args.queue_db), lru_cache(maxsize=None)(lambda: get_summarizer(args.backend)))
+
+
+def _finish_job(job, args):
+    """Print the outcome; a finished job's working directory is removed (in the background) unless kept."""
+    from retention import get_manager
+
+    if job["status"] == "done":
+        if job["result"]["summary"] and args.print:
+            print(job["result"]["summary"])
+        if not args.keep_artifacts:
+            get_manager().discard(job["workdir"])
+    else:
+        print(f"❌ Job {job['id']} is {job['status']} after '{job['stage']}': {job['error']}")
+        print(f"   Artifacts kept in {job['workdir']}; retry with: python -m service.job_queue retry {job['id']}")
+
+
+def cmd_all(args):
+    # Runs as a job in the durable queue: every finished stage is checkpointed in
+    # jobs/<id>/, so a crash or a failed stage doesn't throw away the earlier ones.
+    _use_certifi()
+    worker = _worker(args)
+    job = worker.queue.enqueue(args.url, options={"summarize": True, "mode": args.mode,
+                                                  "budget_s": args.budget, "budget_kind": args.budget_kind})
+    print(f"📋 Job {job['id']} (workdir {job['workdir']})")
+    job = worker.run_job(job["id"])
+    _finish_job(job, args)
 
-    # url = "https://www.instagram.com/reel/DUInVzxkqiq/?utm_source=ig_web_copy_link&igsh=NTc4MTIwNjQ2YQ=="
-    url = input("Enter the Instagram Post or Reel URL: ").strip()
 
-    clear_existing_data()
-    download(url)
-    refinement_process()
-    ReelSummarizer(model_name="gemini-2.5-flash").generate_summary(
-        "./artifacts/transcription.txt",
-        "./artifacts/refined_frames.json",
-        "./ingestion/metadata.json"
+def cmd_resume(args):
+    _use_certifi()
+    worker = _worker(args)
+    stale = worker.queue.recover()
+    if stale:
+        print(f"♻️ Resuming {len(stale)} interrupted job(s): {', '.join(stale)}")
+    for job_id in worker.run_until_empty():
+        _finish_job(worker.queue.get(job_id), args)
+
+
+def cmd_serve(args):
+    from service.daemon import serve
+
+    _use_certifi()
+    serve(host=args.host, port=args.port, socket_path=args.socket,
+          concurrency=args.concurrency, warm=not args.no_warm, summarizer_backend=args.backend,
+          db_path=args.queue_db)
+
+
+COMMANDS = {
+    "all": cmd_all,
+    "resume": cmd_resume,
+    "download": cmd_download,
+    "refine": cmd_refine,
+    "summarize": cmd_summarize,
+    "serve": cmd_serve,
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Download, refine and summarize Instagram Reels.",
+        epilog="With no command, prompts for a URL and runs 'all'."
     )
-    clear_existing_data()
+    sub = parser.add_subparsers(dest="command")
+
+    def add_summary_options(p):
+        p.add_argument("--backend", choices=["gemini", "ollama", "llava"],
+                       help="summarizer backend (default: SUMMARIZER_BACKEND or gemini)")
+        p.add_argument("--mode", choices=["single", "hierarchical", "auto"], default="auto",
+                       help="single prompt or map-reduce over time windows (default: auto)")
+        p.add_argument("--print", action="store_true", help="print the summary to stdout")
+
+    def add_budget_options(p):
+        p.add_argument("--budget", type=float, metavar="SECONDS",
+                       help="pick model tiers and keyframe count to fit this budget (processing/budget.py)")
+        p.add_argument("--budget-kind", choices=["wall", "cpu"], default="wall",
+                       help="the budget is wall-clock or CPU seconds (default: wall)")
+
+    def add_job_options(p):
+        p.add_argument("--keep-artifacts", action="store_true",
+                       help="keep the job's working directory (jobs/<id>/) after it finishes, "
+                            "within the retention quota (retention.py)")
+        p.add_argument("--queue-db", default="jobs/queue.db", help="job queue database")
+
+    p_all = sub.add_parser("all", help="download, refine and summarize a URL")
+    p_all.add_argument("url")
+    add_job_options(p_all)
+    add_summary_options(p_all)
+    add_budget_options(p_all)
+
+    p_resume = sub.add_parser("resume", help="resume interrupted or retrying jobs from their last finished stage")
+    add_job_options(p_resume)
+    p_resume.add_argument("--backend", choices=["gemini", "ollama", "llava"], help="summarizer backend")
+    p_resume.add_argument("--print", action="store_true", help="print the summaries to stdout")
+
+    p_download = sub.add_parser("download", help="download video, audio and metadata")
+    p_download.add_argument("url")
+
+    p_refine = sub.add_parser("refine", help="transcribe audio, extract and analyze keyframes")
+    p_refine.add_argument("--dry-run", action="store_true", help="only show which stages would recompute")
+    p_refine.add_argument("--set", action="append", metavar="STAGE.PARAM=VALUE",
+                          help="override a stage parameter, e.g. analyze_frames.caption_num_beams=4")
+    p_refine.add_argument("--force", action="append", default=[], metavar="STAGE",
+                          choices=["transcribe", "extract_frames", "analyze_frames"],
+                          help="re-run a stage even if its inputs are unchanged")
+    add_budget_options(p_refine)
+
+    p_summarize = sub.add_parser("summarize", help="summarize the existing artifacts")
+    add_summary_options(p_summarize)
+
+    p_serve = sub.add_parser("serve", help="run the job service with models kept loaded")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8765)
+    p_serve.add_argument("--socket", help="listen on this Unix socket instead of TCP")
+    p_serve.add_argument("--concurrency", type=int, default=2, help="max jobs in flight")
+    p_serve.add_argument("--no-warm", action="store_true", help="load models on first use instead of at startup")
+    p_serve.add_argument("--backend", choices=["gemini", "ollama", "llava"], help="summarizer backend")
+    p_serve.add_argument("--queue-db", default="jobs/queue.db", help="job queue database")
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        # url = "https://www.instagram.com/reel/DUInVzxkqiq/?utm_source=ig_web_copy_link&igsh=NTc4MTIwNjQ2YQ=="
+        url = input("Enter the Instagram Post or Reel URL: ").strip()
+        args = parser.parse_args(["all", url])
+
+    if args.command == "serve":
+        # Runs until interrupted; job spans go straight to the trace file
+        trace_path = start_run(keep_records=False)
+        COMMANDS["serve"](args)
+        end_run()
+        print_summary(load_trace(trace_path))
+        return 0
+
+    if args.command == "refine" and args.dry_run:
+        COMMANDS["refine"](args)   # nothing runs, nothing to trace
+        return 0
+
+    start = time.perf_counter()
+    start_run()   # spans go to artifacts/traces/run_<id>.jsonl
+
+    with span("pipeline", command=args.command):
+        COMMANDS[args.command](args)
 
-    for i in range(1000000):
-        pass
     end = time.perf_counter()
-    print(f"Total execution time: {end - start:.2f} seconds")
\ No newline at end of file
+    end_run()
+    print_summary()
+    print(f"Total execution time: {end - start:.2f} seconds")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,92 +1,54 @@
-import torch
-import av
-import numpy as np
-from transformers import AutoProcessor, LlavaOnevisionForConditionalGeneration
-
-# 1. Configuration
-# "ov" stands for OneVision (Video capable), this IS the correct PyTorch model.
-MODEL_ID = "llava-hf/llava-onevision-qwen2-0.5b-ov-hf" 
-DEVICE = "cpu"
+"""
+Describe a video with LLaVA-OneVision from its frames alone (no transcript or
+frame analysis). The full summarizer backend is summarization/llava_summarizer.py
+(SUMMARIZER_BACKEND=llava); this script reuses its cached model loader and
+frame sampler.
 
-print(f"Loading model: {MODEL_ID}...")
+    python -m misc.hf_img_txt
+"""
 
-# 2. Load Processor
-processor = AutoProcessor.from_pretrained(MODEL_ID)
+import numpy as np
 
-# 3. Load Model
-model = LlavaOnevisionForConditionalGeneration.from_pretrained(
-    MODEL_ID, 
-    torch_dtype=torch.float32, 
-    low_cpu_mem_usage=True,
-).to(DEVICE)
+from summarization.llava_summarizer import DEFAULT_MAX_NEW_TOKENS, DEFAULT_MODEL, get_llava, video_images
 
-# --- VERIFICATION CHECK ---
-# This checks if the model loaded correctly. 
-# If the language head is random, the output will be garbage.
-if hasattr(model, "language_model") and hasattr(model.language_model, "lm_head"):
-    head_weight = model.language_model.lm_head.weight
-    if torch.isnan(head_weight).any() or head_weight.sum() == 0:
-        print("WARNING: Model weights look corrupted/empty!")
-else:
-    print("Model loaded successfully (Architecture verified).")
-# ---------------------------
+DEVICE = "cpu"
 
-def read_video_pyav(container, indices):
-    frames = []
-    container.seek(0)
-    start_index = indices[0]
-    end_index = indices[-1]
-    for i, frame in enumerate(container.decode(video=0)):
-        if i > end_index:
-            break
-        if i >= start_index and i in indices:
-            frames.append(frame.to_image())
-    return frames
 
-def get_video_frames(video_path, num_frames=16):
-    container = av.open(video_path)
-    total_frames = container.streams.video[0].frames
-    indices = np.linspace(0, total_frames - 1, num_frames).astype(int)
-    frames = read_video_pyav(container, indices)
-    return frames
+def summarize(video_path, num_frames=16, max_new_tokens=DEFAULT_MAX_NEW_TOKENS):
+    import torch
 
-def summarize(video_path):
     print(f"Processing video: {video_path}")
-    video_frames = get_video_frames(video_path, num_frames=16)
-    
+    processor, model = get_llava(DEFAULT_MODEL, DEVICE)
+    video_frames = video_images(video_path, num_frames)
+    if not video_frames:
+        raise ValueError(f"Could not read frames from {video_path}")
+
     conversation = [
         {
             "role": "user",
             "content": [
-                {"type": "video", "media": video_frames},
+                {"type": "video"},
                 {"type": "text", "text": "Describe this video in detail in English."}
             ],
         },
     ]
 
     prompt = processor.apply_chat_template(conversation, add_generation_prompt=True)
-    inputs = processor(text=prompt, videos=video_frames, return_tensors="pt").to(DEVICE)
+    inputs = processor(text=prompt, videos=[np.stack(video_frames)], return_tensors="pt").to(DEVICE)
 
     print("Generating summary...")
-    
-    # We use greedy decoding (do_sample=False) for the most factual/stable output
-    generated_ids = model.generate(
-        **inputs, 
-        max_new_tokens=50000,
-        do_sample=False 
-    )
-    
-    summary = processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
-    
-    if "assistant\n" in summary:
-        return summary.split("assistant\n")[-1].strip()
-    return summary
+
+    # Greedy decoding (do_sample=False) for the most factual/stable output
+    with torch.no_grad():
+        generated_ids = model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False)
+    return processor.decode(generated_ids[0][inputs["input_ids"].shape[1]:], skip_special_tokens=True).strip()
+
 
 if __name__ == "__main__":
-    my_video = "./ingestion/video.mp4" 
+    my_video = "./ingestion/video.mp4"
     try:
         result = summarize(my_video)
         print("\n--- SUMMARY ---\n")
         print(result)
     except Exception as e:
-        print(f"Error: {e}")
\ No newline at end of file
+        print(f"Error: {e}")
@@ -1,28 +1,42 @@
-import whisper
 import os
 
-def transcribe_audio():
+def transcribe_audio(return_segments=False, file_path="ingestion/audio.mp3", model_name="base"):
+    # whisper (and torch) load on first use, then stay cached in this process
+    from processing.model_cache import get_whisper_model, model_lock
+
     # Verify file exists
-    file_path = "ingestion/audio.mp3"
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"{file_path} not found. Check the path.")
 
     # Load model
-    model = whisper.load_model("base")
+    model = get_whisper_model(model_name)
 
     # Transcribe with hallucination-reducing settings
-    result = model.transcribe(
-        file_path,
-        language="en",  # Set if known, otherwise remove for auto-detect
-        condition_on_previous_text=False,  # Reduces hallucinations
-        no_speech_threshold=0.6,
-        logprob_threshold=-1.0,
-        fp16=False
-    )
-    return result["text"]
+    with model_lock(f"whisper:{model_name}"):
+        result = model.transcribe(
+            file_path,
+            language="en",  # Set if known, otherwise remove for auto-detect
+            condition_on_previous_text=False,  # Reduces hallucinations
+            no_speech_threshold=0.6,
+            logprob_threshold=-1.0,
+            fp16=False
+        )
+    if not return_segments:
+        return result["text"]
+
+    # Timed segments let the summarizer line speech up with frame timestamps
+    segments = [
+        {
+            "start": round(float(seg["start"]), 2),
+            "end": round(float(seg["end"]), 2),
+            "text": seg["text"].strip()
+        }
+        for seg in result.get("segments", [])
+    ]
+    return result["text"], segments
 
 if __name__ == "__main__":
     try:
         print(transcribe_audio())
     except Exception as e:
-        print(f"Error: {e}")   
\ No newline at end of file
+        print(f"Error: {e}")   
@@ -0,0 +1,414 @@
+"""
+Latency budget planner: model tiers per reel instead of one size for all.
+
+Given a job's budget (wall seconds, or CPU seconds) and the video's duration
+and keyframe count, picks the Whisper model, the YOLO model, the BLIP model
+and beam count, and if needed a keyframe budget (max_keyframes), from a cost
+table measured on this host:
+
+    whisper:<model>          s per second of audio
+    extract                  s per second of video
+    yolo:<model>             s per keyframe
+    blip:<model>:<beams>     s per keyframe
+    ocr                      s per keyframe
+    keyframes_per_second     keyframes extract_frames keeps, to estimate the count
+
+The planner first keeps every keyframe, and among the tier combinations that
+fit it takes the best (most accurate models). Only when even the cheapest
+tiers don't fit does it cap the keyframes. Model loading isn't counted: the
+service keeps models warm.
+
+Every budgeted run records its predicted and actual cost per stage in
+cache/cost_history.jsonl. The ratio actual / predicted feeds a per-stage
+correction (a moving average), so the table keeps tracking what the stages
+really cost, including the savings of the frame cache and caption reuse.
+
+    python -m processing.budget show
+    python -m processing.budget calibrate --video ingestion/video.mp4 --frames artifacts/video_frames
+    python -m processing.budget plan ingestion/video.mp4 --budget 60
+
+Without calibration the table holds rough priors for a 4-core x86 machine.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+
+from tracing import span
+
+COST_TABLE_PATH = "cache/cost_table.json"
+HISTORY_PATH = "cache/cost_history.jsonl"
+PLAN_FILE = "budget_plan.json"          # in the job's artifacts dir
+BUDGET_STAGES = ("transcribe", "extract_frames", "analyze_frames")
+
+# Cheapest → most accurate
+WHISPER_TIERS = ["tiny", "base", "small"]
+YOLO_TIERS = ["yolov10n.pt", "yolov10s.pt"]
+CAPTION_TIERS = [
+    ("Salesforce/blip-image-captioning-base", 1),
+    ("Salesforce/blip-image-captioning-base", 3),
+    ("Salesforce/blip-image-captioning-large", 3),
+]
+MIN_KEYFRAMES = 3             # below this the summary has too little to go on
+CORRECTION_ALPHA = 0.3        # weight of the newest run in the per-stage correction
+
+PRIOR_COSTS = {
+    "whisper:tiny": 0.05, "whisper:base": 0.10, "whisper:small": 0.35,
+    "extract": 0.03,
+    "yolo:yolov10n.pt": 0.05, "yolo:yolov10s.pt": 0.12,
+    "blip:Salesforce/blip-image-captioning-base:1": 0.35,
+    "blip:Salesforce/blip-image-captioning-base:3": 0.80,
+    "blip:Salesforce/blip-image-captioning-large:3": 2.00,
+    "ocr": 0.30,
+}
+PRIOR_KEYFRAMES_PER_SECOND = 0.5
+
+
+# ── cost table ────────────────────────────────────────────────────────────
+
+def _load_all():
+    if not os.path.exists(COST_TABLE_PATH):
+        return {}
+    with open(COST_TABLE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save(table):
+    from processing.cpu_plan import host_key
+
+    saved = _load_all()
+    saved[host_key()] = table
+    os.makedirs(os.path.dirname(COST_TABLE_PATH), exist_ok=True)
+    tmp = COST_TABLE_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(saved, f, indent=2)
+    os.replace(tmp, COST_TABLE_PATH)
+
+
+def load_table():
+    """This host's cost table, the priors filling whatever hasn't been measured."""
+    from processing.cpu_plan import host_key
+
+    saved = _load_all().get(host_key(), {})
+    return {
+        "wall": {**PRIOR_COSTS, **saved.get("wall", {})},
+        "cpu": {**PRIOR_COSTS, **saved.get("cpu", {})},
+        "keyframes_per_second": saved.get("keyframes_per_second", PRIOR_KEYFRAMES_PER_SECOND),
+        "corrections": saved.get("corrections", {}),
+        "calibrated": saved.get("calibrated"),
+    }
+
+
+def _usage():
+    """
+    (wall s, CPU s of this process, its reaped children and the frame-analysis
+    pool workers). The pool's workers stay alive between stages, so their CPU
+    time comes from what each chunk reports, not from RUSAGE_CHILDREN.
+    """
+    import resource
+    from processing.video_transcription.parallel_analyzer import worker_cpu_s
+
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.perf_counter(), time.process_time() + children.ru_utime + children.ru_stime + worker_cpu_s()
+
+
+def _measure(costs, key, func, units):
+    """Run func() and store its per-unit wall and CPU cost under `key`."""
+    wall, cpu = _usage()
+    func()
+    wall_after, cpu_after = _usage()
+    costs["wall"][key] = round((wall_after - wall) / units, 4)
+    costs["cpu"][key] = round((cpu_after - cpu) / units, 4)
+    print(f"   {key:<48} {costs['wall'][key]:.3f} s/unit (CPU {costs['cpu'][key]:.3f})")
+
+
+def video_duration(video_path):
+    """Seconds of video from the container header (no decoding)."""
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    cap.release()
+    return frames / fps if frames > 0 else 0.0
+
+
+def calibrate(video_path=None, frames_dir=None, audio_path=None, sample=6, audio_seconds=30):
+    """
+    Measure every tier on this host and save the cost table. Each measurement
+    needs its input: Whisper the audio, extraction the video, the frame models
+    a few keyframes. Tiers that can't be measured keep their current cost.
+    """
+    from processing.cpu_plan import get_layout, host_key, set_torch_threads
+
+    table = _load_all().get(host_key(), {})
+    costs = {"wall": dict(table.get("wall", {})), "cpu": dict(table.get("cpu", {}))}
+    layout = get_layout()
+
+    if audio_path and os.path.exists(audio_path):
+        import whisper
+        from processing.model_cache import get_whisper_model
+
+        set_torch_threads(layout["whisper"]["threads"])
+        audio = whisper.load_audio(audio_path)[:audio_seconds * whisper.audio.SAMPLE_RATE]
+        seconds = len(audio) / whisper.audio.SAMPLE_RATE
+        print(f"⏱️ Whisper on {seconds:.0f}s of audio")
+        for name in WHISPER_TIERS:
+            model = get_whisper_model(name)
+            model.transcribe(audio[:whisper.audio.SAMPLE_RATE], language="en", fp16=False)    # warm-up
+            _measure(costs, f"whisper:{name}",
+                     lambda: model.transcribe(audio, language="en", condition_on_previous_text=False, fp16=False),
+                     seconds)
+
+    if video_path and os.path.exists(video_path) and video_duration(video_path) > 0:
+        import tempfile
+        from processing.video_frame_extraction.mp4_specialization import extract_frames
+        from processing.video_frame_extraction.keyframe_store import frame_names
+
+        duration = video_duration(video_path)
+        print(f"⏱️ Keyframe extraction on {duration:.0f}s of video")
+        with tempfile.TemporaryDirectory() as tmp:
+            _measure(costs, "extract", lambda: extract_frames(video_path, tmp), duration)
+            table["keyframes_per_second"] = round(len(frame_names(tmp)) / duration, 3)
+
+    if frames_dir and os.path.isdir(frames_dir):
+        from processing.model_cache import get_frame_models
+        from processing.video_transcription.frame_analyzer import caption_frame, detect_objects, frame_text
+        from processing.video_transcription.preprocess import FramePreprocessor
+        from processing.video_frame_extraction.keyframe_store import frame_names, open_store
+
+        store = open_store(frames_dir)
+        names = frame_names(frames_dir)[:sample]
+        set_torch_threads(layout["model_threads"]["blip"])
+        print(f"⏱️ Frame models on {len(names)} keyframes")
+        blip_models = list(dict.fromkeys(model for model, _ in CAPTION_TIERS))
+        # One load per YOLO / BLIP pairing, enough to measure every tier of both
+        for i in range(max(len(YOLO_TIERS), len(blip_models))):
+            yolo_name = YOLO_TIERS[min(i, len(YOLO_TIERS) - 1)]
+            blip_name = blip_models[min(i, len(blip_models) - 1)]
+            yolo, processor, model, ocr = get_frame_models(yolo_name, blip_name)
+            prep = FramePreprocessor(processor)
+            images = [prep.decode(os.path.join(frames_dir, name), store).copy() for name in names]
+            detect_objects(yolo, images[0], prep)       # warm-up
+            _measure(costs, f"yolo:{yolo_name}", lambda: [detect_objects(yolo, im, prep) for im in images],
+                     len(images))
+            for beams in sorted({b for m, b in CAPTION_TIERS if m == blip_name}):
+                _measure(costs, f"blip:{blip_name}:{beams}",
+                         lambda: [caption_frame(processor, model, im, prep, 45, beams) for im in images], len(images))
+            if i == 0:
+                _measure(costs, "ocr", lambda: [frame_text(ocr, im, prep) for im in images], len(images))
+
+    table.update(costs)
+    table["calibrated"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    _save(table)
+    print(f"✅ Cost table saved to {COST_TABLE_PATH}")
+    return load_table()
+
+
+# ── planning ──────────────────────────────────────────────────────────────
+
+def stage_costs(table, kind, whisper, yolo, blip, beams, duration_s, keyframes):
+    """Predicted seconds per stage for one tier choice, per-stage corrections applied."""
+    costs = table[kind]
+    raw = {
+        "transcribe": costs[f"whisper:{whisper}"] * duration_s,
+        "extract_frames": costs["extract"] * duration_s,
+        "analyze_frames": (costs[f"yolo:{yolo}"] + costs[f"blip:{blip}:{beams}"] + costs["ocr"]) * keyframes,
+    }
+    return {stage: seconds * table["corrections"].get(kind, {}).get(stage, 1.0) for stage, seconds in raw.items()}
+
+
+def plan(budget_s, duration_s, keyframes=None, kind="wall", table=None):
+    """
+    Cheapest-fitting-best tiers for a `budget_s` second job on a video of
+    `duration_s` seconds (`keyframes` is estimated from the duration if unknown).
+    Returns {"overrides": {stage: params}, "predicted": {stage: s, "total": s}, ...};
+    "over_budget" is set when not even MIN_KEYFRAMES fit with the cheapest tiers.
+    """
+    if kind not in ("wall", "cpu"):
+        raise ValueError(f"Unknown budget kind: {kind} (use wall or cpu)")
+    table = table or load_table()
+    estimated = keyframes is None
+    if estimated:
+        keyframes = max(MIN_KEYFRAMES, round(duration_s * table["keyframes_per_second"]))
+
+    best = None
+    for (w, whisper), (y, yolo), (c, (blip, beams)) in itertools.product(
+            enumerate(WHISPER_TIERS), enumerate(YOLO_TIERS), enumerate(CAPTION_TIERS)):
+        full = stage_costs(table, kind, whisper, yolo, blip, beams, duration_s, keyframes)
+        per_frame = full["analyze_frames"] / keyframes if keyframes else 0.0
+        spare = budget_s - full["transcribe"] - full["extract_frames"]
+        fits = int(spare // per_frame) if per_frame > 0 else keyframes    # keyframes the budget pays for
+        kept = min(keyframes, fits)
+        if kept < min(MIN_KEYFRAMES, keyframes):
+            continue
+        predicted = stage_costs(table, kind, whisper, yolo, blip, beams, duration_s, kept)
+        total = sum(predicted.values())
+        # More of the keyframes first, then better tiers, then lower cost
+        rank = (kept, w + y + c, -total)
+        if best is None or rank > best[0]:
+            best = (rank, whisper, yolo, blip, beams, kept, fits, predicted)
+
+    over_budget = best is None
+    if over_budget:
+        kept = fits = min(MIN_KEYFRAMES, keyframes)
+        whisper, yolo, (blip, beams) = WHISPER_TIERS[0], YOLO_TIERS[0], CAPTION_TIERS[0]
+        predicted = stage_costs(table, kind, whisper, yolo, blip, beams, duration_s, kept)
+    else:
+        _, whisper, yolo, blip, beams, kept, fits, predicted = best
+    # An estimated count may be low: cap at what the budget pays for, not at the estimate
+    max_keyframes = kept if kept < keyframes else (fits if estimated else None)
+
+    return {
+        "budget_s": budget_s,
+        "kind": kind,
+        "duration_s": round(duration_s, 2),
+        "keyframes": keyframes,
+        "keyframes_estimated": estimated,
+        "over_budget": over_budget,
+        "overrides": {
+            "transcribe": {"model_name": whisper},
+            "extract_frames": {"max_keyframes": max_keyframes},
+            "analyze_frames": {"yolo_model_name": yolo, "blip_model_name": blip, "caption_num_beams": beams},
+        },
+        "predicted": {**{stage: round(s, 2) for stage, s in predicted.items()}, "total": round(sum(predicted.values()), 2)},
+        "actual": {},
+    }
+
+
+def describe(job_plan):
+    o = job_plan["overrides"]
+    cap = o["extract_frames"]["max_keyframes"]
+    text = (f"whisper {o['transcribe']['model_name']}, {o['analyze_frames']['yolo_model_name']}, "
+            f"{o['analyze_frames']['blip_model_name'].rsplit('/', 1)[-1]} ×{o['analyze_frames']['caption_num_beams']} beams, "
+            f"{'≤' + str(cap) if cap else 'all'} keyframes → {job_plan['predicted']['total']:.1f}s "
+            f"{job_plan['kind']} of {job_plan['budget_s']:.0f}s")
+    return text + (" (over budget: cheapest tiers)" if job_plan["over_budget"] else "")
+
+
+def merge_overrides(job_plan, overrides=None):
+    """The plan's parameters with explicit `overrides` taking precedence."""
+    merged = {stage: dict(params) for stage, params in job_plan["overrides"].items()}
+    for stage, params in (overrides or {}).items():
+        merged.setdefault(stage, {}).update(params)
+    return merged
+
+
+# ── recording ─────────────────────────────────────────────────────────────
+
+def record(job_plan, keyframes=None):
+    """
+    Log a finished plan's predicted vs actual cost and move the per-stage
+    corrections (and keyframes per second) towards what was measured.
+    """
+    from processing.cpu_plan import host_key
+
+    kind = job_plan["kind"]
+    saved = _load_all()
+    table = saved.get(host_key(), {})
+    corrections = table.setdefault("corrections", {}).setdefault(kind, {})
+    for stage, actual in job_plan["actual"].items():
+        predicted = job_plan["predicted"].get(stage)
+        if predicted and actual[kind] > 0:
+            ratio = corrections.get(stage, 1.0) * actual[kind] / predicted
+            corrections[stage] = round((1 - CORRECTION_ALPHA) * corrections.get(stage, 1.0) + CORRECTION_ALPHA * ratio, 4)
+    cap = job_plan["overrides"]["extract_frames"]["max_keyframes"]
+    if keyframes and job_plan["duration_s"] and (cap is None or keyframes < cap):     # count not cut by the cap
+        rate = table.get("keyframes_per_second", PRIOR_KEYFRAMES_PER_SECOND)
+        table["keyframes_per_second"] = round((1 - CORRECTION_ALPHA) * rate
+                                              + CORRECTION_ALPHA * keyframes / job_plan["duration_s"], 4)
+    _save(table)
+
+    actual_total = sum(a[kind] for a in job_plan["actual"].values())
+    entry = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "host": host_key(), "kind": kind,
+             "budget_s": job_plan["budget_s"], "duration_s": job_plan["duration_s"], "keyframes": keyframes,
+             "overrides": job_plan["overrides"], "predicted": job_plan["predicted"],
+             "actual": {stage: a[kind] for stage, a in job_plan["actual"].items()}, "actual_total": round(actual_total, 2)}
+    os.makedirs(os.path.dirname(HISTORY_PATH), exist_ok=True)
+    with open(HISTORY_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+    print(f"📏 Budget: predicted {job_plan['predicted']['total']:.1f}s, actual {actual_total:.1f}s "
+          f"{kind} (budget {job_plan['budget_s']:.0f}s)")
+
+
+# ── running a job under a budget ──────────────────────────────────────────
+
+def job_plan(ingestion_dir, artifacts_dir, budget_s, kind="wall"):
+    """The job's plan: made once from the video and kept in the artifacts dir, so resumed stages use it too."""
+    path = os.path.join(artifacts_dir, PLAN_FILE)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved["budget_s"] == budget_s and saved["kind"] == kind:
+            return saved
+    made = plan(budget_s, video_duration(os.path.join(ingestion_dir, "video.mp4")), kind=kind)
+    print(f"💰 {describe(made)}")
+    _save_plan(made, path)
+    return made
+
+
+def _save_plan(job_plan, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(job_plan, f, indent=2)
+
+
+def run_budgeted_stage(name, ingestion_dir, artifacts_dir, budget_s, kind="wall", overrides=None, force=()):
+    """
+    run_stage with the budget plan's parameters. The stage's cost is measured
+    when it really runs (not when memoized); once the last stage has run, the
+    plan is recorded.
+    """
+    from processing.registry import REFINEMENT_GRAPH, run_stage
+
+    current = job_plan(ingestion_dir, artifacts_dir, budget_s, kind)
+    params = merge_overrides(current, overrides)
+    steps = REFINEMENT_GRAPH.plan(ingestion_dir, artifacts_dir, params, targets=[name], force=force)
+    runs = steps[-1]["run"]
+
+    wall, cpu = _usage()
+    with span("budget_stage", stage=name, predicted_s=current["predicted"].get(name)):
+        outputs = run_stage(name, ingestion_dir, artifacts_dir, overrides=params, force=force)
+    wall_after, cpu_after = _usage()
+    if runs:
+        current["actual"][name] = {"wall": round(wall_after - wall, 3), "cpu": round(cpu_after - cpu, 3)}
+        _save_plan(current, os.path.join(artifacts_dir, PLAN_FILE))
+
+    if name == BUDGET_STAGES[-1] and runs:        # a fully memoized re-run has nothing new to record
+        from processing.video_frame_extraction.keyframe_store import frame_names
+        frames_dir = os.path.join(artifacts_dir, "video_frames")
+        record(current, len(frame_names(frames_dir)) if os.path.isdir(frames_dir) else None)
+    return outputs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show, calibrate or try the latency budget planner.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("show", help="this host's cost table")
+    cal = sub.add_parser("calibrate", help="measure every model tier on this host")
+    cal.add_argument("--video", default="ingestion/video.mp4", help="video for the extraction cost")
+    cal.add_argument("--audio", default="ingestion/audio.mp3", help="audio for the Whisper costs")
+    cal.add_argument("--frames", default="artifacts/video_frames", help="keyframes for the frame model costs")
+    cal.add_argument("--sample", type=int, default=6, help="keyframes per model")
+    try_plan = sub.add_parser("plan", help="what a budget buys for a video")
+    try_plan.add_argument("video")
+    try_plan.add_argument("--budget", type=float, required=True, help="seconds")
+    try_plan.add_argument("--kind", choices=["wall", "cpu"], default="wall")
+    try_plan.add_argument("--keyframes", type=int, help="keyframe count, if already known")
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        print(json.dumps(load_table(), indent=2))
+    elif args.command == "calibrate":
+        calibrate(args.video, args.frames, args.audio, sample=args.sample)
+    else:
+        made = plan(args.budget, video_duration(args.video), args.keyframes, args.kind)
+        print(describe(made))
+        print(json.dumps({"overrides": made["overrides"], "predicted": made["predicted"]}, indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
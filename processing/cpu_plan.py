@@ -0,0 +1,272 @@
+"""
+CPU layout for the vision models and Whisper.
+
+Every PyTorch process starts an intra-op pool with one thread per visible core,
+so several model processes (or a process pool with a hard-coded worker count)
+oversubscribe the machine and thrash each other. This module works out the
+CPU budget (affinity mask and cgroup quota, so containers are sized right) and
+splits it into a layout:
+
+    whisper        threads for Whisper in the main process
+    frames         frame-analysis worker processes × threads per process;
+                   each worker is pinned to its own slice of cores
+    model_threads  intra-op threads YOLO / BLIP / OCR use inside a worker
+
+When the service runs several jobs at once, one job's transcription overlaps
+another's frame analysis, so Whisper gets its own share of the cores (the
+transcribe stage is pinned to them) and frame analysis moves to pinned worker
+processes on the remaining cores.
+
+    python -m processing.cpu_plan show
+    python -m processing.cpu_plan autotune --frames artifacts/video_frames
+
+`autotune` times a few layouts on real keyframes and saves the fastest one
+for this host in cache/cpu_layout.json; get_layout() prefers it over the
+default heuristic.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+from contextlib import contextmanager
+
+LAYOUT_PATH = "cache/cpu_layout.json"
+MAX_THREADS_PER_WORKER = 4   # BLIP beam search scales poorly past ~4 intra-op threads
+YOLO_MAX_THREADS = 2         # yolov10n is too small to use more
+
+_concurrent_jobs = 1
+
+
+def configure(concurrent_jobs=1):
+    """Tell the planner how many jobs run at once (the service's concurrency)."""
+    global _concurrent_jobs
+    _concurrent_jobs = max(1, int(concurrent_jobs))
+
+
+# ── CPU budget ────────────────────────────────────────────────────────────
+
+def cgroup_cpu_quota():
+    """CPU quota of this container in cores (cgroup v2 or v1), or None if unlimited."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return None if quota <= 0 else quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def cpu_budget():
+    """(usable core count, CPU ids this process may run on, cgroup quota or None)."""
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    quota = cgroup_cpu_quota()
+    cores = len(cpus)
+    if quota is not None:
+        cores = max(1, min(cores, int(quota)))   # round down: a partial core only causes throttling
+    return cores, cpus, quota
+
+
+def host_key(concurrent_jobs=1):
+    cores, _, quota = cpu_budget()
+    return f"{platform.node()}|{platform.processor() or platform.machine()}|{cores}|{quota}|jobs={concurrent_jobs}"
+
+
+# ── layouts ───────────────────────────────────────────────────────────────
+
+def make_layout(cores, cpus, frame_workers, threads, whisper_threads, source="default", concurrent_jobs=None):
+    """Layout dict; frame worker i is pinned to its own `threads` cores."""
+    frame_cpus = cpus[len(cpus) - frame_workers * threads:] if frame_workers * threads <= len(cpus) else cpus
+    return {
+        "cores": cores,
+        "whisper": {"threads": whisper_threads},
+        "frames": {
+            "processes": frame_workers,
+            "threads": threads,
+            "cpus": [frame_cpus[i * threads:(i + 1) * threads] for i in range(frame_workers)],
+        },
+        "model_threads": {"yolo": min(threads, YOLO_MAX_THREADS), "blip": threads, "ocr": threads},
+        "concurrent_jobs": _concurrent_jobs if concurrent_jobs is None else concurrent_jobs,
+        "source": source,
+    }
+
+
+def default_layout(concurrent_jobs=None):
+    """Heuristic layout: Whisper gets every core alone, or a quarter when jobs overlap."""
+    jobs = _concurrent_jobs if concurrent_jobs is None else concurrent_jobs
+    cores, cpus, _ = cpu_budget()
+    cpus = cpus[:cores]
+    if jobs > 1 and cores > 1:
+        whisper = max(1, cores // 4)
+        frame_cores = cores - whisper
+    else:
+        whisper = frame_cores = cores
+    workers = -(-frame_cores // MAX_THREADS_PER_WORKER)     # ceil: spread the cores evenly
+    return make_layout(cores, cpus, workers, frame_cores // workers, whisper, concurrent_jobs=jobs)
+
+
+def _load_saved():
+    if not os.path.exists(LAYOUT_PATH):
+        return {}
+    with open(LAYOUT_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_layout():
+    """The autotuned layout for this host if there is one, else the default."""
+    saved = _load_saved().get(host_key(_concurrent_jobs))
+    return saved or default_layout()
+
+
+def uses_pool(layout):
+    """Frame analysis runs in pinned worker processes (vs. in the main process)."""
+    return layout["frames"]["processes"] > 1 or layout["concurrent_jobs"] > 1
+
+
+def set_torch_threads(threads):
+    """Size this process's intra-op pool (imports torch if needed; no-op if threads is falsy or already that size)."""
+    torch = sys.modules.get("torch")
+    if torch is None:
+        import torch
+    if threads and torch.get_num_threads() != threads:
+        torch.set_num_threads(threads)
+
+
+def pin_process(cpus):
+    """Pin this process (and the threads it starts afterwards) to `cpus`, where supported."""
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+
+def whisper_cpus(layout):
+    """
+    The cores no frame worker is pinned to, for Whisper when jobs overlap; None
+    when Whisper runs alone and may use every core.
+    """
+    if layout["concurrent_jobs"] <= 1:
+        return None
+    taken = {cpu for cpus in layout["frames"]["cpus"] for cpu in cpus}
+    _, cpus, _ = cpu_budget()
+    free = [cpu for cpu in cpus[:layout["cores"]] if cpu not in taken]
+    return free[:layout["whisper"]["threads"]] or None
+
+
+@contextmanager
+def pinned(cpus):
+    """
+    Run the block pinned to `cpus` (no-op for None). On Linux this pins the
+    calling thread, so one job's stage doesn't move the others; the previous
+    affinity is restored afterwards.
+    """
+    if not cpus or not hasattr(os, "sched_setaffinity"):
+        yield
+        return
+    previous = os.sched_getaffinity(0)
+    pin_process(cpus)
+    try:
+        yield
+    finally:
+        os.sched_setaffinity(0, previous)
+
+
+def describe(layout):
+    frames = layout["frames"]
+    return (f"{layout['cores']} cores ({layout['source']}): whisper {layout['whisper']['threads']} threads, "
+            f"frame analysis {frames['processes']} × {frames['threads']} threads "
+            f"(yolo {layout['model_threads']['yolo']}, blip {layout['model_threads']['blip']}, "
+            f"ocr {layout['model_threads']['ocr']})")
+
+
+# ── autotune ──────────────────────────────────────────────────────────────
+
+def candidate_layouts(concurrent_jobs=None):
+    """A few worker × thread splits of the frame-analysis cores, default first."""
+    default = default_layout(concurrent_jobs)
+    cores, cpus, _ = cpu_budget()
+    cpus = cpus[:cores]
+    frame_cores = sum(len(c) for c in default["frames"]["cpus"])
+    layouts = [default]
+    for threads in (1, 2, 4, 8):
+        if threads > frame_cores:
+            break
+        layout = make_layout(cores, cpus, frame_cores // threads, threads, default["whisper"]["threads"],
+                             source="candidate", concurrent_jobs=default["concurrent_jobs"])
+        if (layout["frames"]["processes"], threads) != (default["frames"]["processes"], default["frames"]["threads"]):
+            layouts.append(layout)
+    return layouts
+
+
+def autotune(frames_dir, sample=12, analysis_params=None, concurrent_jobs=None):
+    """
+    Time frame analysis of `sample` keyframes under each candidate layout (model
+    loading excluded) and save the fastest for this host. Returns it.
+    """
+    from processing.registry import FRAME_ANALYSIS_PARAMS
+    from processing.video_transcription.parallel_analyzer import analyze_frames_parallel, shutdown_pools, warm_pool
+    from processing.video_frame_extraction.keyframe_store import frame_names
+
+    jobs = _concurrent_jobs if concurrent_jobs is None else concurrent_jobs
+    frame_files = frame_names(frames_dir)[:sample]
+    if not frame_files:
+        raise ValueError(f"No frames to tune on in {frames_dir}")
+    params = {**FRAME_ANALYSIS_PARAMS, **(analysis_params or {}), "frame_cache": False}
+
+    results = []
+    for layout in candidate_layouts(jobs):
+        print(f"⏱️ {describe(layout)}")
+        warm_pool(layout, yolo_model_name=params["yolo_model_name"], blip_model_name=params["blip_model_name"],
+                  backend=params["backend"])
+        start = time.perf_counter()
+        analyze_frames_parallel(frames_dir, None, layout, frame_files=frame_files, **params)
+        rate = len(frame_files) / (time.perf_counter() - start)
+        shutdown_pools()
+        print(f"   → {rate:.2f} frames/s")
+        results.append((rate, layout))
+
+    rate, best = max(results, key=lambda r: r[0])
+    best = {**best, "source": "autotune", "frames_per_s": round(rate, 3),
+            "tuned": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    saved = _load_saved()
+    saved[host_key(jobs)] = best
+    os.makedirs(os.path.dirname(LAYOUT_PATH), exist_ok=True)
+    with open(LAYOUT_PATH, "w", encoding="utf-8") as f:
+        json.dump(saved, f, indent=2)
+    print(f"✅ Best: {describe(best)} at {rate:.2f} frames/s, saved to {LAYOUT_PATH}")
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show or autotune the CPU layout for this host.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="CPU budget and the layout that will be used")
+    show.add_argument("--jobs", type=int, default=1, help="concurrent jobs (service concurrency)")
+    tune = sub.add_parser("autotune", help="time candidate layouts on real keyframes and save the best")
+    tune.add_argument("--frames", default="artifacts/video_frames", help="folder of keyframes to tune on")
+    tune.add_argument("--sample", type=int, default=12, help="number of keyframes per layout")
+    tune.add_argument("--jobs", type=int, default=1, help="concurrent jobs (service concurrency)")
+    args = parser.parse_args(argv)
+
+    configure(args.jobs)
+    if args.command == "show":
+        cores, cpus, quota = cpu_budget()
+        print(f"CPUs in affinity mask: {len(cpus)}, cgroup quota: {quota if quota is not None else 'none'}, "
+              f"usable cores: {cores}")
+        print(describe(get_layout()))
+    else:
+        autotune(args.frames, sample=args.sample)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
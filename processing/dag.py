@@ -0,0 +1,213 @@
+"""
+Stage DAG with input-hash memoization.
+
+Each stage declares the ingestion files it reads, the stages it depends on, its
+parameters and the artifacts it writes. Its cache key is a hash of:
+
+    stage version + parameters + content hash of each input file + keys of its upstream stages
+
+so a stage's key changes exactly when something that could change its output
+changes. Parameters that only change how a stage runs (worker counts, queue
+sizes) are declared as `ignored_params` and left out of the key. Keys and
+outputs are remembered in <artifacts_dir>/stage_cache.json; a stage whose key
+matches and whose outputs still exist is skipped. Changing a knob of one stage
+therefore re-runs only that stage and the stages downstream of it.
+"""
+
+import os
+import json
+import time
+import hashlib
+
+CACHE_FILE = "stage_cache.json"
+HASH_CHUNK = 1 << 20
+
+
+class Stage:
+    """
+    One node of the DAG.
+    `func(ingestion_dir, artifacts_dir, **params)` returns {artifact name: path}.
+    Bump `version` when the stage's code changes in a way that changes its output.
+    `ignored_params` are passed to func but not hashed: they don't change the output.
+    """
+
+    def __init__(self, name, func, inputs=(), deps=(), params=None, version=1, ignored_params=()):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)     # file names inside ingestion_dir
+        self.deps = tuple(deps)         # names of upstream stages
+        self.params = dict(params or {})
+        self.version = version
+        self.ignored_params = frozenset(ignored_params)
+
+    def key_params(self, params):
+        """The parameters that go into the cache key."""
+        return {name: value for name, value in params.items() if name not in self.ignored_params}
+
+
+def file_hash(path):
+    """sha256 of a file's content (None if it doesn't exist)."""
+    if not os.path.isfile(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _outputs_exist(outputs):
+    return bool(outputs) and all(os.path.exists(path) for path in outputs.values())
+
+
+class StageGraph:
+    def __init__(self, stages):
+        self.stages = {}
+        for stage in stages:
+            missing = [dep for dep in stage.deps if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on {missing}, which must be declared before it.")
+            self.stages[stage.name] = stage
+
+    # ── cache file ────────────────────
+    def load_cache(self, artifacts_dir):
+        path = os.path.join(artifacts_dir, CACHE_FILE)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_cache(self, artifacts_dir, cache):
+        os.makedirs(artifacts_dir, exist_ok=True)
+        path = os.path.join(artifacts_dir, CACHE_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp, path)
+
+    # ── planning ────────────────────
+    def _closure(self, targets):
+        """`targets` plus everything upstream of them, in declaration order."""
+        if targets is None:
+            return list(self.stages)
+        needed = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage: {name}")
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.stages[name].deps)
+        return [name for name in self.stages if name in needed]
+
+    def resolve_params(self, overrides=None):
+        """{stage: params} with `overrides` ({stage: {param: value}}) applied."""
+        overrides = overrides or {}
+        unknown = set(overrides) - set(self.stages)
+        if unknown:
+            raise KeyError(f"Unknown stage(s) in overrides: {', '.join(sorted(unknown))}")
+        resolved = {}
+        for name, stage in self.stages.items():
+            bad = set(overrides.get(name, {})) - set(stage.params)
+            if bad:
+                raise KeyError(f"Stage '{name}' has no parameter(s) {', '.join(sorted(bad))}")
+            resolved[name] = {**stage.params, **overrides.get(name, {})}
+        return resolved
+
+    def plan(self, ingestion_dir, artifacts_dir, overrides=None, targets=None, force=()):
+        """
+        Decide, without running anything, which stages would recompute.
+        Returns [{"stage", "key", "run", "reason", "fingerprint"}] in run order.
+        """
+        cache = self.load_cache(artifacts_dir)
+        params = self.resolve_params(overrides)
+        keys = {}
+        plan = []
+        input_hashes = {}
+
+        for name in self._closure(targets):
+            stage = self.stages[name]
+            inputs = {}
+            for file_name in stage.inputs:
+                path = os.path.join(ingestion_dir, file_name)
+                if path not in input_hashes:
+                    input_hashes[path] = file_hash(path)
+                inputs[file_name] = input_hashes[path]
+            key_params = stage.key_params(params[name])
+            fingerprint = {
+                "version": stage.version,
+                "params": key_params,
+                "inputs": inputs,
+                "deps": {dep: keys[dep] for dep in stage.deps},
+            }
+            key = hashlib.sha256(json.dumps(fingerprint, sort_keys=True, default=str).encode()).hexdigest()
+            keys[name] = key
+
+            entry = cache.get(name)
+            upstream_runs = [step["stage"] for step in plan if step["run"] and step["stage"] in stage.deps]
+            if name in force:
+                reason = "forced"
+            elif any(value is None for value in inputs.values()):
+                reason = "input missing: " + ", ".join(k for k, v in inputs.items() if v is None)
+            elif entry is None:
+                reason = "not cached"
+            elif entry["key"] == key and _outputs_exist(entry["outputs"]):
+                reason = None
+            elif entry["key"] == key:
+                reason = "outputs missing"
+            elif entry["fingerprint"]["version"] != stage.version:
+                reason = "stage code changed"
+            elif entry["fingerprint"]["params"] != key_params:
+                changed = sorted(k for k in set(key_params) | set(entry["fingerprint"]["params"])
+                                 if key_params.get(k) != entry["fingerprint"]["params"].get(k))
+                reason = "params changed: " + ", ".join(changed)
+            elif entry["fingerprint"]["inputs"] != inputs:
+                reason = "input changed: " + ", ".join(
+                    k for k in inputs if inputs[k] != entry["fingerprint"]["inputs"].get(k))
+            elif upstream_runs:
+                reason = "upstream re-runs: " + ", ".join(upstream_runs)
+            else:
+                reason = "upstream changed"
+
+            plan.append({"stage": name, "key": key, "run": reason is not None,
+                         "reason": reason or "cached", "fingerprint": fingerprint})
+        return plan
+
+    # ── execution ────────────────────
+    def run(self, ingestion_dir, artifacts_dir, overrides=None, targets=None, force=()):
+        """Run the stages whose key changed; returns the merged artifacts of every stage."""
+        params = self.resolve_params(overrides)
+        artifacts = {}
+        for step in self.plan(ingestion_dir, artifacts_dir, overrides, targets, force):
+            name = step["stage"]
+            cache = self.load_cache(artifacts_dir)
+            if not step["run"]:
+                print(f"⏭️ {name}: unchanged inputs and parameters, reusing cached outputs.")
+                artifacts.update(cache[name]["outputs"])
+                continue
+
+            print(f"▶️ {name}: {step['reason']}")
+            start = time.perf_counter()
+            outputs = self.stages[name].func(ingestion_dir, artifacts_dir, **params[name])
+            cache = self.load_cache(artifacts_dir)
+            cache[name] = {
+                "key": step["key"],
+                "fingerprint": step["fingerprint"],
+                "outputs": outputs,
+                "duration_s": round(time.perf_counter() - start, 3),
+                "completed": time.time(),
+            }
+            self.save_cache(artifacts_dir, cache)
+            artifacts.update(outputs)
+        return artifacts
+
+
+def print_plan(plan):
+    print(f"{'stage':<16} {'action':<9} reason")
+    for step in plan:
+        action = "run" if step["run"] else "skip"
+        print(f"{step['stage']:<16} {action:<9} {step['reason']}")
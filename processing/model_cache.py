@@ -0,0 +1,75 @@
+"""
+Process-wide cache of loaded models.
+
+Loading Whisper, YOLO, BLIP and EasyOCR costs tens of seconds on CPU, so every
+stage asks this module for its models instead of loading them itself. In a
+one-shot CLI run that changes nothing; in the long-running service
+(service/daemon.py) the models are loaded once at startup and stay resident.
+
+YOLO's predictor, EasyOCR and Whisper's decoder keep per-call state on the
+model object, so callers hold `model_lock(name)` while using a shared model.
+"""
+
+import threading
+
+_models = {}
+_locks = {}
+_guard = threading.Lock()
+
+
+def model_lock(name):
+    """Lock serializing use of one shared model ('whisper', 'frame_models', ...)."""
+    with _guard:
+        return _locks.setdefault(name, threading.RLock())
+
+
+def _get(key, loader):
+    with model_lock(("load",) + key):
+        if key not in _models:
+            _models[key] = loader()
+        return _models[key]
+
+
+def get_whisper_model(model_name="base"):
+    def load():
+        import whisper
+        print(f"Loading Whisper '{model_name}'...")
+        return whisper.load_model(model_name)
+    return _get(("whisper", model_name), load)
+
+
+def get_frame_models(
+    yolo_model_name="yolov10n.pt",
+    blip_model_name="Salesforce/blip-image-captioning-base",
+    ocr_languages=("en",),
+    backend="eager"
+):
+    """(yolo, blip_processor, blip_model, ocr_reader) as returned by load_models()."""
+    def load():
+        from processing.video_transcription.frame_analyzer import load_models
+        return load_models(yolo_model_name, blip_model_name, list(ocr_languages), backend=backend)
+    return _get(("frame_models", yolo_model_name, blip_model_name, tuple(ocr_languages), backend), load)
+
+
+def warm_up(whisper_model="base", backend="eager"):
+    """Load every model used by the refinement process."""
+    from processing.cpu_plan import get_layout, uses_pool
+
+    get_whisper_model(whisper_model)
+    layout = get_layout()
+    if uses_pool(layout):
+        # frame analysis runs in worker processes; load the models there
+        from processing.video_transcription.parallel_analyzer import warm_pool
+        warm_pool(layout, backend=backend)
+    else:
+        get_frame_models(backend=backend)
+
+
+def loaded_models():
+    return [":".join(str(part) for part in key) for key in _models]
+
+
+def clear():
+    """Drop all cached models (they are freed once no caller holds them)."""
+    with _guard:
+        _models.clear()
@@ -0,0 +1,155 @@
+"""
+Refinement of Instagram posts: single images, single videos and carousels.
+
+A post's ingestion dir holds metadata.json with the item list written by
+downloadRes/post/downloadPost.py. Image items go straight to the frame
+analyzer (there is nothing to extract). Each video item is a small reel
+(post/item_NN/video.mp4 + audio.mp3) and runs through the usual memoized
+REFINEMENT_GRAPH into artifacts/item_NN/. The per-item results are merged into
+the files a reel produces, so the summarizers cover the whole post at once:
+
+    artifacts/transcription.txt     transcripts of the video items, labeled by item
+    artifacts/refined_frames.jsonl  frames of every item in post order, tagged with "item"
+
+No transcription_segments.json is written: the items' timelines don't line up,
+so a post is summarized with a single prompt.
+"""
+
+import os
+import json
+
+from processing.dag import print_plan
+from tracing import span
+
+
+def load_post(ingestion_dir):
+    """The post metadata (with its "items"), or None if the ingestion dir holds a reel."""
+    path = os.path.join(ingestion_dir, "metadata.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        metadata = json.load(f)
+    return metadata if isinstance(metadata, dict) and metadata.get("type") == "post" else None
+
+
+def item_label(item):
+    return f"Item {item['index']} ({item['type']})"
+
+
+def item_dirs(item, ingestion_dir, artifacts_dir):
+    """(ingestion dir, artifacts dir) of a video item."""
+    return (os.path.dirname(os.path.join(ingestion_dir, item["file"])),
+            os.path.join(artifacts_dir, f"item_{item['index']:02d}"))
+
+
+def _videos(post):
+    return [item for item in post["items"] if item["type"] == "video"]
+
+
+# ── stages (same names and outputs as a reel's) ───────────────────────────
+
+def _transcribe(post, ingestion_dir, artifacts_dir, overrides, force):
+    from processing.registry import REFINEMENT_GRAPH
+
+    parts = []
+    for item in _videos(post):
+        item_ingestion, item_artifacts = item_dirs(item, ingestion_dir, artifacts_dir)
+        if not os.path.exists(os.path.join(item_ingestion, "audio.mp3")):
+            continue    # silent clip
+        with span("item", item=item["index"]):
+            outputs = REFINEMENT_GRAPH.run(item_ingestion, item_artifacts, overrides,
+                                           targets=["transcribe"], force=force)
+        with open(outputs["transcription"], encoding="utf-8") as f:
+            parts.append(f"[{item_label(item)}]\n{f.read().strip()}")
+
+    os.makedirs(artifacts_dir, exist_ok=True)
+    transcription_path = os.path.join(artifacts_dir, "transcription.txt")
+    with open(transcription_path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(parts) if parts else "No speech in this post.")
+    print(f"Post transcription saved to {transcription_path}")
+    return {"transcription": transcription_path}
+
+
+def _extract_frames(post, ingestion_dir, artifacts_dir, overrides, force):
+    from processing.registry import REFINEMENT_GRAPH
+
+    outputs = {}
+    for item in _videos(post):
+        item_ingestion, item_artifacts = item_dirs(item, ingestion_dir, artifacts_dir)
+        with span("item", item=item["index"]):
+            frames = REFINEMENT_GRAPH.run(item_ingestion, item_artifacts, overrides,
+                                          targets=["extract_frames"], force=force)
+        outputs[f"item_{item['index']:02d}_frames"] = frames["video_frames"]
+    return outputs
+
+
+def _analyze_frames(post, ingestion_dir, artifacts_dir, overrides, force):
+    from processing.registry import REFINEMENT_GRAPH, analyze_frames
+    from processing.video_transcription.frame_results import RESULTS_NAME, FrameResultWriter, read_results
+
+    images = {}
+    if len(_videos(post)) < len(post["items"]):
+        # Every image is a keyframe already: analyze the folder as it is
+        print(f"Analyzing {len(post['items']) - len(_videos(post))} post image(s)...")
+        params = REFINEMENT_GRAPH.resolve_params(overrides)["analyze_frames"]
+        results = analyze_frames(os.path.join(ingestion_dir, "post", "images"),
+                                 os.path.join(artifacts_dir, "post_images.jsonl"), **params)
+        images = {result["frame_file"]: result for result in results}
+
+    # Streamed into the merged file item by item, in post order
+    output_json = os.path.join(artifacts_dir, RESULTS_NAME)
+    writer = FrameResultWriter(output_json)
+    try:
+        for item in post["items"]:
+            if item["type"] == "image":
+                result = images.get(os.path.basename(item["file"]))
+                if result is not None:
+                    writer.add(writer.count, {**result, "timestamp": None, "item": item["index"]})
+                continue
+            item_ingestion, item_artifacts = item_dirs(item, ingestion_dir, artifacts_dir)
+            with span("item", item=item["index"]):
+                outputs = REFINEMENT_GRAPH.run(item_ingestion, item_artifacts, overrides,
+                                               targets=["analyze_frames"], force=force)
+            for result in read_results(outputs["refined_frames"]):
+                writer.add(writer.count, {**result, "item": item["index"]})
+    finally:
+        writer.close()
+    print(f"Post frame analysis ({writer.count} frames) saved to {output_json}")
+    return {"refined_frames": output_json}
+
+
+POST_STAGES = {
+    "transcribe": _transcribe,
+    "extract_frames": _extract_frames,
+    "analyze_frames": _analyze_frames,
+}
+
+
+def run_post_stage(name, ingestion_dir="ingestion", artifacts_dir="artifacts", overrides=None, force=()):
+    """One refinement stage over every item of the post in ingestion_dir."""
+    post = load_post(ingestion_dir)
+    with span(f"post_{name}", items=len(post["items"])):
+        return POST_STAGES[name](post, ingestion_dir, artifacts_dir, overrides, force)
+
+
+def refine_post(ingestion_dir="ingestion", artifacts_dir="artifacts", overrides=None, force=(), dry_run=False):
+    """refinement_process for a post: every stage over every item, merged artifacts returned."""
+    from processing.registry import REFINEMENT_GRAPH
+
+    post = load_post(ingestion_dir)
+    if dry_run:
+        plans = {}
+        for item in _videos(post):
+            print(f"{item_label(item)}:")
+            plans[item["index"]] = REFINEMENT_GRAPH.plan(*item_dirs(item, ingestion_dir, artifacts_dir),
+                                                         overrides, force=force)
+            print_plan(plans[item["index"]])
+        print(f"{len(post['items']) - len(_videos(post))} image item(s): analyzed directly, nothing to extract")
+        return plans
+
+    print(f"----- Starting Post Refinement ({len(post['items'])} items) -----")
+    artifacts = {}
+    for name in POST_STAGES:
+        artifacts.update(run_post_stage(name, ingestion_dir, artifacts_dir, overrides, force))
+    print("--- Post refinement completed. ---")
+    return artifacts
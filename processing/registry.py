@@ -1,49 +1,141 @@
 import os
 import json
-from processing.audio_transcription.transcribe import transcribe_audio
-from processing.video_frame_extraction.mp4_specialization import extract_frames
-from processing.video_transcription.frame_analyzer import analyze_frames_directory
+import shutil
+from tracing import span
+from processing.dag import Stage, StageGraph, print_plan
 
-def refinement_process():
+# Stage modules are imported inside the stage functions so that importing the
+# registry (e.g. from main.py) does not pull in whisper / torch / ultralytics /
+# transformers / easyocr. Models come from processing.model_cache, so a
+# long-running process (service/daemon.py) reuses them across calls.
+#
+# Each stage reads from <ingestion_dir> / <artifacts_dir>, is safe to re-run,
+# and returns the paths of what it wrote, so the job queue (service/job_queue.py)
+# can checkpoint and resume a job stage by stage. The stages form a DAG
+# (REFINEMENT_GRAPH) memoized on their inputs and parameters (processing/dag.py),
+# so changing one knob below only re-runs that stage and what depends on it.
+
+# ── knobs ────────────────────────────────────────────────────────────────
+TRANSCRIPTION_PARAMS = {
+    "model_name": "base",
+}
+
+FRAME_EXTRACTION_PARAMS = {
+    "hist_threshold": 0.28,        # ← tune this first (start 0.22–0.35)
+    "ssim_threshold": 0.89,        # ← tune second (0.86–0.92)
+    "min_frame_interval": 8,       # adjust based on fps (8–15 common)
+    "max_keyframes": None,         # budget mode: keep at most this many keyframes (top-scoring cuts)
+    "keyframes_per_second": None,  # budget mode: ...and/or at most this many per second of video
+    "frame_store": "jpeg",         # keyframes.store encoding: "jpeg", "raw" (~10× the disk, no decode), or None (JPEG files)
+    "export_jpegs": False,         # also write one JPEG per keyframe next to the store
+}
+
+FRAME_ANALYSIS_PARAMS = {
+    "conf_threshold": 0.50,
+    "caption_max_tokens": 45,
+    "caption_num_beams": 3,        # lower = faster, but slightly worse captions
+    "yolo_model_name": "yolov10n.pt",
+    "blip_model_name": "Salesforce/blip-image-captioning-base",
+    "backend": "eager",            # "eager" (fp32), "int8" (dynamic quantization) or "onnx" (ONNX Runtime)
+    "ocr_mode": "regions",         # "regions": skip textless frames, OCR only text regions; "full": whole frame
+    "ocr_reuse": True,             # reuse text of regions unchanged since the previous keyframe
+    "caption_reuse": True,         # carry a caption forward to barely-changed keyframes with the same objects
+    "caption_reuse_ssim": 0.80,    # ...whose SSIM vs the previous keyframe is at least this
+    "caption_reuse_hist": 1.0,     # ...and whose histogram χ² distance is at most this
+    "frame_cache": True,           # reuse analyses of near-identical frames (cache/frame_analysis.db)
+    "frame_cache_distance": 8,     # max pHash/dHash Hamming distance (of 64 bits) to count as a match
+    "pipeline": {"decode": 1, "yolo": 1, "blip": 1, "ocr": 1},   # workers per concurrent stage; None = one frame at a time
+    "pipeline_queue": 2,           # frames waiting in front of each stage
+}
+
+# How analyze_frames runs, not what it writes: changing these doesn't invalidate memoized results
+FRAME_ANALYSIS_RUN_PARAMS = ("pipeline", "pipeline_queue")
 
-    print("----- Starting Refinement Process -----")
+
+def transcription_stage(ingestion_dir="ingestion", artifacts_dir="artifacts", model_name="base"):
+    from processing.audio_transcription.transcribe import transcribe_audio
+    from processing.cpu_plan import get_layout, pinned, set_torch_threads, whisper_cpus
 
     print("Transcribing audio...")
-    transcription = transcribe_audio()
+    layout = get_layout()
+    # With overlapping jobs Whisper runs on the cores the frame workers leave free
+    with span("transcription"), pinned(whisper_cpus(layout)):
+        set_torch_threads(layout["whisper"]["threads"])
+        transcription, segments = transcribe_audio(
+            return_segments=True,
+            file_path=os.path.join(ingestion_dir, 'audio.mp3'),
+            model_name=model_name
+        )
+
+    os.makedirs(artifacts_dir, exist_ok=True)
 
-    os.makedirs('artifacts', exist_ok=True)
-    
-    with open('artifacts/transcription.txt','w') as f:
+    transcription_path = os.path.join(artifacts_dir, 'transcription.txt')
+    with open(transcription_path,'w') as f:
         f.write(transcription)
-    print("Audio Transcription saved to artifacts/transcription.txt")
-    
-    
+    print(f"Audio Transcription saved to {transcription_path}")
+
+    # Timed segments are used by the hierarchical (map-reduce) summarizer
+    segments_path = os.path.join(artifacts_dir, 'transcription_segments.json')
+    with open(segments_path, 'w', encoding='utf-8') as f:
+        json.dump(segments, f, indent=2, ensure_ascii=False)
+    print(f"Transcription segments saved to {segments_path}")
+
+    return {"transcription": transcription_path, "segments": segments_path}
+
+
+def frame_extraction_stage(ingestion_dir="ingestion", artifacts_dir="artifacts", **params):
+    from processing.video_frame_extraction.mp4_specialization import extract_frames
+
     print("Extracting video frames on significant changes...")
-    video_path = 'ingestion/video.mp4'
-    output_folder = 'artifacts/video_frames'
-
-    extract_frames(
-        video_path=video_path,
-        output_folder=output_folder,
-        hist_threshold=0.28,       # ← tune this first (start 0.22–0.35)
-        ssim_threshold=0.89,       # ← tune second (0.86–0.92)
-        min_frame_interval=8       # adjust based on fps (8–15 common)
-    )
+    video_path = os.path.join(ingestion_dir, 'video.mp4')
+    output_folder = os.path.join(artifacts_dir, 'video_frames')
+
+    # Start clean so a retried stage doesn't mix in frames from a failed attempt
+    shutil.rmtree(output_folder, ignore_errors=True)
+
+    with span("frame_extraction"):
+        extract_frames(
+            video_path=video_path,
+            output_folder=output_folder,
+            **{**FRAME_EXTRACTION_PARAMS, **params}
+        )
     # extract_frames(video_path, output_folder, sensitivity_threshold=15)
     print(f"Video frames extracted to {output_folder}")
 
+    return {"video_frames": output_folder}
+
+
+def analyze_frames(frames_dir, output_json, **params):
+    """Analyze a folder of frames with the FRAME_ANALYSIS_PARAMS models (pooled or in-process)."""
+    from processing.video_transcription.frame_analyzer import analyze_frames_directory
+    from processing.model_cache import get_frame_models, model_lock
+    from processing.cpu_plan import get_layout, uses_pool
+
+    params = {**FRAME_ANALYSIS_PARAMS, **params}
+    layout = get_layout()
+    with span("frame_analysis"):
+        if uses_pool(layout):
+            # pinned worker processes on their own cores (see processing/cpu_plan.py)
+            from processing.video_transcription.parallel_analyzer import analyze_frames_parallel
+            return analyze_frames_parallel(frames_dir, output_json, layout, **params)
+        models = get_frame_models(params.pop("yolo_model_name"), params.pop("blip_model_name"),
+                                  backend=params.pop("backend"))
+        with model_lock("frame_models"):
+            return analyze_frames_directory(
+                frames_dir=frames_dir,
+                output_json_path=output_json,
+                models=models,
+                threads=layout["model_threads"],
+                **params
+            )
+
+
+def frame_analysis_stage(ingestion_dir="ingestion", artifacts_dir="artifacts", **params):
     print("Transcribing Video Frames...")
-    FRAMES_DIR = "./artifacts/video_frames"
-    OUTPUT_JSON = "./artifacts/refined_frames.json"
-
-    # You can override settings here
-    results = analyze_frames_directory(
-        frames_dir=FRAMES_DIR,
-        output_json_path=OUTPUT_JSON,
-        conf_threshold=0.50,
-        caption_max_tokens=45,
-        caption_num_beams=3      # lower = faster, but slightly worse captions
-    )
+    FRAMES_DIR = os.path.join(artifacts_dir, 'video_frames')
+    OUTPUT_JSON = os.path.join(artifacts_dir, 'refined_frames.jsonl')
+
+    results = analyze_frames(FRAMES_DIR, OUTPUT_JSON, **params)
 
     # Optional: print first few results
     if results:
@@ -51,4 +143,68 @@ def refinement_process():
         for item in results[:2]:
             print(json.dumps(item, indent=2))
     print(f"Frame analysis results saved to {OUTPUT_JSON}")
-    print("--- Refinement process completed. ---")
\ No newline at end of file
+
+    return {"refined_frames": OUTPUT_JSON}
+
+
+# Inputs are files in the ingestion dir; deps are upstream stages
+REFINEMENT_GRAPH = StageGraph([
+    Stage("transcribe", transcription_stage, inputs=["audio.mp3"], params=TRANSCRIPTION_PARAMS),
+    Stage("extract_frames", frame_extraction_stage, inputs=["video.mp4"], params=FRAME_EXTRACTION_PARAMS,
+          version=3),
+    Stage("analyze_frames", frame_analysis_stage, deps=["extract_frames"], params=FRAME_ANALYSIS_PARAMS,
+          version=3, ignored_params=FRAME_ANALYSIS_RUN_PARAMS),
+])
+
+
+def run_stage(name, ingestion_dir="ingestion", artifacts_dir="artifacts", overrides=None, force=()):
+    """Run one stage (and any stale upstream stage) unless its memoized outputs are current."""
+    from processing.post import load_post, run_post_stage
+
+    if load_post(ingestion_dir) is not None:
+        return run_post_stage(name, ingestion_dir, artifacts_dir, overrides, force)
+    return REFINEMENT_GRAPH.run(ingestion_dir, artifacts_dir, overrides, targets=[name], force=force)
+
+
+def refinement_process(ingestion_dir="ingestion", artifacts_dir="artifacts", overrides=None,
+                       force=(), dry_run=False, budget_s=None, budget_kind="wall"):
+    """
+    Transcribe, extract keyframes and analyze them.
+    Reads <ingestion_dir>/audio.mp3 + video.mp4, writes into <artifacts_dir>.
+    Stages whose inputs and parameters are unchanged since the last run are
+    skipped. `overrides` = {stage: {param: value}}; `force` = stage names to
+    re-run anyway; `dry_run` only prints what would recompute.
+    `budget_s` picks model tiers and a keyframe budget to fit that many seconds
+    (`budget_kind` "wall" or "cpu"), see processing/budget.py; `overrides` still win.
+    Returns the combined artifact paths of all stages (the plan for a dry run).
+    Posts (metadata type "post") are refined item by item, see processing/post.py.
+    """
+    from processing.post import load_post, refine_post
+
+    if load_post(ingestion_dir) is not None:
+        return refine_post(ingestion_dir, artifacts_dir, overrides, force=force, dry_run=dry_run)
+
+    if budget_s is not None:
+        from processing.budget import BUDGET_STAGES, job_plan, merge_overrides, run_budgeted_stage
+
+        if dry_run:
+            budget_plan = job_plan(ingestion_dir, artifacts_dir, budget_s, budget_kind)
+            overrides = merge_overrides(budget_plan, overrides)
+        else:
+            print(f"----- Starting Refinement Process (budget {budget_s:.0f}s {budget_kind}) -----")
+            artifacts = {}
+            for name in BUDGET_STAGES:
+                artifacts.update(run_budgeted_stage(name, ingestion_dir, artifacts_dir, budget_s, budget_kind,
+                                                    overrides, force))
+            print("--- Refinement process completed. ---")
+            return artifacts
+
+    if dry_run:
+        plan = REFINEMENT_GRAPH.plan(ingestion_dir, artifacts_dir, overrides, force=force)
+        print_plan(plan)
+        return plan
+
+    print("----- Starting Refinement Process -----")
+    artifacts = REFINEMENT_GRAPH.run(ingestion_dir, artifacts_dir, overrides, force=force)
+    print("--- Refinement process completed. ---")
+    return artifacts
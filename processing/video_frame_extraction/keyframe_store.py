@@ -0,0 +1,188 @@
+"""
+Single-file keyframe store.
+
+Instead of one JPEG per keyframe, extract_frames writes all keyframes of a
+video into <frames folder>/keyframes.store:
+
+    header   magic (8 bytes), index offset, index length (little-endian u64)
+    frames   one block per keyframe, each aligned to 64 bytes
+    index    JSON: video, fps, encoding and, per keyframe, the manifest entry
+             (file, frame_index, time_s, hist_diff, ssim, ...) plus the
+             block's offset, nbytes and shape
+
+Encodings:
+    raw   BGR uint8 arrays. Reading a frame is a view into the memory-mapped
+          file: no decode and no copy. Analyzer workers map the same file,
+          so they share its page cache.
+    jpeg  JPEG bytes. About 10× smaller on disk, and each read decodes
+          straight from the mapped bytes.
+
+The keyframe names ("keyframe_0003_frame_000120.jpg") are kept as keys, so
+results and the frame cache still refer to frames by file name. A JPEG folder
+can still be written at extraction time (export_jpegs) or later:
+
+    python -m processing.video_frame_extraction.keyframe_store info artifacts/video_frames
+    python -m processing.video_frame_extraction.keyframe_store export artifacts/video_frames
+"""
+
+import os
+import sys
+import json
+import struct
+import argparse
+
+import cv2
+import numpy as np
+
+STORE_NAME = "keyframes.store"
+ENCODINGS = ("raw", "jpeg")
+JPEG_QUALITY = 95
+MAGIC = b"SAKFS\x00\x00\x01"
+HEADER = struct.Struct("<8sQQ")
+ALIGN = 64
+
+
+def store_path(frames_dir):
+    return os.path.join(frames_dir, STORE_NAME)
+
+
+class KeyframeStoreWriter:
+    """Appends keyframes to a new store; the file appears (atomically) on close()."""
+
+    def __init__(self, path, encoding="jpeg", jpeg_quality=JPEG_QUALITY):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown keyframe store encoding: {encoding} (use one of {', '.join(ENCODINGS)})")
+        self.path = path
+        self.encoding = encoding
+        self.jpeg_quality = jpeg_quality
+        self.frames = []
+        self._tmp = path + ".tmp"
+        self._file = open(self._tmp, "wb")
+        self._file.write(HEADER.pack(MAGIC, 0, 0))
+
+    def add(self, frame_bgr, entry):
+        """Append one frame; `entry` is its manifest entry (file, frame_index, time_s, scores)."""
+        if self.encoding == "raw":
+            data = np.ascontiguousarray(frame_bgr, dtype=np.uint8).tobytes()
+        else:
+            ok, buf = cv2.imencode(".jpg", frame_bgr, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok:
+                raise ValueError(f"Could not encode frame {entry['file']}")
+            data = buf.tobytes()
+        offset = self._pad()
+        self._file.write(data)
+        self.frames.append({**entry, "offset": offset, "nbytes": len(data), "shape": list(frame_bgr.shape)})
+
+    def _pad(self):
+        pos = self._file.tell()
+        pad = -pos % ALIGN
+        self._file.write(b"\0" * pad)
+        return pos + pad
+
+    def close(self, **meta):
+        """Write the index (plus `meta`, e.g. video and fps) and move the store into place."""
+        index = json.dumps({**meta, "encoding": self.encoding, "frames": self.frames}).encode("utf-8")
+        offset = self._pad()
+        self._file.write(index)
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, offset, len(index)))
+        self._file.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+
+class KeyframeStore:
+    """Read-only, memory-mapped view of a keyframe store."""
+
+    def __init__(self, path):
+        self.path = path
+        self._data = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, offset, length = HEADER.unpack(self._data[:HEADER.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError(f"Not a keyframe store: {path}")
+        self.index = json.loads(self._data[offset:offset + length].tobytes())
+        self.encoding = self.index["encoding"]
+        self.entries = {entry["file"]: entry for entry in self.index["frames"]}
+
+    def __len__(self):
+        return len(self.index["frames"])
+
+    def names(self):
+        """Keyframe names in timestamp order."""
+        return [entry["file"] for entry in self.index["frames"]]
+
+    def frame(self, name):
+        """The BGR frame: a read-only view of the mapped file (raw) or decoded from it (jpeg)."""
+        entry = self.entries[name]
+        block = self._data[entry["offset"]:entry["offset"] + entry["nbytes"]]
+        if self.encoding == "raw":
+            return block.reshape(entry["shape"])
+        image = cv2.imdecode(block, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Could not decode {name} from {self.path}")
+        return image
+
+    def close(self):
+        self._data = None
+
+
+def open_store(frames_dir):
+    """The KeyframeStore of a frames folder, or None if it only has image files."""
+    path = store_path(frames_dir)
+    return KeyframeStore(path) if os.path.exists(path) else None
+
+
+def frame_names(frames_dir):
+    """Keyframe names of a frames folder in timestamp order: the store's, else the image files'."""
+    store = open_store(frames_dir)
+    if store is not None:
+        return store.names()
+    return sorted(f for f in os.listdir(frames_dir) if f.lower().endswith(('.jpg', '.jpeg', '.png')))
+
+
+def export_jpegs(frames_dir, output_folder=None, jpeg_quality=JPEG_QUALITY):
+    """Write the store's keyframes as JPEG files (into frames_dir by default); returns their paths."""
+    store = open_store(frames_dir)
+    if store is None:
+        raise FileNotFoundError(f"No keyframe store in {frames_dir}")
+    output_folder = output_folder or frames_dir
+    os.makedirs(output_folder, exist_ok=True)
+    paths = []
+    for name in store.names():
+        path = os.path.join(output_folder, name)
+        cv2.imwrite(path, store.frame(name), [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect a keyframe store or export it as JPEG files.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info", help="encoding, size and keyframes of a store")
+    info.add_argument("frames_dir", nargs="?", default="artifacts/video_frames")
+    export = sub.add_parser("export", help="write the keyframes as JPEG files")
+    export.add_argument("frames_dir", nargs="?", default="artifacts/video_frames")
+    export.add_argument("--out", default=None, help="output folder (default: the frames folder)")
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        store = open_store(args.frames_dir)
+        if store is None:
+            print(f"❌ No keyframe store in {args.frames_dir}")
+            return 1
+        size = os.path.getsize(store.path) / 2**20
+        print(f"{store.path}: {len(store)} keyframes, {store.encoding}, {size:.1f} MB")
+        for entry in store.index["frames"]:
+            print(f"  {entry['file']}  t={entry['time_s']}s  {'x'.join(map(str, entry['shape']))}")
+    else:
+        paths = export_jpegs(args.frames_dir, args.out)
+        print(f"✅ Exported {len(paths)} keyframes to {args.out or args.frames_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,16 @@
 import cv2
 import os
+import json
+import math
+import bisect
 import numpy as np
-from skimage.metrics import structural_similarity as ssim
+from contextlib import contextmanager
+
+from .keyframe_store import KeyframeStoreWriter, store_path
+
+MANIFEST_NAME = "manifest.json"
+SCORE_WIDTH = 160          # budget mode scores frames on thumbnails this wide
+MIN_BUDGET_SCORE = 1.0     # budget mode ignores frame-to-frame changes below the fixed-mode thresholds
 
 
 def extract_frames(
@@ -11,7 +20,12 @@ def extract_frames(
     ssim_threshold=0.88,          # 1.0 = identical, 0.85–0.92 common range
     min_frame_interval=8,         # ~0.3 s at 30 fps — prevents burst saves
     use_grayscale_for_ssim=True,
-    hist_method=cv2.HISTCMP_CHISQR
+    hist_method=cv2.HISTCMP_CHISQR,
+    max_keyframes=None,
+    keyframes_per_second=None,
+    min_score=MIN_BUDGET_SCORE,
+    frame_store="jpeg",
+    export_jpegs=False
 ):
     """
     Extract keyframes on **structural / scene changes** with reduced sensitivity
@@ -27,14 +41,35 @@ def extract_frames(
         hist_threshold:     smaller → more keyframes (0.18–0.45 typical)
         ssim_threshold:     smaller → more keyframes (0.82–0.93 typical)
         min_frame_interval: min frames between two saved keyframes
+        frame_store:        'jpeg' or 'raw' keyframe store (keyframes.store, see
+                            keyframe_store.py), or None for JPEG files only
+        export_jpegs:       also write one JPEG per keyframe next to the store
+
+    Budget mode (max_keyframes and/or keyframes_per_second set): caps the
+    number of keyframes however the reel is edited, see extract_frames_budget.
+
+    Returns the list of saved frame indices (empty if the video can't be read).
+    Also writes <output_folder>/manifest.json with each keyframe's index, time
+    (the decoder's presentation timestamp) and its change scores against the previous keyframe (hist_diff, ssim), so
+    the analyzer can tell how different a keyframe really is.
     """
+    from skimage.metrics import structural_similarity as ssim
+
+    if max_keyframes is not None or keyframes_per_second is not None:
+        return extract_frames_budget(
+            video_path, output_folder, max_keyframes=max_keyframes,
+            keyframes_per_second=keyframes_per_second, hist_threshold=hist_threshold,
+            ssim_threshold=ssim_threshold, min_frame_interval=min_frame_interval,
+            hist_method=hist_method, min_score=min_score, frame_store=frame_store, export_jpegs=export_jpegs
+        )
+
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
 
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         print(f"Error opening video: {video_path}")
-        return
+        return []
 
     fps = cap.get(cv2.CAP_PROP_FPS) or 30
     print(f"Video FPS ≈ {fps:.1f}")
@@ -42,7 +77,7 @@ def extract_frames(
     ret, prev_frame = cap.read()
     if not ret:
         print("Video is empty")
-        return
+        return []
 
     # Precompute initial histogram (BGR channels separately)
     prev_hist = []
@@ -57,61 +92,263 @@ def extract_frames(
     # Save first frame
     frame_idx = 0
     saved_count = 0
-    cv2.imwrite(os.path.join(output_folder, f"keyframe_{saved_count:04d}_frame_{frame_idx:06d}.jpg"), prev_frame)
-    saved_count += 1
-    last_save_idx = 0
+    with _keyframe_writer(output_folder, frame_store) as writer:
+        manifest = [_manifest_entry(saved_count, 0, fps, None, None, _pts(cap))]
+        _save_frame(prev_frame, manifest[0], output_folder, writer, export_jpegs)
+        saved_count += 1
+        last_save_idx = 0
+        saved_indices = [0]
+
+        print("Extracting keyframes...")
+
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            frame_idx += 1
+
+            # Enforce minimum interval
+            if frame_idx - last_save_idx < min_frame_interval:
+                continue
+
+            # ── Histogram comparison ───────────────────────────────────────
+            hist_diff_max = 0
+            curr_hist = []
+            for i, channel in enumerate(cv2.split(frame)):
+                h = cv2.calcHist([channel], [0], None, [256], [0, 256])
+                h = cv2.normalize(h, h).flatten()
+                curr_hist.append(h)
+                diff = cv2.compareHist(prev_hist[i], h, hist_method)
+                hist_diff_max = max(hist_diff_max, diff)
+
+            # ── SSIM (on grayscale or color) ───────────────────────────────
+            curr_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            ssim_value = ssim(prev_gray, curr_gray, data_range=curr_gray.max() - curr_gray.min())
+
+            # Decide whether to save
+            should_save = False
+            reason = ""
+
+            if hist_diff_max > hist_threshold:
+                should_save = True
+                reason += f"hist={hist_diff_max:.3f} "
+
+            if ssim_value < ssim_threshold:
+                should_save = True
+                reason += f"ssim={ssim_value:.3f}"
+
+            if should_save:
+                entry = _manifest_entry(saved_count, frame_idx, fps, hist_diff_max, ssim_value, _pts(cap))
+                _save_frame(frame, entry, output_folder, writer, export_jpegs)
+                print(f"Saved {entry['file']}  | {reason.strip()}")
 
-    print("Extracting keyframes...")
+                # Update references
+                prev_hist = curr_hist
+                prev_gray = curr_gray
+                last_save_idx = frame_idx
+                saved_indices.append(frame_idx)
+                manifest.append(entry)
+                saved_count += 1
+
+        cap.release()
+        _finish(output_folder, writer, manifest, video=video_path, fps=fps)
+    print(f"\nDone. Saved {saved_count} keyframes from ~{frame_idx} frames.")
+    return saved_indices
+
+
+def _histograms(frame):
+    hists = []
+    for channel in cv2.split(frame):
+        h = cv2.calcHist([channel], [0], None, [256], [0, 256])
+        hists.append(cv2.normalize(h, h).flatten())
+    return hists
+
+
+def _hist_diff(prev_hist, curr_hist, hist_method=cv2.HISTCMP_CHISQR):
+    return max(cv2.compareHist(p, c, hist_method) for p, c in zip(prev_hist, curr_hist))
+
+
+def score_frames(video_path, hist_threshold=0.30, ssim_threshold=0.88, hist_method=cv2.HISTCMP_CHISQR):
+    """
+    Pass 1 of budget mode: change magnitude of every frame against the one before,
+    on small thumbnails. A score is the larger of hist_diff / hist_threshold and
+    (1 - ssim) / (1 - ssim_threshold), so 1.0 is where fixed mode would trigger.
+    Returns (scores array, fps).
+    """
+    from skimage.metrics import structural_similarity as ssim
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"Error opening video: {video_path}")
+        return np.zeros(0), 0
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
 
+    scores = []
+    prev_hist = prev_gray = None
     while True:
         ret, frame = cap.read()
         if not ret:
             break
+        height, width = frame.shape[:2]
+        if width > SCORE_WIDTH:
+            frame = cv2.resize(frame, (SCORE_WIDTH, max(1, height * SCORE_WIDTH // width)),
+                               interpolation=cv2.INTER_AREA)
+        hist = _histograms(frame)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if prev_hist is None:
+            scores.append(float("inf"))        # the first frame is always kept
+        else:
+            data_range = max(int(gray.max()) - int(gray.min()), 1)
+            s = ssim(prev_gray, gray, data_range=data_range)
+            scores.append(max(_hist_diff(prev_hist, hist, hist_method) / hist_threshold,
+                              (1 - s) / (1 - ssim_threshold)))
+        prev_hist, prev_gray = hist, gray
+    cap.release()
+    return np.array(scores), fps
 
-        frame_idx += 1
 
-        # Enforce minimum interval
-        if frame_idx - last_save_idx < min_frame_interval:
+def select_keyframes(scores, budget, min_frame_interval=8, min_score=MIN_BUDGET_SCORE):
+    """
+    Pass 2 of budget mode: the highest-scoring frames, at most `budget` of them,
+    at least min_frame_interval frames apart, ignoring changes below min_score.
+    Returns sorted frame indices (frame 0 first).
+    """
+    chosen = []
+    for idx in np.argsort(-scores, kind="stable"):
+        if len(chosen) >= budget or scores[idx] < min_score:
+            break
+        pos = bisect.bisect_left(chosen, idx)
+        if pos > 0 and idx - chosen[pos - 1] < min_frame_interval:
             continue
+        if pos < len(chosen) and chosen[pos] - idx < min_frame_interval:
+            continue
+        chosen.insert(pos, int(idx))
+    return chosen
 
-        # ── Histogram comparison ───────────────────────────────────────
-        hist_diff_max = 0
-        for i, channel in enumerate(cv2.split(frame)):
-            h = cv2.calcHist([channel], [0], None, [256], [0, 256])
-            h = cv2.normalize(h, h).flatten()
-            diff = cv2.compareHist(prev_hist[i], h, hist_method)
-            hist_diff_max = max(hist_diff_max, diff)
-
-        # ── SSIM (on grayscale or color) ───────────────────────────────
-        curr_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        ssim_value = ssim(prev_gray, curr_gray, data_range=curr_gray.max() - curr_gray.min())
-
-        # Decide whether to save
-        should_save = False
-        reason = ""
-
-        if hist_diff_max > hist_threshold:
-            should_save = True
-            reason += f"hist={hist_diff_max:.3f} "
-
-        if ssim_value < ssim_threshold:
-            should_save = True
-            reason += f"ssim={ssim_value:.3f}"
-
-        if should_save:
-            filename = os.path.join(output_folder, f"keyframe_{saved_count:04d}_frame_{frame_idx:06d}.jpg")
-            cv2.imwrite(filename, frame)
-            print(f"Saved {os.path.basename(filename)}  | {reason.strip()}")
-
-            # Update references
-            prev_hist = [cv2.normalize(cv2.calcHist([ch], [0], None, [256], [0, 256]), cv2.normalize(cv2.calcHist([ch], [0], None, [256], [0, 256]), ch)).flatten()
-                         for ch in cv2.split(frame)]
-            prev_gray = curr_gray
-            last_save_idx = frame_idx
-            saved_count += 1
 
-    cap.release()
-    print(f"\nDone. Saved {saved_count} keyframes from ~{frame_idx} frames.")
+def extract_frames_budget(
+    video_path,
+    output_folder,
+    max_keyframes=None,
+    keyframes_per_second=None,
+    hist_threshold=0.30,
+    ssim_threshold=0.88,
+    min_frame_interval=8,
+    hist_method=cv2.HISTCMP_CHISQR,
+    min_score=MIN_BUDGET_SCORE,
+    frame_store="jpeg",
+    export_jpegs=False
+):
+    """
+    Keyframe extraction with a bounded output: at most max_keyframes, and/or at
+    most keyframes_per_second × duration keyframes (whichever is smaller).
+
+    A cheap first pass scores every frame's change magnitude (score_frames),
+    then the top-scoring cuts are kept subject to min_frame_interval
+    (select_keyframes), and a second decode saves just those frames. Downstream
+    analysis cost is then bounded by the budget, however fast the reel cuts.
+    """
+    from skimage.metrics import structural_similarity as ssim
+
+    scores, fps = score_frames(video_path, hist_threshold, ssim_threshold, hist_method)
+    if len(scores) == 0:
+        print("Video is empty")
+        return []
+
+    budget = len(scores)
+    if max_keyframes is not None:
+        budget = min(budget, int(max_keyframes))
+    if keyframes_per_second is not None:
+        budget = min(budget, max(1, math.ceil(keyframes_per_second * len(scores) / fps)))
+    selected = select_keyframes(scores, max(1, budget), min_frame_interval, min_score)
+    print(f"Video FPS ≈ {fps:.1f}; budget {budget} keyframes, "
+          f"{int(np.sum(scores[1:] >= min_score))} frames scoring at least {min_score:g}, keeping {len(selected)}")
+
+    os.makedirs(output_folder, exist_ok=True)
+    with _keyframe_writer(output_folder, frame_store) as writer:
+        cap = cv2.VideoCapture(video_path)
+        wanted = set(selected)
+        manifest = []
+        prev_hist = prev_gray = None
+        frame_idx = -1
+        while wanted:
+            if not cap.grab():           # skip decoding-to-BGR of frames we don't keep
+                break
+            frame_idx += 1
+            if frame_idx not in wanted:
+                continue
+            wanted.discard(frame_idx)
+            _, frame = cap.retrieve()
+
+            hist, gray = _histograms(frame), cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            hist_diff = ssim_value = None
+            if prev_hist is not None:
+                hist_diff = _hist_diff(prev_hist, hist, hist_method)
+                ssim_value = ssim(prev_gray, gray, data_range=max(int(gray.max()) - int(gray.min()), 1))
+            prev_hist, prev_gray = hist, gray
+
+            entry = _manifest_entry(len(manifest), frame_idx, fps, hist_diff, ssim_value, _pts(cap))
+            entry["score"] = None if math.isinf(scores[frame_idx]) else round(float(scores[frame_idx]), 3)
+            _save_frame(frame, entry, output_folder, writer, export_jpegs)
+            print(f"Saved {entry['file']}  | score={entry['score']}")
+            manifest.append(entry)
+        cap.release()
+
+        _finish(output_folder, writer, manifest, video=video_path, fps=fps, mode="budget", budget=budget)
+    print(f"\nDone. Saved {len(manifest)} keyframes from {len(scores)} frames (budget {budget}).")
+    return [entry["frame_index"] for entry in manifest]
+
+
+def _pts(cap):
+    """Presentation time (s) of the frame just read, or None if the backend doesn't report it."""
+    msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+    return msec / 1000 if msec and msec > 0 else None
+
+
+@contextmanager
+def _keyframe_writer(output_folder, frame_store):
+    """The keyframe store writer (None for JPEG files only); a failed extraction leaves no keyframes.store.tmp."""
+    writer = KeyframeStoreWriter(store_path(output_folder), frame_store) if frame_store else None
+    try:
+        yield writer
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+
+
+def _save_frame(frame, entry, output_folder, writer, export_jpegs):
+    if writer is not None:
+        writer.add(frame, entry)
+    if writer is None or export_jpegs:
+        cv2.imwrite(os.path.join(output_folder, entry["file"]), frame)
+
+
+def _finish(output_folder, writer, manifest, **meta):
+    if writer is not None:
+        writer.close(**meta)
+    with open(os.path.join(output_folder, MANIFEST_NAME), "w") as f:
+        json.dump({**meta, "frames": manifest}, f, indent=2)
+
+
+def _manifest_entry(saved_count, frame_idx, fps, hist_diff, ssim_value, pts_s=None):
+    return {
+        "file": f"keyframe_{saved_count:04d}_frame_{frame_idx:06d}.jpg",
+        "frame_index": frame_idx,
+        "time_s": round(frame_idx / fps if pts_s is None else pts_s, 3),
+        "hist_diff": None if hist_diff is None else round(float(hist_diff), 4),   # vs previous keyframe
+        "ssim": None if ssim_value is None else round(float(ssim_value), 4),
+    }
+
+
+def load_manifest(frames_dir):
+    """{file name: manifest entry} for a frames folder, or {} if it has no manifest."""
+    path = os.path.join(frames_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {entry["file"]: entry for entry in json.load(f)["frames"]}
 
 
 if __name__ == "__main__":
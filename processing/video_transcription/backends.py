@@ -0,0 +1,215 @@
+"""
+CPU inference backends for the frame-analysis models.
+
+    eager  PyTorch fp32, as loaded (the reference)
+    int8   PyTorch dynamic int8 quantization of the Linear / LSTM layers:
+           BLIP (vision encoder and text decoder) and the EasyOCR recognizer.
+           YOLO is almost all convolutions, which dynamic quantization does
+           not touch, so it stays fp32.
+    onnx   ONNX Runtime for YOLO, the BLIP vision encoder and the EasyOCR
+           recognizer. Graphs are exported once into cache/onnx/ and their
+           sessions are reused for the life of the process. BLIP's text
+           decoder (token-by-token beam search) stays in PyTorch.
+
+`apply_backend` swaps the models inside a load_models() tuple, so every
+caller (analyze_single_frame, the frame cache, the service) keeps using the
+same call interface. Compare backends on a fixed frame set with
+`python -m benchmarks.bench_stages --stages backends`.
+"""
+
+import os
+import re
+import hashlib
+import threading
+
+import numpy as np
+
+BACKENDS = ("eager", "int8", "onnx")
+EXPORT_DIR = "cache/onnx"
+ONNX_OPSET = 17
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_module_classes = None
+
+
+def apply_backend(models, backend="eager", yolo_model_name="yolov10n.pt"):
+    """Return the (yolo, processor, model, ocr) tuple running on `backend`."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend} (use one of {', '.join(BACKENDS)})")
+    yolo, processor, model, ocr = models
+    if backend == "int8":
+        model, ocr = _quantize_blip(model), _quantize_recognizer(ocr)
+    elif backend == "onnx":
+        _require_onnx()
+        yolo = _onnx_yolo(yolo, yolo_model_name)
+        model = _onnx_blip(model)
+        ocr = _onnx_recognizer(ocr)
+    model.inference_backend = backend      # part of the frame cache's settings key
+    return yolo, processor, model, ocr
+
+
+# ── int8 ──────────────────────────────────────────────────────────────────
+
+def _quantize(module, layer_types):
+    import torch
+
+    engines = torch.backends.quantized.supported_engines
+    if "fbgemm" not in engines and "qnnpack" in engines:
+        torch.backends.quantized.engine = "qnnpack"     # ARM
+    return torch.ao.quantization.quantize_dynamic(module, layer_types, dtype=torch.qint8)
+
+
+def _quantize_blip(model):
+    import torch
+    print("Quantizing BLIP (dynamic int8)...")
+    return _quantize(model, {torch.nn.Linear})
+
+
+def _quantize_recognizer(ocr):
+    import torch
+    print("Quantizing EasyOCR recognizer (dynamic int8)...")
+    ocr.recognizer = _quantize(ocr.recognizer, {torch.nn.Linear, torch.nn.LSTM})
+    return ocr
+
+
+# ── ONNX Runtime ──────────────────────────────────────────────────────────
+
+def _require_onnx():
+    """onnx (for exporting) and onnxruntime are optional installs, only needed by this backend."""
+    import importlib.util
+
+    missing = [name for name in ("onnx", "onnxruntime") if importlib.util.find_spec(name) is None]
+    if missing:
+        raise ImportError(f"The onnx inference backend needs {' and '.join(missing)}: "
+                          "pip install onnx onnxruntime")
+
+
+def export_path(kind, model_name, *versions):
+    """cache/onnx/<kind>_<model>_<hash>.onnx; the hash covers library versions and opset."""
+    safe = re.sub(r"[^A-Za-z0-9._-]+", "_", str(model_name)).strip("_")
+    key = hashlib.sha256(repr((kind, model_name, ONNX_OPSET) + versions).encode()).hexdigest()[:10]
+    return os.path.join(EXPORT_DIR, f"{kind}_{safe}_{key}.onnx")
+
+
+def get_session(path):
+    """One InferenceSession per exported graph, shared by every caller in the process."""
+    import onnxruntime as ort
+
+    with _sessions_lock:
+        if path not in _sessions:
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            _sessions[path] = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        return _sessions[path]
+
+
+def _export(path, module, dummy_inputs, input_names, output_names, dynamic_axes):
+    import torch
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with torch.no_grad():
+        torch.onnx.export(module, dummy_inputs, tmp, input_names=input_names, output_names=output_names,
+                          dynamic_axes=dynamic_axes, opset_version=ONNX_OPSET)
+    os.replace(tmp, path)     # a half-written export is never picked up
+
+
+def _onnx_yolo(yolo, yolo_model_name):
+    import shutil
+    import ultralytics
+    from ultralytics import YOLO
+
+    path = export_path("yolo", yolo_model_name, ultralytics.__version__)
+    if not os.path.exists(path):
+        print(f"Exporting {yolo_model_name} to ONNX...")
+        exported = yolo.export(format="onnx", opset=ONNX_OPSET, dynamic=False, verbose=False)
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        shutil.move(exported, path)
+    # ultralytics runs .onnx weights through ONNX Runtime and returns the usual Results
+    return YOLO(path, task="detect")
+
+
+def _onnx_blip(model):
+    import torch
+    import transformers
+
+    name = getattr(model.config, "_name_or_path", "blip")
+    path = export_path("blip_vision", name, torch.__version__, transformers.__version__)
+    if not os.path.exists(path):
+        print("Exporting BLIP vision encoder to ONNX...")
+        size = model.config.vision_config.image_size
+        VisionEncoder, _, _, _ = _modules()
+        _export(path, VisionEncoder(model.vision_model), (torch.zeros(1, 3, size, size),),
+                ["pixel_values"], ["last_hidden_state"],
+                {"pixel_values": {0: "batch"}, "last_hidden_state": {0: "batch"}})
+    _, OrtVisionModel, _, _ = _modules()
+    model.vision_model = OrtVisionModel(get_session(path), model.vision_model.config)
+    return model
+
+
+def _onnx_recognizer(ocr):
+    import torch
+    import easyocr
+
+    name = "_".join(getattr(ocr, "lang_list", ["en"]))
+    path = export_path("easyocr_recognizer", name, torch.__version__, easyocr.__version__)
+    _, _, Recognizer, OrtRecognizer = _modules()
+    if not os.path.exists(path):
+        print("Exporting EasyOCR recognizer to ONNX...")
+        # recognizer input: one grayscale text line, 64 px high, variable width
+        _export(path, Recognizer(ocr.recognizer), (torch.zeros(1, 1, 64, 256),),
+                ["image"], ["preds"],
+                {"image": {0: "batch", 3: "width"}, "preds": {0: "batch", 1: "steps"}})
+    ocr.recognizer = OrtRecognizer(get_session(path))
+    return ocr
+
+
+def _modules():
+    """nn.Module wrappers, defined on first use so importing this module doesn't import torch."""
+    global _module_classes
+    if _module_classes is not None:
+        return _module_classes
+    import torch
+
+    class VisionEncoder(torch.nn.Module):
+        def __init__(self, vision_model):
+            super().__init__()
+            self.vision_model = vision_model
+
+        def forward(self, pixel_values):
+            return self.vision_model(pixel_values=pixel_values, return_dict=False)[0]
+
+    class OrtVisionModel(torch.nn.Module):
+        """Stands in for BlipVisionModel inside generate(); only image_embeds ([0]) is used."""
+
+        def __init__(self, session, config):
+            super().__init__()
+            self.session = session
+            self.config = config
+
+        def forward(self, pixel_values=None, **kwargs):
+            pixels = pixel_values.detach().cpu().numpy().astype(np.float32)
+            return (torch.from_numpy(self.session.run(None, {"pixel_values": pixels})[0]),)
+
+    class Recognizer(torch.nn.Module):
+        def __init__(self, recognizer):
+            super().__init__()
+            self.recognizer = recognizer
+
+        def forward(self, image):
+            return self.recognizer(image, None)      # CTC models ignore the text argument
+
+    class OrtRecognizer(torch.nn.Module):
+        """Stands in for EasyOCR's recognizer: model(image, text) → CTC predictions."""
+
+        def __init__(self, session):
+            super().__init__()
+            self.session = session
+
+        def forward(self, image, text=None):
+            pixels = image.detach().cpu().numpy().astype(np.float32)
+            return torch.from_numpy(self.session.run(None, {"image": pixels})[0])
+
+    _module_classes = VisionEncoder, OrtVisionModel, Recognizer, OrtRecognizer
+    return _module_classes
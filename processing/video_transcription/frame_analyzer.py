@@ -8,23 +8,28 @@ Module for analyzing extracted video frames:
 
 import os
 import json
-import cv2
-from PIL import Image
-import torch
-from ultralytics import YOLO
-from transformers import BlipProcessor, BlipForConditionalGeneration
-import easyocr
+import time
+from tracing import span, annotate
+
+# torch / ultralytics / transformers / easyocr are imported inside the functions
+# that use them, so importing this module stays cheap.
 
 
 def load_models(
     yolo_model_name="yolov10n.pt",
     blip_model_name="Salesforce/blip-image-captioning-base",
-    ocr_languages=['en']
+    ocr_languages=['en'],
+    backend="eager"
 ):
     """
     Load all required models once at startup.
     Returns tuple: (yolo_model, blip_processor, blip_model, ocr_reader)
+    backend: 'eager' (fp32), 'int8' or 'onnx', see backends.py
     """
+    from ultralytics import YOLO
+    from transformers import BlipProcessor, BlipForConditionalGeneration
+    import easyocr
+
     print("Loading models... (this may take a minute the first time)")
 
     # YOLO object detection
@@ -39,8 +44,27 @@ def load_models(
     # EasyOCR
     ocr = easyocr.Reader(ocr_languages, gpu=False)  # gpu=False → force CPU
 
-    print("All models loaded.")
-    return yolo, processor, model, ocr
+    models = (yolo, processor, model, ocr)
+    if backend != "eager":
+        from .backends import apply_backend
+        models = apply_backend(models, backend, yolo_model_name)
+
+    print(f"All models loaded ({backend}).")
+    return models
+
+
+def frame_timestamp(frame_path, time_s=None):
+    """
+    MM:SS of a frame: from its manifest time (time_s), else from a frame_<seconds>.jpg
+    file name. Keyframe names (keyframe_<n>_frame_<index>.jpg) carry no time.
+    """
+    if time_s is None:
+        parts = os.path.splitext(os.path.basename(frame_path))[0].split('_')
+        if len(parts) != 2 or parts[0] != "frame" or not parts[1].isdigit():
+            return "??:??"  # fallback
+        time_s = int(parts[1])
+    seconds = int(time_s)
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
 
 
 def analyze_single_frame(
@@ -51,59 +75,136 @@ def analyze_single_frame(
     ocr_reader,
     conf_threshold=0.50,
     caption_max_tokens=40,
-    caption_num_beams=4
+    caption_num_beams=4,
+    image_bgr=None,
+    ocr_mode="regions",
+    ocr_tracker=None,
+    carry_caption=None,
+    threads=None,
+    prep=None,
+    time_s=None
 ):
     """
     Analyze one frame: detection + caption + OCR
     Returns dict with timestamp (derived), objects, caption, ocr_text
+    image_bgr: the already-decoded frame, if the caller has it
+    ocr_mode: 'regions' (skip textless frames, OCR only candidate regions) or 'full'
+    ocr_tracker: OcrTracker carrying unchanged text regions over from the previous frame
+    carry_caption: {"caption", "classes", "source"} of a barely-changed previous frame;
+                   if YOLO finds the same object classes here, that caption is reused
+                   (marked with "caption_reused_from") instead of running BLIP
+    threads: optional {"yolo", "blip", "ocr"} intra-op thread counts (see processing/cpu_plan.py)
+    prep: FramePreprocessor whose buffers are reused across frames (see preprocess.py)
+    time_s: the frame's time in the video (manifest / keyframe store), for the timestamp
     """
-    # Load image
-    image_bgr = cv2.imread(frame_path)
-    if image_bgr is None:
-        raise ValueError(f"Could not load image: {frame_path}")
-
-    image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
-    pil_image = Image.fromarray(image_rgb)
+    from processing.cpu_plan import set_torch_threads
+    from .preprocess import FramePreprocessor
 
-    # Derive timestamp from filename (assumes format frame_123.jpg → seconds)
-    try:
-        seconds = int(os.path.splitext(os.path.basename(frame_path))[0].split('_')[1])
-        timestamp = f"{seconds // 60:02d}:{seconds % 60:02d}"
-    except (IndexError, ValueError):
-        timestamp = "??:??"  # fallback
+    # Decode once; every model's input is built from this buffer
+    if prep is None:
+        prep = FramePreprocessor(blip_processor)
+    if image_bgr is None:
+        with span("decode"):
+            image_bgr = prep.decode(frame_path)
 
     # 1. Object Detection (YOLO)
-    results = yolo_model(frame_path, verbose=False)
-    objects = []
-    for result in results:
-        for box in result.boxes:
-            conf = float(box.conf)
-            if conf >= conf_threshold:
-                class_name = result.names[int(box.cls)]
-                objects.append(f"{class_name} ({conf:.2f})")
-
-    # 2. Image Captioning (BLIP)
-    inputs = blip_processor(images=pil_image, return_tensors="pt")
-    with torch.no_grad():
-        generated_ids = blip_model.generate(
-            **inputs,
-            max_new_tokens=caption_max_tokens,
-            num_beams=caption_num_beams,
-            do_sample=False
-        )
-    caption = blip_processor.decode(generated_ids[0], skip_special_tokens=True)
+    threads = threads or {}
+    set_torch_threads(threads.get("yolo"))
+    objects = detect_objects(yolo_model, image_bgr, prep, conf_threshold)
+
+    # 2. Image Captioning (BLIP), unless the previous caption still describes this frame
+    reused_from = None
+    if carry_caption is not None and object_classes(objects) == carry_caption["classes"]:
+        caption = carry_caption["caption"]
+        reused_from = carry_caption["source"]
+    else:
+        set_torch_threads(threads.get("blip"))
+        caption = caption_frame(blip_processor, blip_model, image_bgr, prep, caption_max_tokens, caption_num_beams)
 
     # 3. OCR
-    ocr_results = ocr_reader.readtext(image_bgr, detail=0, paragraph=False)
-    ocr_text = " ".join([t for t in ocr_results if t.strip()])
+    set_torch_threads(threads.get("ocr"))
+    ocr_text = frame_text(ocr_reader, image_bgr, prep, ocr_mode, ocr_tracker)
+
+    return frame_result(frame_path, frame_timestamp(frame_path, time_s), objects, caption, ocr_text, reused_from)
+
+
+def detect_objects(yolo_model, image_bgr, prep, conf_threshold=0.50):
+    """YOLO detections above conf_threshold as 'class (conf), ...' ('None detected' if none)."""
+    with span("yolo"):
+        results = yolo_model(prep.yolo_input(image_bgr), verbose=False)
+        objects = []
+        for result in results:
+            for box in result.boxes:
+                conf = float(box.conf)
+                if conf >= conf_threshold:
+                    class_name = result.names[int(box.cls)]
+                    objects.append(f"{class_name} ({conf:.2f})")
+    return ", ".join(objects) if objects else "None detected"
+
+
+def caption_frame(blip_processor, blip_model, image_bgr, prep, caption_max_tokens=40, caption_num_beams=4):
+    import torch
+
+    with span("blip"):
+        pixel_values = prep.blip_input(image_bgr)
+        with torch.no_grad():
+            generated_ids = blip_model.generate(
+                pixel_values=pixel_values,
+                max_new_tokens=caption_max_tokens,
+                num_beams=caption_num_beams,
+                do_sample=False
+            )
+        return blip_processor.decode(generated_ids[0], skip_special_tokens=True).strip()
 
-    return {
+
+def frame_text(ocr_reader, image_bgr, prep, ocr_mode="regions", ocr_tracker=None):
+    from .text_regions import read_text
+
+    with span("ocr"):
+        gray = prep.gray(image_bgr) if ocr_mode == "regions" else None
+        ocr_results = read_text(ocr_reader, image_bgr, ocr_mode, tracker=ocr_tracker, gray=gray)
+        return " ".join([t for t in ocr_results if t.strip()]).strip()
+
+
+def frame_result(frame_path, timestamp, objects, caption, ocr_text, reused_from=None):
+    result = {
         "frame_file": os.path.basename(frame_path),
         "timestamp": timestamp,
-        "objects": ", ".join(objects) if objects else "None detected",
+        "objects": objects,
         "caption": caption.strip(),
         "ocr_text": ocr_text.strip() if ocr_text.strip() else "No text detected"
     }
+    if reused_from:
+        result["caption_reused_from"] = reused_from
+    return result
+
+
+def object_classes(objects):
+    """'person (0.93), cup (0.61)' → {'person', 'cup'}"""
+    if not objects or objects == "None detected":
+        return set()
+    return {item.rsplit(" (", 1)[0].strip() for item in objects.split(", ")}
+
+
+def caption_carry(previous, scores, caption_reuse_ssim=0.80, caption_reuse_hist=1.0, caption_reuse_max_chain=3):
+    """The previous frame's caption state if this frame's change scores allow carrying it forward, else None."""
+    if (previous is not None and scores and scores["ssim"] is not None
+            and scores["ssim"] >= caption_reuse_ssim
+            and scores["hist_diff"] <= caption_reuse_hist
+            and previous["chain"] < caption_reuse_max_chain):
+        return previous
+    return None
+
+
+def carry_state(previous, result):
+    """Caption state of a finished frame, for carrying its caption to the next one."""
+    reused_from = result.get("caption_reused_from")
+    return {
+        "caption": result["caption"],
+        "classes": object_classes(result["objects"]),
+        "source": reused_from or result["frame_file"],
+        "chain": previous["chain"] + 1 if reused_from else 0,
+    }
 
 
 def analyze_frames_directory(
@@ -111,60 +212,236 @@ def analyze_frames_directory(
     output_json_path,
     conf_threshold=0.50,
     caption_max_tokens=40,
-    caption_num_beams=4
+    caption_num_beams=4,
+    models=None,
+    ocr_mode="regions",
+    ocr_reuse=True,
+    caption_reuse=True,
+    caption_reuse_ssim=0.80,
+    caption_reuse_hist=1.0,
+    caption_reuse_max_chain=3,
+    frame_cache=True,
+    frame_cache_distance=None,
+    frame_cache_path=None,
+    frame_files=None,
+    threads=None,
+    pipeline=None,
+    pipeline_queue=2,
+    first_index=0
 ):
     """
     Main function: analyze all .jpg / .png frames in a directory
-    Saves results to JSON file
-    Returns list of frame analysis dicts
+    Appends each frame's result to output_json_path (JSON lines) as it finishes,
+    see frame_results.py. Returns the results: a FrameResults reading them back
+    from that file, or a list of dicts if output_json_path is None
+
+    models: optional (yolo, processor, model, ocr) tuple from load_models(),
+            to reuse already-loaded models instead of loading them again
+    ocr_mode: 'regions' gates OCR on a cheap text detector and reads only the
+              candidate regions (see text_regions.py); 'full' OCRs whole frames
+    ocr_reuse: in 'regions' mode, reuse the text of regions whose pixels didn't
+               change since the previous keyframe
+    caption_reuse: carry the previous caption forward when the extractor's change
+                   scores (manifest.json) say this keyframe barely differs from the
+                   previous one (ssim >= caption_reuse_ssim and hist_diff <=
+                   caption_reuse_hist) and YOLO sees the same object classes; at most
+                   caption_reuse_max_chain frames in a row reuse one caption
+    frame_cache: reuse the analysis of a near-identical frame seen before
+                 (this reel or earlier ones), see frame_cache.py
+    frame_files: analyze only these frames of frames_dir, in this order
+    frames_dir may hold a keyframe store (keyframes.store, read memory-mapped)
+    or image files; see processing/video_frame_extraction/keyframe_store.py
+    threads: per-model intra-op thread counts, see processing/cpu_plan.py
+    pipeline: {"decode", "yolo", "blip", "ocr"} worker counts to run the models as
+              concurrent stages with bounded queues of pipeline_queue frames
+              (see pipeline.py); None analyzes one frame at a time
+    first_index: "index" of the first frame in the results (a chunk of a longer run)
     """
-    yolo, processor, model, ocr = load_models()
+    if models is None:
+        with span("load_models"):
+            models = load_models()
+    yolo, processor, model, ocr = models
+
+    cache = None
+    if frame_cache:
+        from .frame_cache import DB_PATH, DEFAULT_MAX_DISTANCE, FrameCache, settings_key
+
+        cache = FrameCache(
+            settings_key(
+                conf_threshold=conf_threshold,
+                caption_max_tokens=caption_max_tokens,
+                caption_num_beams=caption_num_beams,
+                ocr_mode=ocr_mode,
+                ocr_reuse=ocr_reuse,
+                backend=getattr(model, "inference_backend", "eager"),
+                yolo=getattr(yolo, "ckpt_path", None) or type(yolo).__name__,
+                blip=getattr(getattr(model, "config", None), "_name_or_path", None) or type(model).__name__,
+            ),
+            db_path=frame_cache_path or DB_PATH,
+            max_distance=DEFAULT_MAX_DISTANCE if frame_cache_distance is None else frame_cache_distance
+        )
 
     if not os.path.isdir(frames_dir):
         raise NotADirectoryError(f"Directory not found: {frames_dir}")
 
-    frame_files = [
-        f for f in os.listdir(frames_dir)
-        if f.lower().endswith(('.jpg', '.jpeg', '.png'))
-    ]
+    # Timestamp order (keyframe files are numbered), so text can be tracked frame to frame
+    from processing.video_frame_extraction.keyframe_store import frame_names, open_store
+    store = open_store(frames_dir)
+    if frame_files is None:
+        frame_files = store.names() if store is not None else frame_names(frames_dir)
 
     if not frame_files:
         print("No image files found in directory.")
         return []
 
-    refined_data = []
+    # Times and change scores written by extract_frames (empty for folders from elsewhere)
+    from processing.video_frame_extraction.mp4_specialization import load_manifest
+    manifest = store.entries if store is not None else load_manifest(frames_dir)
+
+    tracker = None
+    if ocr_mode == "regions" and ocr_reuse:
+        from .text_regions import OcrTracker
+        tracker = OcrTracker()
 
     print(f"Found {len(frame_files)} frames. Starting analysis...\n")
 
+    # Each result is appended to the output as its frame finishes (see frame_results.py);
+    # without an output path they are kept in memory
+    from .frame_results import FrameResults, FrameResultWriter, merge_parts, part_path
+    writer = FrameResultWriter(part_path(output_json_path)) if output_json_path else None
+    collected = []
+
+    def emit(index, result):
+        if writer is not None:
+            writer.add(first_index + index, result)
+        else:
+            collected.append(result)
+
+    carry_settings = (caption_reuse_ssim, caption_reuse_hist, caption_reuse_max_chain) if caption_reuse else None
+    try:
+        if pipeline:
+            from .pipeline import FramePipeline
+            run = FramePipeline(models, pipeline, queue_size=pipeline_queue, conf_threshold=conf_threshold,
+                                caption_max_tokens=caption_max_tokens, caption_num_beams=caption_num_beams,
+                                ocr_mode=ocr_mode, carry_settings=carry_settings, threads=threads)
+            processed, captions_reused, preps = run.run(frames_dir, frame_files, store, manifest, cache, tracker,
+                                                        emit)
+        else:
+            processed, captions_reused, preps = _analyze_sequential(
+                frames_dir, frame_files, store, manifest, cache, tracker, models, conf_threshold,
+                caption_max_tokens, caption_num_beams, ocr_mode, carry_settings, threads, emit
+            )
+    finally:
+        if writer is not None:
+            writer.close()      # on a crash the part file keeps every finished frame
+
+    if writer is not None:
+        merge_parts([writer.path], output_json_path)
+        refined_data = FrameResults(output_json_path, processed)
+        print(f"\nDone. Results saved to: {output_json_path}")
+    else:
+        refined_data = collected
+    print(f"Processed {processed} / {len(frame_files)} frames successfully.")
+    from .preprocess import combined_stats
+    prep_stats = combined_stats(preps)
+    print(f"Preprocessing: {prep_stats['decodes_per_frame']} decodes/frame ({prep_stats['mapped']} mapped), "
+          f"{prep_stats['buffer_allocations']} buffer allocations ({prep_stats['buffer_mb']} MB) "
+          f"for {prep_stats['frames']} frames, {prep_stats['preprocess_s']}s")
+    annotate(preprocess=prep_stats)
+    if caption_reuse:
+        print(f"Captions carried forward: {captions_reused} of {processed} frames")
+        annotate(captions_reused=captions_reused)
+    if tracker is not None:
+        ocr_stats = tracker.stats()
+        print(f"OCR regions: {ocr_stats['regions_recognized']} recognized, {ocr_stats['regions_reused']} reused "
+              f"from the previous keyframe, {ocr_stats['textless_frames']} textless frames skipped")
+        annotate(ocr=ocr_stats)
+    if cache is not None:
+        cache.print_report()
+        annotate(frame_cache=cache.stats())
+        cache.close()
+
+    return refined_data
+
+
+def _analyze_sequential(frames_dir, frame_files, store, manifest, cache, tracker, models, conf_threshold,
+                        caption_max_tokens, caption_num_beams, ocr_mode, carry_settings, threads, emit):
+    """One frame at a time, each through YOLO, BLIP and OCR in turn; emit(index, result) as each finishes."""
+    from processing.cpu_plan import set_torch_threads
+    from .preprocess import FramePreprocessor
+
+    yolo, processor, model, ocr = models
+    # One decode per frame; the model inputs share buffers allocated once per run
+    prep = FramePreprocessor(processor)
+    previous = None       # caption / classes of the last analyzed frame, for carry-forward
+    captions_reused = 0
+    processed = 0
+
     for i, fname in enumerate(frame_files, 1):
         frame_path = os.path.join(frames_dir, fname)
         print(f"[{i}/{len(frame_files)}] Processing {fname} ...")
 
         try:
-            result = analyze_single_frame(
-                frame_path,
-                yolo,
-                processor,
-                model,
-                ocr,
-                conf_threshold=conf_threshold,
-                caption_max_tokens=caption_max_tokens,
-                caption_num_beams=caption_num_beams
-            )
-            refined_data.append(result)
-            print(f"  → {result['timestamp']} | {result['caption'][:60]}...")
+            with span("frame", file=fname) as frame_span:
+                with span("decode"):
+                    image_bgr = prep.decode(frame_path, store)
+                scores = manifest.get(fname)
+                time_s = scores["time_s"] if scores else None
+                hit = None
+                if cache is not None:
+                    hashes = cache.hashes(image_bgr)
+                    hit = cache.lookup(hashes)
+
+                if hit is not None:
+                    cache.record_hit(hit)
+                    frame_span["attrs"]["cache_hit"] = True
+                    ocr_text = hit["ocr_text"]
+                    if not hit["ocr_reusable"]:
+                        # Only the picture matched: its on-screen text may have changed
+                        set_torch_threads((threads or {}).get("ocr"))
+                        ocr_text = frame_text(ocr, image_bgr, prep, ocr_mode, tracker)
+                    result = frame_result(frame_path, frame_timestamp(frame_path, time_s),
+                                          hit["objects"], hit["caption"], ocr_text)
+                else:
+                    carry = caption_carry(previous, scores, *carry_settings) if carry_settings else None
+                    start = time.perf_counter()
+                    result = analyze_single_frame(
+                        frame_path,
+                        yolo,
+                        processor,
+                        model,
+                        ocr,
+                        conf_threshold=conf_threshold,
+                        caption_max_tokens=caption_max_tokens,
+                        caption_num_beams=caption_num_beams,
+                        image_bgr=image_bgr,
+                        ocr_mode=ocr_mode,
+                        ocr_tracker=tracker,
+                        carry_caption=carry,
+                        threads=threads,
+                        prep=prep,
+                        time_s=time_s
+                    )
+                    if "caption_reused_from" in result:
+                        captions_reused += 1
+                        frame_span["attrs"]["caption_reused"] = True
+                    elif cache is not None:
+                        # only frames with their own caption are worth caching
+                        cache.record_miss()
+                        cache.store(hashes, result, time.perf_counter() - start, source=frame_path)
+
+            reused_from = result.get("caption_reused_from")
+            previous = carry_state(previous, result)
+            emit(i - 1, result)
+            processed += 1
+            reused = f" (cached, distance {hit['distance']})" if hit else ""
+            reused += f" (caption from {reused_from})" if reused_from else ""
+            print(f"  → {result['timestamp']} | {result['caption'][:60]}...{reused}")
         except Exception as e:
+            previous = None
             print(f"  → Error on {fname}: {e}")
 
-    # Save results
-    os.makedirs(os.path.dirname(output_json_path), exist_ok=True)
-    with open(output_json_path, 'w', encoding='utf-8') as f:
-        json.dump(refined_data, f, indent=2, ensure_ascii=False)
-
-    print(f"\nDone. Results saved to: {output_json_path}")
-    print(f"Processed {len(refined_data)} / {len(frame_files)} frames successfully.")
-
-    return refined_data
+    return processed, captions_reused, [prep]
 
 
 # ────────────────────────────────────────────────
@@ -172,7 +449,7 @@ if __name__ == "__main__":
     # For standalone testing / quick runs
 
     FRAMES_DIR = "./artifacts/video_frames"
-    OUTPUT_JSON = "./artifacts/refined_frames.json"
+    OUTPUT_JSON = "./artifacts/refined_frames.jsonl"
 
     # You can override settings here
     results = analyze_frames_directory(
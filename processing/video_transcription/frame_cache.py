@@ -0,0 +1,216 @@
+"""
+Persistent cache of frame analyses keyed by perceptual hashes.
+
+Keyframes of one reel are often near-identical (a talking head after a slight
+zoom, the same end card), and creators reuse intros and outros across reels.
+Each analyzed frame is stored with its 64-bit pHash and dHash; a new frame whose
+hashes are both within `max_distance` bits (Hamming distance) of a stored frame
+analyzed with the same settings reuses its objects and caption instead of
+running YOLO and BLIP again. The hashes barely move when only burned-in text or
+subtitles change, so the stored OCR text is reused only for a much closer match
+(`ocr_reuse_distance`); otherwise the frame is OCR'd again.
+
+The cache lives in one SQLite file shared by every run (cache/frame_analysis.db).
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+import cv2
+import numpy as np
+
+DB_PATH = "cache/frame_analysis.db"
+DEFAULT_MAX_DISTANCE = 8       # of 64 bits; re-encoded/zoomed copies land around 4–6, unrelated frames around 30
+OCR_REUSE_DISTANCE = 2         # a new subtitle line already moves the hashes by a few bits
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frames (
+    id          INTEGER PRIMARY KEY,
+    settings    TEXT NOT NULL,
+    phash       INTEGER NOT NULL,
+    dhash       INTEGER NOT NULL,
+    objects     TEXT NOT NULL,
+    caption     TEXT NOT NULL,
+    ocr_text    TEXT NOT NULL,
+    analysis_s  REAL NOT NULL,
+    source      TEXT,
+    hits        INTEGER NOT NULL DEFAULT 0,
+    created     REAL NOT NULL,
+    last_used   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS frames_settings ON frames (settings);
+"""
+
+# ── hashes ────────────────────────────────────────────────────────────────
+
+def _bits_to_int(bits):
+    value = 0
+    for bit in bits.flatten():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def dhash(image_bgr, size=8):
+    """Difference hash: sign of horizontal gradients on a (size+1)×size thumbnail."""
+    gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY) if image_bgr.ndim == 3 else image_bgr
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+def phash(image_bgr, size=8, highfreq_factor=4):
+    """Perceptual hash: low-frequency DCT coefficients above their median."""
+    gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY) if image_bgr.ndim == 3 else image_bgr
+    side = size * highfreq_factor
+    small = cv2.resize(gray, (side, side), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:size, :size]
+    return _bits_to_int(low > np.median(low))
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def _popcount64(values):
+    """Bit count of each element of a uint64 array."""
+    return np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def _to_sqlite(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def settings_key(**settings):
+    """Analyses are only reused between runs with identical model settings."""
+    return hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+# ── cache ─────────────────────────────────────────────────────────────────
+
+class FrameCache:
+    """
+    Lookup / store of frame analyses for one settings key, plus the run's
+    hit/miss counters. Entries are scanned in memory with vectorized popcounts.
+    """
+
+    def __init__(self, settings, db_path=DB_PATH, max_distance=DEFAULT_MAX_DISTANCE,
+                 ocr_reuse_distance=OCR_REUSE_DISTANCE):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.settings = settings
+        self.max_distance = max_distance
+        self.ocr_reuse_distance = ocr_reuse_distance
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+        rows = self._db.execute(
+            "SELECT id, phash, dhash FROM frames WHERE settings = ?", (settings,)
+        ).fetchall()
+        self._ids = [row[0] for row in rows]
+        self._phashes = np.array([row[1] for row in rows], dtype=np.int64).view(np.uint64)
+        self._dhashes = np.array([row[2] for row in rows], dtype=np.int64).view(np.uint64)
+
+        self.hits = 0
+        self.misses = 0
+        self.time_saved_s = 0.0
+        self.lookup_s = 0.0
+
+    def hashes(self, image_bgr):
+        return phash(image_bgr), dhash(image_bgr)
+
+    def lookup(self, hashes):
+        """
+        Closest stored analysis within max_distance on both hashes, or None.
+        "ocr_reusable" says whether its ocr_text may be reused as well.
+        """
+        start = time.perf_counter()
+        try:
+            with self._lock:
+                if not self._ids:
+                    return None
+                p, d = hashes
+                p_dist = _popcount64(self._phashes ^ np.uint64(p))
+                d_dist = _popcount64(self._dhashes ^ np.uint64(d))
+                ok = (p_dist <= self.max_distance) & (d_dist <= self.max_distance)
+                if not ok.any():
+                    return None
+                best = int(np.argmin(np.where(ok, p_dist + d_dist, 10_000)))
+                entry_id, distance = self._ids[best], int(p_dist[best])
+                ocr_reusable = max(distance, int(d_dist[best])) <= self.ocr_reuse_distance
+
+                row = self._db.execute(
+                    "SELECT objects, caption, ocr_text, analysis_s, source FROM frames WHERE id = ?", (entry_id,)
+                ).fetchone()
+                self._db.execute(
+                    "UPDATE frames SET hits = hits + 1, last_used = ? WHERE id = ?", (time.time(), entry_id)
+                )
+                self._db.commit()
+        finally:
+            self.lookup_s += time.perf_counter() - start
+
+        objects, caption, ocr_text, analysis_s, source = row
+        return {"objects": objects, "caption": caption, "ocr_text": ocr_text,
+                "analysis_s": analysis_s, "source": source, "distance": distance, "ocr_reusable": ocr_reusable}
+
+    def store(self, hashes, result, analysis_s, source=None):
+        p, d = hashes
+        now = time.time()
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO frames (settings, phash, dhash, objects, caption, ocr_text, analysis_s, source,"
+                " created, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.settings, _to_sqlite(p), _to_sqlite(d), result["objects"], result["caption"],
+                 result["ocr_text"], analysis_s, source, now, now)
+            )
+            self._db.commit()
+            self._ids.append(cur.lastrowid)
+            self._phashes = np.append(self._phashes, np.uint64(p))
+            self._dhashes = np.append(self._dhashes, np.uint64(d))
+
+    def record_hit(self, entry):
+        self.hits += 1
+        self.time_saved_s += entry["analysis_s"]
+
+    def record_miss(self):
+        self.misses += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "time_saved_s": round(self.time_saved_s, 2),
+            "lookup_s": round(self.lookup_s, 3),
+            "entries": len(self._ids),
+        }
+
+    def print_report(self):
+        s = self.stats()
+        print(f"Frame cache: {s['hits']} hits / {s['misses']} misses ({s['hit_rate']:.0%} hit rate), "
+              f"~{s['time_saved_s']:.1f}s of analysis saved, {s['lookup_s']:.3f}s spent on lookups, "
+              f"{s['entries']} cached frames")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# ────────────────────────────────────────────────
+if __name__ == "__main__":
+    # Quick check: a slightly shifted / recompressed frame stays within the threshold,
+    # a different frame does not.
+    rng = np.random.default_rng(0)
+    base = cv2.GaussianBlur(rng.integers(0, 255, (360, 640, 3), dtype=np.uint8), (31, 31), 0)
+    zoomed = cv2.resize(base[4:-4, 6:-6], (640, 360))
+    _, jpg = cv2.imencode(".jpg", zoomed, [cv2.IMWRITE_JPEG_QUALITY, 60])
+    near = cv2.imdecode(jpg, cv2.IMREAD_COLOR)
+    other = cv2.GaussianBlur(rng.integers(0, 255, (360, 640, 3), dtype=np.uint8), (31, 31), 0)
+
+    for name, img in (("near-duplicate", near), ("different", other)):
+        print(f"{name:>15}: pHash distance {hamming(phash(base), phash(img)):2d}, "
+              f"dHash distance {hamming(dhash(base), dhash(img)):2d}")
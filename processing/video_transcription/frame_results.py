@@ -0,0 +1,111 @@
+"""
+Frame analysis results as JSON lines, written as the frames finish.
+
+    {"index": 0, "frame_file": "keyframe_0000_frame_000000.jpg", "timestamp": "00:00", ...}
+    {"index": 1, ...}
+
+A FrameResultWriter appends each frame's record (and flushes) as soon as the
+frame is analyzed. Memory doesn't grow with the length of the video, and a
+crash keeps every finished frame in the part file. Every writer produces a run
+sorted by frame index: the sequential loop and the pipeline release frames in
+order, and each parallel worker writes its own part for its contiguous chunk.
+merge_parts() merges the runs by index into the final file, holding one record
+per run in memory (heapq.merge).
+
+Readers stream the file record by record: read_results() / FrameResults.
+Results saved by older versions as one JSON list are read as well.
+"""
+
+import os
+import json
+import heapq
+import itertools
+
+RESULTS_NAME = "refined_frames.jsonl"
+
+
+def part_path(output_path, part=0):
+    """Where one writer's run goes until merge_parts()."""
+    return f"{output_path}.part{part}"
+
+
+class FrameResultWriter:
+    """Appends frame records to a JSON-lines file, one line per finished frame."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.count = 0
+        self._file = open(path, "w", encoding="utf-8")
+
+    def add(self, index, result):
+        record = {"index": index, **result}
+        record["index"] = index     # re-numbered when results are copied from another file
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()      # a crash loses at most the frame being written
+        self.count += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def read_results(path):
+    """Frame records from a results file, one at a time."""
+    with open(path, encoding="utf-8") as f:
+        first = f.read(1)
+        f.seek(0)
+        if first == "[":            # legacy: one JSON list
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return          # torn last line of a crashed run
+
+
+def merge_parts(parts, output_path):
+    """Merge runs sorted by index into output_path (atomically); removes the parts. Returns the record count."""
+    tmp = output_path + ".tmp"
+    count = 0
+    with open(tmp, "w", encoding="utf-8") as f:
+        runs = [read_results(part) for part in parts if os.path.exists(part)]
+        for record in heapq.merge(*runs, key=lambda record: record["index"]):
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    os.replace(tmp, output_path)
+    for part in parts:
+        if os.path.exists(part):
+            os.remove(part)
+    return count
+
+
+class FrameResults:
+    """
+    Analyzed frames saved at `path`, read from disk each time they are
+    iterated. len() and slicing (results[:2]) work like on a list.
+    """
+
+    def __init__(self, path, count=None):
+        self.path = path
+        self._count = count
+
+    def __iter__(self):
+        return read_results(self.path)
+
+    def __len__(self):
+        if self._count is None:
+            self._count = sum(1 for _ in self)
+        return self._count
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return list(itertools.islice(self, key.start, key.stop, key.step))
+        for record in itertools.islice(self, key, None):
+            return record
+        raise IndexError(key)
+
+    def __repr__(self):
+        return f"FrameResults({self.path!r}, {len(self)} frames)"
@@ -0,0 +1,202 @@
+"""
+Frame analysis in a pool of pinned worker processes.
+
+Each worker is pinned to its own slice of cores from the CPU layout
+(processing/cpu_plan.py), sizes its intra-op pools to that slice, and loads
+the models once in its initializer. With the eager backend, BLIP and the
+EasyOCR detector are not loaded per worker: every worker maps the same
+read-only copy of the weights (see shared_weights.py), so memory no longer grows
+with the worker count. Pools stay alive between calls, so the service pays for
+model loading once. Workers read keyframes from the memory-mapped keyframe store,
+so frames are not copied between processes. The sorted keyframes are split into contiguous chunks, one
+per worker, so OCR reuse and caption carry-forward still see consecutive
+frames. Results are merged back in timestamp order.
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from tracing import annotate
+from .frame_results import FrameResults, merge_parts, part_path
+
+SHARE_WEIGHTS = True        # eager backend: workers map one shared copy of BLIP + OCR detector
+WARM_TIMEOUT_S = 600
+
+_pools = {}
+_ready = {}                 # pool → (queue each worker posts its pid to once loaded, pids seen)
+_pools_lock = threading.Lock()
+_worker_cpu_s = 0.0         # CPU time the workers spent on finished chunks (they are never reaped between calls)
+
+# set in each worker process by _init_worker
+_models = None
+_model_threads = None
+
+
+def _init_worker(slots, ready, threads, model_threads, yolo_model_name, blip_model_name, backend, shared):
+    global _models, _model_threads
+    from processing.cpu_plan import pin_process, set_torch_threads
+    from .frame_analyzer import load_models
+    import cv2
+
+    pin_process(slots.get())
+    cv2.setNumThreads(1)
+    set_torch_threads(threads)
+    if shared:
+        from .shared_weights import load_shared_models
+        _models = load_shared_models(shared, yolo_model_name, blip_model_name)
+    else:
+        _models = load_models(yolo_model_name, blip_model_name, backend=backend)
+    _model_threads = model_threads
+    ready.put(os.getpid())
+
+
+def _noop():
+    return None
+
+
+def _analyze_chunk(frames_dir, frame_files, params, output_path=None, first_index=0):
+    """
+    One worker's chunk: results go to its own part file (a list is returned if
+    output_path is None). Returns (results, CPU seconds this worker spent on them).
+    """
+    from .frame_analyzer import analyze_frames_directory
+    start = time.process_time()
+    results = analyze_frames_directory(frames_dir, output_path, models=_models, frame_files=frame_files,
+                                       threads=_model_threads, first_index=first_index, **params)
+    return (len(results) if output_path else results), time.process_time() - start
+
+
+def worker_cpu_s():
+    """
+    CPU seconds the pool workers have spent analyzing frames so far. The
+    workers live across calls, so RUSAGE_CHILDREN doesn't see this time.
+    """
+    return _worker_cpu_s
+
+
+def get_pool(layout, yolo_model_name="yolov10n.pt",
+             blip_model_name="Salesforce/blip-image-captioning-base", backend="eager", share_weights=None):
+    """The (cached) worker pool for this layout and model set."""
+    frames = layout["frames"]
+    share = (SHARE_WEIGHTS if share_weights is None else share_weights) and backend == "eager"
+    key = (json.dumps(frames, sort_keys=True), json.dumps(layout["model_threads"], sort_keys=True),
+           yolo_model_name, blip_model_name, backend, share)
+    with _pools_lock:
+        if key not in _pools:
+            shared = None
+            if share:
+                from .shared_weights import prepare_shared_weights
+                shared = prepare_shared_weights(blip_model_name)
+            # spawn, not fork: forking a process with live OpenMP / torch threads can deadlock
+            ctx = multiprocessing.get_context("spawn")
+            slots, ready = ctx.Queue(), ctx.Queue()
+            for cpus in frames["cpus"]:
+                slots.put(cpus)
+            _pools[key] = ProcessPoolExecutor(
+                max_workers=frames["processes"], mp_context=ctx, initializer=_init_worker,
+                initargs=(slots, ready, frames["threads"], layout["model_threads"],
+                          yolo_model_name, blip_model_name, backend, shared)
+            )
+            _ready[_pools[key]] = (ready, set())
+        return _pools[key]
+
+
+def _drop_pool(pool):
+    with _pools_lock:
+        for key, other in list(_pools.items()):
+            if other is pool:
+                del _pools[key]
+        _ready.pop(pool, None)
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def warm_pool(layout, **model_args):
+    """Start every worker of the pool, wait until each has loaded its models; returns their pids."""
+    pool = get_pool(layout, **model_args)
+    workers = layout["frames"]["processes"]
+    ready, pids = _ready[pool]
+    for _ in range(workers):
+        pool.submit(_noop)      # workers are started on demand, one per pending task
+    deadline = time.monotonic() + WARM_TIMEOUT_S
+    while len(pids) < workers:
+        pids.add(ready.get(timeout=max(1, deadline - time.monotonic())))
+    return set(pids)
+
+
+def shutdown_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+        _ready.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+atexit.register(shutdown_pools)
+
+
+def analyze_frames_parallel(
+    frames_dir,
+    output_json_path,
+    layout,
+    frame_files=None,
+    yolo_model_name="yolov10n.pt",
+    blip_model_name="Salesforce/blip-image-captioning-base",
+    backend="eager",
+    share_weights=None,
+    **params
+):
+    """
+    analyze_frames_directory() spread over the layout's frame workers.
+    share_weights: map one shared copy of the weights (default SHARE_WEIGHTS, eager backend only)
+    params: the analyze_frames_directory settings (conf_threshold, ocr_mode, ...)
+    output_json_path: where to save the merged results (None = don't save, return a list)
+    Each worker writes its chunk's results to its own part file as the frames
+    finish; the parts are merged by frame index at the end (frame_results.py).
+    """
+    if not os.path.isdir(frames_dir):
+        raise NotADirectoryError(f"Directory not found: {frames_dir}")
+    if frame_files is None:
+        from processing.video_frame_extraction.keyframe_store import frame_names
+        frame_files = frame_names(frames_dir)
+    if not frame_files:
+        print("No image files found in directory.")
+        return []
+
+    workers = min(layout["frames"]["processes"], len(frame_files))
+    size = -(-len(frame_files) // workers)
+    chunks = [frame_files[i:i + size] for i in range(0, len(frame_files), size)]
+
+    print(f"Analyzing {len(frame_files)} frames on {len(chunks)} worker process(es) "
+          f"× {layout['frames']['threads']} threads...")
+    start = time.perf_counter()
+    pool = get_pool(layout, yolo_model_name, blip_model_name, backend, share_weights)
+    parts = [part_path(output_json_path, i) for i in range(len(chunks))] if output_json_path else [None] * len(chunks)
+    try:
+        futures = [pool.submit(_analyze_chunk, frames_dir, chunk, params, part, i * size)
+                   for i, (chunk, part) in enumerate(zip(chunks, parts))]
+        results, cpu_s = zip(*[future.result() for future in futures])
+    except BrokenProcessPool:
+        _drop_pool(pool)    # a worker died (e.g. out of memory); the next call starts a fresh pool
+        raise
+
+    global _worker_cpu_s
+    with _pools_lock:
+        _worker_cpu_s += sum(cpu_s)
+
+    if output_json_path:
+        processed = merge_parts(parts, output_json_path)
+        refined_data = FrameResults(output_json_path, processed)
+        print(f"\nDone. Results saved to: {output_json_path}")
+    else:
+        refined_data = [result for chunk in results for result in chunk]
+    print(f"Processed {len(refined_data)} / {len(frame_files)} frames in {time.perf_counter() - start:.1f}s "
+          f"on {len(chunks)} worker(s).")
+    annotate(frame_workers=len(chunks), threads_per_worker=layout["frames"]["threads"])
+    return refined_data
@@ -0,0 +1,390 @@
+"""
+Frame analysis as a pipeline of concurrent stages.
+
+    decode → yolo → blip → ocr
+
+Each stage has its own worker threads and a bounded input queue, so frame k+1
+is detected while frame k is captioned and frame k-1 is OCR'd. The models spend
+most of their time in native code that releases the GIL (PyTorch ops, OpenCV),
+so the stages really overlap. Every stage passes frames on in timestamp order,
+which keeps caption carry-forward and OCR region reuse working as in the
+sequential loop:
+
+  - a BLIP worker that may carry the previous caption forward first waits
+    until the previous frame's caption is settled;
+  - the OCR stage has a single worker when text regions are tracked
+    (OcrTracker compares each frame with the one before).
+
+Frame-cache hits are found in the decode stage and skip YOLO and BLIP (and OCR
+when the match is close enough to reuse its text). A frame that is a
+near-duplicate of one still being analyzed waits in the decode stage until the
+earlier frames are collected and stored in the cache, so it hits the cache just
+as in the sequential loop. The intra-op thread budget is split across the model
+workers, so concurrent stages don't oversubscribe the cores.
+
+Each stage reports its utilization (busy time / (wall time × workers)) and the
+depth of its input queue. The bottleneck is the stage that is busy all the
+time, with a full queue in front of it.
+"""
+
+import os
+import time
+import queue
+import heapq
+import threading
+
+from tracing import span, annotate
+
+STAGES = ("decode", "yolo", "blip", "ocr")
+DEFAULT_WORKERS = {"decode": 1, "yolo": 1, "blip": 1, "ocr": 1}
+QUEUE_SIZE = 2
+
+_STOP = object()
+_UNSET = object()
+_ANY_PREVIOUS = {"chain": 0}    # for asking whether the change scores alone allow a carry
+
+
+class Stage:
+    """Worker threads taking frames from a bounded queue and passing them on in frame order."""
+
+    def __init__(self, name, func, workers=1, queue_size=QUEUE_SIZE):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.inbox = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.downstream = None          # the next Stage, or a plain queue collecting the results
+        self.busy_s = 0.0
+        self.items = 0
+        self.depth_total = 0
+        self.depth_max = 0
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._pending = []              # (index, item) heap of frames finished out of order
+        self._next_index = 0
+        self._alive = 0
+
+    def start(self, downstream):
+        self.downstream = downstream
+        self._alive = self.workers
+        for i in range(self.workers):
+            threading.Thread(target=self._work, name=f"{self.name}-{i}", daemon=True).start()
+
+    def _work(self):
+        while True:
+            depth = self.inbox.qsize()
+            item = self.inbox.get()
+            if item is _STOP:
+                break
+            start = time.perf_counter()
+            try:
+                self.func(item)
+            except Exception as e:
+                item["error"] = e       # later stages skip the frame, the collector reports it
+            elapsed = time.perf_counter() - start - item.pop("wait_s", 0.0)    # waiting isn't work
+            item["busy_s"] += elapsed
+            with self._lock:
+                self.busy_s += elapsed
+                self.items += 1
+                self.depth_total += depth
+                self.depth_max = max(self.depth_max, depth)
+                heapq.heappush(self._pending, (item["index"], item))
+                while self._pending and self._pending[0][0] == self._next_index:
+                    _put(self.downstream, heapq.heappop(self._pending)[1])
+                    self._next_index += 1
+        with self._lock:
+            self._alive -= 1
+            last = self._alive == 0
+            if last:
+                self.finished_at = time.perf_counter()
+        if last:
+            _stop(self.downstream)
+
+    def stats(self, started):
+        wall = (self.finished_at or time.perf_counter()) - started
+        return {
+            "workers": self.workers,
+            "frames": self.items,
+            "busy_s": round(self.busy_s, 3),
+            "utilization": round(self.busy_s / (wall * self.workers), 3) if wall > 0 else 0.0,
+            "queue_avg": round(self.depth_total / self.items, 2) if self.items else 0.0,
+            "queue_max": self.depth_max,
+        }
+
+
+def _put(target, item):
+    (target.inbox if isinstance(target, Stage) else target).put(item)
+
+
+def _stop(target):
+    for _ in range(target.workers if isinstance(target, Stage) else 1):
+        _put(target, _STOP)
+
+
+class FramePipeline:
+    """analyze_frames_directory's per-frame work, run as concurrent decode / YOLO / BLIP / OCR stages."""
+
+    def __init__(self, models, workers=None, queue_size=QUEUE_SIZE, conf_threshold=0.50, caption_max_tokens=40,
+                 caption_num_beams=4, ocr_mode="regions", carry_settings=None, threads=None):
+        unknown = set(workers or {}) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown pipeline stage(s): {', '.join(sorted(unknown))} (use {', '.join(STAGES)})")
+        self.models = models
+        self.workers = {**DEFAULT_WORKERS, **(workers or {})}
+        self.queue_size = queue_size
+        self.conf_threshold = conf_threshold
+        self.caption_max_tokens = caption_max_tokens
+        self.caption_num_beams = caption_num_beams
+        self.ocr_mode = ocr_mode
+        self.carry_settings = carry_settings
+        self.threads = threads
+        self.preps = []
+        self.stats = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._settled = {}                  # frame index → caption state (None after an error)
+        self._unread = set()                # frames whose successor finished before they settled
+        self._settled_cond = threading.Condition()
+        self._collected = 0                 # frames before this index have left the pipeline
+        self._inflight = {}                 # frame index → hashes of uncollected cache misses
+        self._collected_cond = threading.Condition()
+
+    def _prep(self):
+        """This worker thread's FramePreprocessor (its buffers are reused only by this thread)."""
+        from .preprocess import FramePreprocessor
+
+        prep = getattr(self._local, "prep", None)
+        if prep is None:
+            prep = self._local.prep = FramePreprocessor(self.models[1])
+            with self._lock:
+                self.preps.append(prep)
+        return prep
+
+    # ── stages ────────────────────────
+
+    def _decode(self, item):
+        with span("decode"):
+            item["image"] = self._prep().decode(item["path"], self.store)
+        if self.cache is not None:
+            item["hashes"] = self.cache.hashes(item["image"])
+            if self._near_inflight(item["index"], item["hashes"]):
+                # Look it up once the earlier frames are stored, as the sequential loop would
+                waited = time.perf_counter()
+                with self._collected_cond:
+                    self._collected_cond.wait_for(lambda: self._collected >= item["index"])
+                item["wait_s"] = time.perf_counter() - waited
+            item["hit"] = self.cache.lookup(item["hashes"])
+            if item["hit"] is None:
+                with self._collected_cond:
+                    self._inflight[item["index"]] = item["hashes"]
+
+    def _near_inflight(self, index, hashes):
+        """Whether an earlier frame still in flight is within the cache's distance of hashes."""
+        from .frame_cache import hamming
+
+        with self._collected_cond:
+            earlier = [h for i, h in self._inflight.items() if i < index]
+        return any(max(hamming(hashes[0], h[0]), hamming(hashes[1], h[1])) <= self.cache.max_distance
+                   for h in earlier)
+
+    def _collect(self, index):
+        with self._collected_cond:
+            self._inflight.pop(index, None)
+            self._collected = index + 1
+            self._collected_cond.notify_all()
+
+    def _detect(self, item):
+        from .frame_analyzer import detect_objects
+
+        if "error" not in item and not item.get("hit"):
+            item["objects"] = detect_objects(self.models[0], item["image"], self._prep(), self.conf_threshold)
+
+    def _caption(self, item):
+        from .frame_analyzer import caption_carry, caption_frame, carry_state, object_classes
+
+        state = None
+        try:
+            if "error" in item:
+                return
+            hit = item.get("hit")
+            if hit:
+                state = carry_state(None, {"frame_file": item["file"], **hit})
+                return
+            carry = None
+            if self.carry_settings and caption_carry(_ANY_PREVIOUS, item["scores"], *self.carry_settings):
+                waited = time.perf_counter()
+                previous = self._previous(item["index"])
+                item["wait_s"] = time.perf_counter() - waited
+                carry = caption_carry(previous, item["scores"], *self.carry_settings)
+            if carry is not None and object_classes(item["objects"]) == carry["classes"]:
+                item["caption"], item["reused_from"] = carry["caption"], carry["source"]
+            else:
+                _, processor, model, _ = self.models
+                item["caption"] = caption_frame(processor, model, item["image"], self._prep(),
+                                                self.caption_max_tokens, self.caption_num_beams)
+            state = carry_state(carry, {"frame_file": item["file"], "caption": item["caption"],
+                                        "objects": item["objects"], "caption_reused_from": item.get("reused_from")})
+        finally:
+            index = item["index"]
+            with self._settled_cond:
+                # Only frame index+1 reads this state: keep it unless that frame finished already
+                if index in self._unread:
+                    self._unread.discard(index)
+                else:
+                    self._settled[index] = state
+                # ... and this frame is the only reader of the previous one
+                if index > 0 and self._settled.pop(index - 1, _UNSET) is _UNSET:
+                    self._unread.add(index - 1)
+                self._settled_cond.notify_all()
+
+    def _previous(self, index):
+        """Caption state of frame index-1, once it is settled (frames reach this stage in order)."""
+        if index == 0:
+            return None
+        with self._settled_cond:
+            self._settled_cond.wait_for(lambda: index - 1 in self._settled)
+            return self._settled[index - 1]
+
+    def _ocr(self, item):
+        from .frame_analyzer import frame_text
+
+        hit = item.get("hit")
+        if "error" not in item and not (hit and hit["ocr_reusable"]):
+            item["ocr_text"] = frame_text(self.models[3], item["image"], self._prep(), self.ocr_mode, self.tracker)
+
+    # ── run ────────────────────────
+
+    def run(self, frames_dir, frame_files, store, manifest, cache, tracker, emit):
+        """
+        Analyze frame_files and emit(index, result) in frame order.
+        Returns (frames done, captions reused, preprocessors).
+        """
+        import torch
+        from processing.cpu_plan import set_torch_threads
+        from .frame_analyzer import frame_result, frame_timestamp
+
+        self.store, self.cache, self.tracker = store, cache, tracker
+        workers = dict(self.workers)
+        if tracker is not None:
+            workers["ocr"] = 1      # OcrTracker needs every frame after the one before
+
+        # Split the intra-op budget over the model workers that run at the same time
+        model_workers = workers["yolo"] + workers["blip"] + workers["ocr"]
+        threads_before = torch.get_num_threads()
+        budget = max((self.threads or {}).values(), default=0) or threads_before
+        set_torch_threads(max(1, budget // model_workers))
+
+        stages = [Stage(name, func, workers[name], self.queue_size)
+                  for name, func in zip(STAGES, (self._decode, self._detect, self._caption, self._ocr))]
+        results = queue.Queue()     # unbounded: the collector never holds up the last stage
+        started = time.perf_counter()
+        for stage, downstream in zip(stages, stages[1:] + [results]):
+            stage.start(downstream)
+
+        def feed():
+            for index, fname in enumerate(frame_files):
+                _put(stages[0], {"index": index, "file": fname, "path": os.path.join(frames_dir, fname),
+                                 "scores": manifest.get(fname), "busy_s": 0.0})
+            _stop(stages[0])
+
+        threading.Thread(target=feed, name="pipeline-feed", daemon=True).start()
+
+        processed = 0
+        captions_reused = 0
+        try:
+            while True:
+                item = results.get()
+                if item is _STOP:
+                    break
+                item.pop("image", None)
+                fname = item["file"]
+                prefix = f"[{item['index'] + 1}/{len(frame_files)}] {fname}"
+                if "error" in item:
+                    self._collect(item["index"])
+                    print(f"{prefix} → Error: {item['error']}")
+                    continue
+                scores = item["scores"]
+                timestamp = frame_timestamp(item["path"], scores["time_s"] if scores else None)
+                hit = item.get("hit")
+                if hit:
+                    cache.record_hit(hit)
+                    result = frame_result(item["path"], timestamp, hit["objects"], hit["caption"],
+                                          item.get("ocr_text", hit["ocr_text"]))
+                else:
+                    result = frame_result(item["path"], timestamp, item["objects"], item["caption"],
+                                          item["ocr_text"], item.get("reused_from"))
+                    if "caption_reused_from" in result:
+                        captions_reused += 1
+                    elif cache is not None:
+                        cache.record_miss()
+                        cache.store(item["hashes"], result, item["busy_s"], source=item["path"])
+                self._collect(item["index"])
+                emit(item["index"], result)
+                processed += 1
+                reused = f" (cached, distance {hit['distance']})" if hit else ""
+                reused += f" (caption from {item['reused_from']})" if item.get("reused_from") else ""
+                print(f"{prefix} → {result['timestamp']} | {result['caption'][:60]}...{reused}")
+        finally:
+            set_torch_threads(threads_before)
+
+        self.stats = {stage.name: stage.stats(started) for stage in stages}
+        self.print_report(time.perf_counter() - started)
+        annotate(pipeline=self.stats)
+        return processed, captions_reused, self.preps
+
+    def print_report(self, wall):
+        print(f"Pipeline stages ({wall:.1f}s):")
+        for name, s in self.stats.items():
+            print(f"  {name:<7} {s['workers']} worker(s)  busy {s['busy_s']:>7.2f}s  "
+                  f"utilization {s['utilization']:>4.0%}  queue avg {s['queue_avg']:.1f} / max {s['queue_max']}")
+        bottleneck = max(self.stats, key=lambda name: self.stats[name]["utilization"])
+        print(f"  Bottleneck: {bottleneck}")
+
+
+# ────────────────────────────────
+if __name__ == "__main__":
+    # Quick check with stand-in models: two BLIP workers over a few dozen frames
+    # whose change scores let most captions carry forward must neither hang nor
+    # reorder frames, and caption states must not pile up.
+    import sys
+    import random
+    import tempfile
+
+    import cv2
+    import numpy as np
+
+    from . import frame_analyzer
+
+    def work(result):
+        def run(*args, **kwargs):
+            time.sleep(random.uniform(0, 0.01))
+            return result
+        return run
+
+    frame_analyzer.detect_objects = work("person (0.90)")
+    frame_analyzer.caption_frame = work("a person talking")
+    frame_analyzer.frame_text = work("")
+
+    with tempfile.TemporaryDirectory() as frames_dir:
+        frame_files = []
+        manifest = {}
+        for i in range(36):
+            name = f"frame_{i:04d}.jpg"
+            cv2.imwrite(os.path.join(frames_dir, name), np.full((32, 32, 3), i * 7, np.uint8))
+            frame_files.append(name)
+            ssim = 0.5 if i % 5 == 0 else 0.95
+            manifest[name] = {"time_s": i * 0.5, "ssim": ssim, "hist_diff": 0.1}
+
+        emitted = []
+        run = FramePipeline((None, None, None, None), {"blip": 2}, carry_settings=(0.80, 1.0, 3))
+        thread = threading.Thread(target=run.run, daemon=True,
+                                  args=(frames_dir, frame_files, None, manifest, None, None,
+                                        lambda index, result: emitted.append(index)))
+        thread.start()
+        thread.join(60)
+        if thread.is_alive():
+            print(f"❌ Hung after {len(emitted)} of {len(frame_files)} frames")
+            sys.exit(1)
+        assert emitted == list(range(len(frame_files))), emitted
+        # Nothing piles up
+        assert len(run._settled) + len(run._unread) <= 1, (run._settled, run._unread)
+        print(f"✅ {len(emitted)} frames in order with 2 BLIP workers")
@@ -0,0 +1,162 @@
+"""
+Single-decode preprocessing shared by YOLO, BLIP and OCR.
+
+Each keyframe is decoded once (`decode`), or not at all when it comes from a
+raw keyframe store (a view of the mapped file), and every model's input is
+built from that one BGR buffer:
+
+    yolo_input  letterboxed 640×640 RGB float tensor (BCHW, 0–1), so YOLO
+                doesn't read and decode the file again
+    blip_input  BLIP pixel_values (resized, rescaled, normalized with the
+                processor's mean/std), so BLIP skips PIL and its image processor
+    gray        full-resolution grayscale, shared by the text gate and the
+                OCR tracker; EasyOCR still reads color crops of the text regions
+
+The intermediate arrays are allocated once per frame size and reused for
+every following frame. Tensors returned by one call are overwritten by the
+next, so use them before preprocessing another frame; concurrent workers
+(pipeline.py) each use their own FramePreprocessor. `stats()` counts decodes
+and buffer allocations per run.
+"""
+
+import os
+import time
+
+import cv2
+import numpy as np
+
+YOLO_SIZE = 640
+LETTERBOX_FILL = 114
+# BLIP defaults (Salesforce/blip-image-captioning-*), used when the processor doesn't say
+BLIP_SIZE = 384
+BLIP_MEAN = (0.48145466, 0.4578275, 0.40821073)
+BLIP_STD = (0.26862954, 0.26130258, 0.27577711)
+
+
+class FramePreprocessor:
+    def __init__(self, blip_processor=None, yolo_size=YOLO_SIZE):
+        image_processor = getattr(blip_processor, "image_processor", None)
+        size = getattr(image_processor, "size", None) or {}
+        self.blip_size = (size.get("width", BLIP_SIZE), size.get("height", BLIP_SIZE))
+        mean = np.array(getattr(image_processor, "image_mean", None) or BLIP_MEAN, dtype=np.float32)
+        std = np.array(getattr(image_processor, "image_std", None) or BLIP_STD, dtype=np.float32)
+        # (x / 255 - mean) / std  ==  x * scale - offset, per RGB channel
+        self._blip_scale = (1.0 / (255.0 * std)).reshape(3, 1, 1)
+        self._blip_offset = (mean / std).reshape(3, 1, 1)
+        self.yolo_size = yolo_size
+
+        self._buffers = {}
+        self.frames = 0
+        self.decodes = 0
+        self.mapped = 0
+        self.allocations = 0
+        self.allocated_bytes = 0
+        self.seconds = 0.0
+
+    def _buffer(self, name, shape, dtype=np.uint8):
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buf
+            self.allocations += 1
+            self.allocated_bytes += buf.nbytes
+        return buf
+
+    def decode(self, frame_path, store=None):
+        """The frame's only decode; from `store` (a KeyframeStore) if given, else the image file."""
+        start = time.perf_counter()
+        if store is not None:
+            image_bgr = store.frame(os.path.basename(frame_path))
+            if store.encoding == "raw":
+                self.mapped += 1
+            else:
+                self.decodes += 1
+        else:
+            image_bgr = cv2.imread(frame_path)
+            if image_bgr is None:
+                raise ValueError(f"Could not load image: {frame_path}")
+            self.decodes += 1
+        self.frames += 1
+        self.seconds += time.perf_counter() - start
+        return image_bgr
+
+    def yolo_input(self, image_bgr):
+        """Letterboxed yolo_size² RGB float32 tensor (1, 3, S, S) in 0–1."""
+        import torch
+
+        start = time.perf_counter()
+        h, w = image_bgr.shape[:2]
+        s = self.yolo_size
+        scale = min(s / h, s / w)
+        nh, nw = max(1, round(h * scale)), max(1, round(w * scale))
+        top, left = (s - nh) // 2, (s - nw) // 2
+
+        canvas = self._buffer("yolo_canvas", (s, s, 3))
+        canvas.fill(LETTERBOX_FILL)
+        resized = self._buffer("yolo_resized", (nh, nw, 3))
+        cv2.resize(image_bgr, (nw, nh), dst=resized, interpolation=cv2.INTER_LINEAR)
+        canvas[top:top + nh, left:left + nw] = resized
+
+        tensor = self._buffer("yolo_tensor", (1, 3, s, s), np.float32)
+        np.multiply(canvas.transpose(2, 0, 1)[::-1], 1 / 255.0, out=tensor[0])    # BGR → RGB, HWC → CHW
+        self.seconds += time.perf_counter() - start
+        return torch.from_numpy(tensor)
+
+    def blip_input(self, image_bgr):
+        """BLIP pixel_values (1, 3, H, W), as BlipProcessor would produce them."""
+        import torch
+
+        start = time.perf_counter()
+        w, h = self.blip_size
+        resized = self._buffer("blip_resized", (h, w, 3))
+        cv2.resize(image_bgr, (w, h), dst=resized, interpolation=cv2.INTER_CUBIC)
+        tensor = self._buffer("blip_tensor", (1, 3, h, w), np.float32)
+        np.multiply(resized.transpose(2, 0, 1)[::-1], self._blip_scale, out=tensor[0])
+        np.subtract(tensor[0], self._blip_offset, out=tensor[0])
+        self.seconds += time.perf_counter() - start
+        return torch.from_numpy(tensor)
+
+    def gray(self, image_bgr):
+        """Full-resolution grayscale for the text gate and OCR tracker."""
+        start = time.perf_counter()
+        gray = self._buffer("gray", image_bgr.shape[:2])
+        cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY, dst=gray)
+        self.seconds += time.perf_counter() - start
+        return gray
+
+    def stats(self):
+        return combined_stats([self])
+
+
+def combined_stats(preps):
+    """stats() summed over several preprocessors (e.g. one per pipeline worker)."""
+    frames = sum(p.frames for p in preps)
+    decodes = sum(p.decodes for p in preps)
+    return {
+        "frames": frames,
+        "decodes": decodes,
+        "decodes_per_frame": round(decodes / frames, 2) if frames else 0.0,
+        "mapped": sum(p.mapped for p in preps),
+        "buffer_allocations": sum(p.allocations for p in preps),
+        "buffer_mb": round(sum(p.allocated_bytes for p in preps) / 2**20, 1),
+        "preprocess_s": round(sum(p.seconds for p in preps), 3),
+    }
+
+
+# ────────────────────────────────────────────────
+if __name__ == "__main__":
+    # Quick check: buffers are allocated for the first frame only
+    import tempfile
+
+    path = os.path.join(tempfile.mkdtemp(), "frame.jpg")
+    cv2.imwrite(path, np.random.default_rng(0).integers(0, 255, (720, 1280, 3), dtype=np.uint8))
+    prep = FramePreprocessor()
+    for _ in range(10):
+        frame = prep.decode(path)
+        prep.gray(frame)
+        try:
+            prep.yolo_input(frame)
+            prep.blip_input(frame)
+        except ImportError:
+            pass   # torch not installed: only the grayscale path runs
+    print(prep.stats())
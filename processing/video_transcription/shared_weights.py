@@ -0,0 +1,113 @@
+"""
+Model weights shared read-only between frame-analysis worker processes.
+
+Each worker of the analyzer pool (parallel_analyzer.py) used to hold its own
+copy of every model, so memory grew linearly with the worker count. Here the
+parent writes the big state dicts once to cache/shared_weights/, and each
+worker builds the model skeleton without initializing weights, then attaches
+the state dict loaded with torch.load(mmap=True). The tensors are backed by the
+same page-cache pages in every worker. Nothing writes to them (they are
+frozen, and inference is read-only), so they are never copied.
+
+Shared: BLIP (~1 GB in fp32, most of the footprint) and the EasyOCR CRAFT
+detector. Not shared: YOLO nano (a few MB, and conv+bn are fused into new
+tensors on first use) and the EasyOCR recognizer (EasyOCR quantizes it when
+loading on CPU). Only the eager backend shares weights; int8 and ONNX workers
+load their own models.
+
+Note that RSS counts shared pages in every process; PSS / USS (see
+`memory_usage`) show the real footprint.
+"""
+
+import os
+import hashlib
+
+SHARED_DIR = "cache/shared_weights"
+
+
+def _path(kind, model_name, *versions):
+    key = hashlib.sha256(repr((kind, model_name) + versions).encode()).hexdigest()[:12]
+    return os.path.join(SHARED_DIR, f"{kind}_{key}.pt")
+
+
+def shared_paths(blip_model_name, ocr_languages=("en",)):
+    import torch
+    import transformers
+    import easyocr
+
+    return {
+        "blip": _path("blip", blip_model_name, torch.__version__, transformers.__version__),
+        "ocr_detector": _path("ocr_detector", tuple(ocr_languages), torch.__version__, easyocr.__version__),
+    }
+
+
+def _save(state_dict, path):
+    import torch
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    torch.save(state_dict, tmp)
+    os.replace(tmp, path)
+
+
+def prepare_shared_weights(blip_model_name="Salesforce/blip-image-captioning-base", ocr_languages=("en",)):
+    """
+    Write the shareable state dicts once (in the parent) and return their paths.
+    Later calls, and later runs, find the files and load nothing.
+    """
+    paths = shared_paths(blip_model_name, ocr_languages)
+    if not os.path.exists(paths["blip"]):
+        from transformers import BlipForConditionalGeneration
+        print("Writing shared BLIP weights...")
+        _save(BlipForConditionalGeneration.from_pretrained(blip_model_name).state_dict(), paths["blip"])
+    if not os.path.exists(paths["ocr_detector"]):
+        import easyocr
+        print("Writing shared EasyOCR detector weights...")
+        _save(easyocr.Reader(list(ocr_languages), gpu=False, verbose=False).detector.state_dict(),
+              paths["ocr_detector"])
+    return paths
+
+
+def attach(module, path):
+    """Point `module`'s parameters and buffers at the mmap'd state dict in `path` (frozen)."""
+    import torch
+
+    state = torch.load(path, mmap=True, weights_only=True, map_location="cpu")
+    module.load_state_dict(state, assign=True)
+    module.requires_grad_(False)
+    return module.eval()
+
+
+def load_shared_models(paths, yolo_model_name="yolov10n.pt",
+                       blip_model_name="Salesforce/blip-image-captioning-base", ocr_languages=("en",)):
+    """load_models() for a worker: the same tuple, with BLIP and the OCR detector on shared pages."""
+    from ultralytics import YOLO
+    from transformers import BlipConfig, BlipProcessor, BlipForConditionalGeneration
+    from transformers.modeling_utils import no_init_weights
+    import easyocr
+
+    yolo = YOLO(yolo_model_name)
+    processor = BlipProcessor.from_pretrained(blip_model_name)
+    with no_init_weights():
+        model = BlipForConditionalGeneration(BlipConfig.from_pretrained(blip_model_name))
+    model.config._name_or_path = blip_model_name     # as from_pretrained sets it (frame cache key)
+    attach(model, paths["blip"])
+
+    ocr = easyocr.Reader(list(ocr_languages), gpu=False, verbose=False)
+    attach(ocr.detector, paths["ocr_detector"])   # the private copy is freed here
+    return yolo, processor, model, ocr
+
+
+def memory_usage(pid="self"):
+    """{"rss", "pss", "uss"} of a process in MB, from /proc/<pid>/smaps_rollup (Linux)."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": round(fields.get("Rss", 0) / 1024, 1),
+        "pss": round(fields.get("Pss", 0) / 1024, 1),
+        "uss": round((fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)) / 1024, 1),
+    }
@@ -0,0 +1,240 @@
+"""
+Cheap text-presence gate and region-cropped OCR.
+
+EasyOCR's `readtext` runs its CRAFT detector over the whole frame and then
+recognizes every detection. Most keyframes contain no text at all, and the
+ones that do usually carry it in a few small bands (burned-in captions,
+titles). `find_text_regions` looks for text-like structure on a thumbnail —
+several glyph-sized stroke components lined up on one baseline — in a few
+milliseconds. Frames without candidates skip OCR entirely. The others are OCR'd
+only inside their (padded) candidate regions.
+
+Burned-in captions and titles usually stay put across several keyframes.
+`OcrTracker` keeps the previous frame's regions with their pixels and text;
+a region whose pixels are unchanged reuses the previous recognition, and only
+new or changed regions are recognized.
+"""
+
+import cv2
+import numpy as np
+
+THUMB_WIDTH = 480
+MIN_EDGE = 40              # gradient magnitude below this is texture / compression noise
+MIN_CHAR_HEIGHT = 5        # px on the thumbnail
+MAX_CHAR_HEIGHT_FRAC = 0.15  # of the thumbnail height; taller blobs are shapes, not glyphs
+MAX_CHAR_ASPECT = 8        # w / h; glyphs of one word may touch, shape edges are much longer
+MIN_FILL, MAX_FILL = 0.1, 0.9
+LINE_LENGTH = 30           # straight edges at least this long (px) are outlines, not strokes
+MIN_CHARS_PER_LINE = 3     # a line needs at least this many aligned glyphs
+PAD_FRAC = 0.35            # vertical padding around each region, relative to its height
+PAD_X_FRAC = 1.0           # horizontal padding: about one glyph, for end glyphs lost to touching edges
+
+
+def find_text_regions(image_bgr, thumb_width=THUMB_WIDTH, with_cores=False, gray=None):
+    """
+    Candidate text regions as (x, y, w, h) boxes in full-resolution pixels,
+    top to bottom. An empty list means "no text here".
+    with_cores: return (padded box, tight box around the glyphs) pairs instead
+    gray: the frame's grayscale, if the caller already has it (see preprocess.py)
+    """
+    height, width = image_bgr.shape[:2]
+    scale = min(1.0, thumb_width / width)
+    if gray is None:
+        gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
+    if scale < 1.0:
+        gray = cv2.resize(gray, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    th, tw = gray.shape
+
+    # Strokes: morphological gradient with a fixed threshold, so the same glyphs
+    # binarize the same way whatever else is in the frame
+    grad = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    edges = np.where(grad >= MIN_EDGE, 255, 0).astype(np.uint8)
+
+    # Cut long straight outlines (caption bands, shapes) so glyphs that touch them stay separate
+    for kernel in ((LINE_LENGTH, 1), (1, LINE_LENGTH)):
+        lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, kernel))
+        edges[lines > 0] = 0
+
+    # Glyph-sized components; long shape outlines and big blobs drop out here
+    _, _, stats, _ = cv2.connectedComponentsWithStats(edges, connectivity=8)
+    x, y, w, h, area = stats[1:].T
+    fill = area / np.maximum(w * h, 1)
+    keep = ((h >= MIN_CHAR_HEIGHT) & (h <= MAX_CHAR_HEIGHT_FRAC * th) & (w <= MAX_CHAR_ASPECT * h)
+            & (fill >= MIN_FILL) & (fill <= MAX_FILL))
+    glyphs = stats[1:][keep][:, :4]
+    if len(glyphs) < MIN_CHARS_PER_LINE:
+        return []
+
+    boxes = []
+    for gx, gy, gw, gh, count in _group_lines(glyphs):
+        if count < MIN_CHARS_PER_LINE:
+            continue
+        pad_x, pad_y = int(PAD_X_FRAC * gh) + 2, int(PAD_FRAC * gh) + 2
+        x0, y0 = max(0, gx - pad_x), max(0, gy - pad_y)
+        x1, y1 = min(tw, gx + gw + pad_x), min(th, gy + gh + pad_y)
+        boxes.append(((x0, y0, x1, y1), (gx, gy, gx + gw, gy + gh)))
+
+    # Pieces of one line (split by an obstacle) and overlapping paddings become one region
+    merged = []
+    for box, core in sorted(boxes):
+        for i, (other, other_core) in enumerate(merged):
+            gap = max(box[3] - box[1], other[3] - other[1])
+            if (box[0] <= other[2] + gap and other[0] <= box[2] + gap
+                    and box[1] <= other[3] and other[1] <= box[3]):
+                merged[i] = (_union(box, other), _union(core, other_core))
+                break
+        else:
+            merged.append((box, core))
+
+    def to_full(b):
+        x0, y0, x1, y1 = b
+        return (int(x0 / scale), int(y0 / scale), int((x1 - x0) / scale), int((y1 - y0) / scale))
+
+    regions = sorted(((to_full(box), to_full(core)) for box, core in merged), key=lambda r: (r[0][1], r[0][0]))
+    return regions if with_cores else [box for box, _ in regions]
+
+
+def _union(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def _group_lines(glyphs):
+    """
+    Union glyphs that sit on the same baseline with similar heights and small
+    gaps. Returns (x, y, w, h, glyph count) per line.
+    """
+    n = len(glyphs)
+    x, y, w, h = (glyphs[:, i].astype(np.float32) for i in range(4))
+    cy = y + h / 2
+    hmax = np.maximum(h[:, None], h[None, :])
+    gap = np.maximum(x[:, None], x[None, :]) - np.minimum((x + w)[:, None], (x + w)[None, :])
+    linked = ((np.abs(cy[:, None] - cy[None, :]) < 0.5 * hmax)
+              & (np.maximum(h[:, None], h[None, :]) < 2 * np.minimum(h[:, None], h[None, :]))
+              & (gap < 1.5 * hmax))
+
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in zip(*np.nonzero(np.triu(linked, 1))):
+        parent[find(i)] = find(j)
+
+    lines = {}
+    for i in range(n):
+        root = find(i)
+        x0, y0, x1, y1, count = lines.get(root, (x[i], y[i], x[i] + w[i], y[i] + h[i], 0))
+        lines[root] = (min(x0, x[i]), min(y0, y[i]), max(x1, x[i] + w[i]), max(y1, y[i] + h[i]), count + 1)
+    return [(int(x0), int(y0), int(x1 - x0), int(y1 - y0), count) for x0, y0, x1, y1, count in lines.values()]
+
+
+def ocr_regions(ocr_reader, image_bgr, boxes):
+    """OCR only inside `boxes`; returns the texts in reading order (like readtext(detail=0))."""
+    texts = []
+    for x, y, w, h in boxes:
+        crop = image_bgr[y:y + h, x:x + w]
+        texts.extend(ocr_reader.readtext(crop, detail=0, paragraph=False))
+    return texts
+
+
+def read_text(ocr_reader, image_bgr, mode="regions", tracker=None, gray=None):
+    """
+    OCR a frame. mode='full' is plain readtext on the whole frame; 'regions'
+    gates on find_text_regions and reads only the candidate regions, reusing
+    unchanged regions of the previous frame when given an OcrTracker.
+    gray: the frame's grayscale, shared by the gate and the tracker
+    """
+    if mode == "full":
+        return ocr_reader.readtext(image_bgr, detail=0, paragraph=False)
+    if mode != "regions":
+        raise ValueError(f"Unknown OCR mode: {mode} (use 'full' or 'regions')")
+    if tracker is not None:
+        return tracker.read(ocr_reader, image_bgr, find_text_regions(image_bgr, with_cores=True, gray=gray),
+                            gray=gray)
+    boxes = find_text_regions(image_bgr, gray=gray)
+    return ocr_regions(ocr_reader, image_bgr, boxes) if boxes else []
+
+
+# ── temporal reuse ────────────────────────────────────────────────────────
+
+MIN_IOU = 0.6              # a region "is the same" as last frame's if the boxes overlap this much
+CHANGE_LEVEL = 40          # gray-level difference that counts as a changed pixel
+MAX_CHANGED_FRACTION = 0.003  # more changed pixels than this → re-recognize
+
+
+def _iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    return inter / float(aw * ah + bw * bh - inter) if inter else 0.0
+
+
+def _crop_gray(image_bgr, box, gray=None):
+    x, y, w, h = box
+    if gray is not None:
+        return gray[y:y + h, x:x + w]
+    return cv2.cvtColor(image_bgr[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY)
+
+
+class OcrTracker:
+    """
+    Carries text regions from one keyframe to the next (frames must be fed in
+    timestamp order). A region is compared on its tight glyph box, so a caption
+    band that stays put is reused even when the scene behind it changes.
+    Counts recognized vs reused regions for the run report.
+    """
+
+    def __init__(self):
+        self.previous = []     # [(box, core, gray core crop, texts)]
+        self.recognized = 0
+        self.reused = 0
+        self.textless_frames = 0
+
+    def _unchanged(self, image_bgr, box, gray=None):
+        """(box, core, texts) of last frame's region if it has the same glyph pixels now, else None."""
+        height, width = image_bgr.shape[:2]
+        for prev_box, prev_core, prev_crop, texts in self.previous:
+            if _iou(box, prev_box) < MIN_IOU:
+                continue
+            x, y, w, h = prev_core
+            if x + w > width or y + h > height:
+                continue
+            diff = cv2.absdiff(_crop_gray(image_bgr, prev_core, gray), prev_crop)
+            if np.count_nonzero(diff > CHANGE_LEVEL) <= MAX_CHANGED_FRACTION * diff.size:
+                return prev_box, prev_core, texts
+        return None
+
+    def read(self, ocr_reader, image_bgr, regions, gray=None):
+        """OCR `regions` ((box, core) pairs from find_text_regions), reusing unchanged ones."""
+        if not regions:
+            self.textless_frames += 1
+        texts = []
+        current = []
+        for box, core in regions:
+            match = self._unchanged(image_bgr, box, gray)
+            if match is not None:
+                # keep the previous boxes so the comparison stays pixel-aligned next frame
+                box, core, region_texts = match
+                self.reused += 1
+            else:
+                region_texts = ocr_regions(ocr_reader, image_bgr, [box])
+                self.recognized += 1
+            # copied: a shared gray buffer is overwritten by the next frame
+            current.append((box, core, _crop_gray(image_bgr, core, gray).copy(), region_texts))
+            texts.extend(region_texts)
+        self.previous = current
+        return texts
+
+    def stats(self):
+        total = self.recognized + self.reused
+        return {
+            "regions_recognized": self.recognized,
+            "regions_reused": self.reused,
+            "reuse_rate": round(self.reused / total, 3) if total else 0.0,
+            "textless_frames": self.textless_frames,
+        }
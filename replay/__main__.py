@@ -0,0 +1,105 @@
+"""
+End-to-end record / replay harness for download → refinement_process → generate_summary.
+
+Record once, with network access:
+    python -m replay record "https://www.instagram.com/reel/<code>/" --bundle fixtures/<name>
+
+Replay anywhere (CI, air-gapped), with injected latency:
+    python -m replay replay --bundle fixtures/<name>                       # recorded latencies
+    python -m replay replay --bundle fixtures/<name> --latency none        # no network delay
+    python -m replay replay --bundle fixtures/<name> --latency fixed:0.5 --latency-scale 2
+
+Every run is traced (see tracing.py), so stage timings land in artifacts/traces.
+"""
+
+import sys
+import argparse
+
+from retention import clear_workspace
+from tracing import span, start_run, end_run, print_summary
+from .fixtures import FixtureBundle
+from .layer import LatencyModel, ReplaySummarizer, install, record_summarizer
+
+TRANSCRIPTION_PATH = "./artifacts/transcription.txt"
+FRAMES_PATH = "./artifacts/refined_frames.jsonl"
+METADATA_PATH = "./ingestion/metadata.json"
+
+
+def run_pipeline(url, summarizer, mode, skip_refine=False):
+    from downloadRes.download import download
+
+    start_run()
+    with span("pipeline", replay=mode):
+        if not skip_refine:
+            clear_workspace()
+        with span("download"):
+            download(url)
+        if not skip_refine:
+            from processing.registry import refinement_process
+            with span("refine"):
+                refinement_process()
+        with span("summarize"):
+            summary = summarizer.generate_summary(
+                TRANSCRIPTION_PATH, FRAMES_PATH, METADATA_PATH, mode="auto"
+            )
+    end_run()
+    print_summary()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m replay", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    record = sub.add_parser("record", help="run live and capture network responses into a bundle")
+    record.add_argument("url")
+    record.add_argument("--bundle", required=True)
+    record.add_argument("--backend", help="summarizer backend (default: SUMMARIZER_BACKEND or gemini)")
+
+    replay = sub.add_parser("replay", help="run offline from a recorded bundle")
+    replay.add_argument("--bundle", required=True)
+    replay.add_argument("--latency", default="recorded", help="recorded | none | fixed:<seconds>")
+    replay.add_argument("--latency-scale", type=float, default=1.0)
+    replay.add_argument("--jitter", type=float, default=0.0, help="±fraction of random latency noise")
+    replay.add_argument("--seed", type=int, default=0)
+    replay.add_argument("--strict", action="store_true", help="fail on prompts that were never recorded")
+    replay.add_argument("--skip-refine", action="store_true",
+                        help="only replay download + summarize (reuses existing artifacts)")
+    replay.add_argument("--storage-dir", default="./artifacts/replay_summaries",
+                        help="where replayed summaries are written (keeps ./storage clean)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        import os
+        from summarization.backends import get_summarizer
+
+        bundle = FixtureBundle(args.bundle)
+        backend = (args.backend or os.getenv("SUMMARIZER_BACKEND", "gemini")).lower()
+        restore = install(bundle, "record")
+        try:
+            summarizer = record_summarizer(get_summarizer(backend), bundle, backend)
+            run_pipeline(args.url, summarizer, "record")
+        finally:
+            restore()
+            bundle.save()
+        print(f"\n📼 Recorded {len(bundle.data['metadata'])} metadata, {len(bundle.data['downloads'])} "
+              f"downloads and {len(bundle.data['llm'])} LLM responses into {args.bundle}")
+        return 0
+
+    bundle = FixtureBundle.open_existing(args.bundle)
+    latency = LatencyModel(args.latency, scale=args.latency_scale, jitter=args.jitter, seed=args.seed)
+    restore = install(bundle, "replay", latency)
+    try:
+        summarizer = ReplaySummarizer(bundle, latency, strict=args.strict)
+        summarizer.storage_dir = args.storage_dir
+        run_pipeline(bundle.data["url"], summarizer, "replay", skip_refine=args.skip_refine)
+    finally:
+        restore()
+    print(f"\n📼 Replayed LLM calls: {summarizer.hits} hits, {summarizer.misses} misses")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
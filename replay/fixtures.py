@@ -0,0 +1,112 @@
+"""
+Fixture bundles for offline record/replay.
+
+A bundle is a directory:
+
+    <bundle>/
+      bundle.json      # recorded calls + their latencies
+      media/           # downloaded videos, named by content hash
+
+bundle.json holds one entry per recorded call:
+    "metadata":  {shortcode: {"metadata": {...}, "video_url": ..., "latency_s": ...}}
+    "downloads": {video_url: {"file": "media/<sha>.mp4", "bytes": ..., "latency_s": ...}}
+    "llm":       {sha256(prompt): {"text": ..., "latency_s": ...}}
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+
+BUNDLE_FILE = "bundle.json"
+SCHEMA_VERSION = 1
+
+
+def prompt_key(prompt):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FixtureBundle:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = {
+            "schema": SCHEMA_VERSION,
+            "url": None,
+            "backend": None,
+            "metadata": {},
+            "downloads": {},
+            "llm": {},
+        }
+        bundle_file = os.path.join(path, BUNDLE_FILE)
+        if os.path.exists(bundle_file):
+            with open(bundle_file, encoding="utf-8") as f:
+                self.data.update(json.load(f))
+
+    @classmethod
+    def open_existing(cls, path):
+        if not os.path.exists(os.path.join(path, BUNDLE_FILE)):
+            raise FileNotFoundError(f"No fixture bundle at {path} (missing {BUNDLE_FILE}).")
+        return cls(path)
+
+    def save(self):
+        """Write bundle.json atomically."""
+        os.makedirs(self.path, exist_ok=True)
+        tmp = os.path.join(self.path, BUNDLE_FILE + ".tmp")
+        with self._lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, os.path.join(self.path, BUNDLE_FILE))
+
+    # ── metadata ──────────────────────────────────────────────
+    def put_metadata(self, key, metadata, video_url, latency_s):
+        with self._lock:
+            self.data["metadata"][key] = {"metadata": metadata, "video_url": video_url, "latency_s": latency_s}
+
+    def get_metadata(self, key):
+        entry = self.data["metadata"].get(key)
+        if entry is None:
+            raise KeyError(f"No recorded metadata for '{key}' in {self.path}")
+        return entry
+
+    # ── video downloads ───────────────────────────────────────
+    def put_download(self, url, source_file, latency_s):
+        media_dir = os.path.join(self.path, "media")
+        os.makedirs(media_dir, exist_ok=True)
+        name = _file_sha256(source_file)[:16] + os.path.splitext(source_file)[1]
+        target = os.path.join(media_dir, name)
+        if not os.path.exists(target):
+            shutil.copyfile(source_file, target)
+        with self._lock:
+            self.data["downloads"][url] = {
+                "file": os.path.join("media", name),
+                "bytes": os.path.getsize(target),
+                "latency_s": latency_s,
+            }
+
+    def get_download(self, url):
+        entry = self.data["downloads"].get(url)
+        if entry is None:
+            raise KeyError(f"No recorded download for '{url}' in {self.path}")
+        return dict(entry, file=os.path.join(self.path, entry["file"]))
+
+    # ── LLM responses ─────────────────────────────────────────
+    def put_llm(self, prompt, text, latency_s):
+        with self._lock:
+            self.data["llm"][prompt_key(prompt)] = {"text": text, "latency_s": latency_s}
+
+    def get_llm(self, prompt):
+        return self.data["llm"].get(prompt_key(prompt))
+
+    def median_llm_latency(self):
+        latencies = sorted(e["latency_s"] for e in self.data["llm"].values())
+        return latencies[len(latencies) // 2] if latencies else 0.0
@@ -0,0 +1,180 @@
+"""
+Record / replay wrappers for the three network-bound calls of the pipeline:
+`extract_metadata` (instaloader), `downloadVideo` (CDN) and the summarizer's
+LLM call (Gemini or Ollama).
+
+Record mode runs the real call and stores its result and latency in a
+FixtureBundle. Replay mode serves the stored result after an injected delay
+chosen by a LatencyModel, so the full pipeline runs with no network at all.
+"""
+
+import os
+import re
+import json
+import time
+import random
+import shutil
+import threading
+
+import downloadRes.reel.downloadReel as download_reel
+from summarization.base import BaseReelSummarizer
+from .fixtures import prompt_key
+
+METADATA_PATH = "ingestion/metadata.json"
+
+# backend name → module holding that backend's ReelSummarizer (for its prompt)
+BACKEND_MODULES = {
+    "gemini": "summarization.gemini_summarizer",
+    "ollama": "summarization.reel_summarizer",
+}
+
+
+def _shortcode(url):
+    match = re.search(r'instagram\.com/(?:[^/]+/)?(?:reels?|p)/([^/?]+)', url)
+    return match.group(1) if match else url
+
+
+class LatencyModel:
+    """
+    How long a replayed call should take:
+      'recorded'  → the latency measured while recording (× scale)
+      'none'      → return immediately
+      'fixed:<s>' → always <s> seconds (× scale)
+    `jitter` adds ±fraction noise from a seeded RNG so runs stay reproducible.
+    """
+
+    def __init__(self, spec="recorded", scale=1.0, jitter=0.0, seed=0):
+        self.mode, _, value = spec.partition(":")
+        if self.mode not in ("recorded", "none", "fixed"):
+            raise ValueError(f"Unknown latency spec: {spec} (use recorded, none or fixed:<seconds>)")
+        self.fixed = float(value) if self.mode == "fixed" else None
+        self.scale = scale
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, recorded_s):
+        if self.mode == "none":
+            return 0.0
+        base = self.fixed if self.mode == "fixed" else (recorded_s or 0.0)
+        with self._lock:
+            noise = 1.0 + self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 1.0
+        return max(0.0, base * self.scale * noise)
+
+    def sleep(self, recorded_s):
+        seconds = self.delay(recorded_s)
+        if seconds:
+            time.sleep(seconds)
+        return seconds
+
+
+# ── Download wrappers ─────────────────────────────────────────────────────
+
+def install(bundle, mode, latency=None):
+    """
+    Swap the download functions used by DownloadReel for recording or replaying
+    versions. Returns a function that restores the originals.
+    """
+    original_metadata = download_reel.extract_metadata
+    original_video = download_reel.downloadVideo
+    latency = latency or LatencyModel()
+
+    if mode == "record":
+        def extract_metadata(url, output_path=METADATA_PATH):
+            start = time.perf_counter()
+            video_url = original_metadata(url, output_path)
+            elapsed = time.perf_counter() - start
+            with open(output_path, encoding="utf-8") as f:
+                metadata = json.load(f)
+            bundle.data["url"] = url
+            bundle.put_metadata(_shortcode(url), metadata, video_url, elapsed)
+            bundle.save()
+            return video_url
+
+        def downloadVideo(url, filename):
+            start = time.perf_counter()
+            original_video(url, filename)
+            bundle.put_download(url, filename, time.perf_counter() - start)
+            bundle.save()
+
+    elif mode == "replay":
+        def extract_metadata(url, output_path=METADATA_PATH):
+            entry = bundle.get_metadata(_shortcode(url))
+            latency.sleep(entry["latency_s"])
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            with open(output_path, "w") as f:
+                json.dump(entry["metadata"], f, indent=2)
+            return entry["video_url"]
+
+        def downloadVideo(url, filename):
+            entry = bundle.get_download(url)
+            latency.sleep(entry["latency_s"])
+            shutil.copyfile(entry["file"], filename)
+            print(f"Video downloaded: {filename} (replayed)")
+
+    else:
+        raise ValueError(f"Unknown replay mode: {mode}")
+
+    download_reel.extract_metadata = extract_metadata
+    download_reel.downloadVideo = downloadVideo
+
+    def restore():
+        download_reel.extract_metadata = original_metadata
+        download_reel.downloadVideo = original_video
+    return restore
+
+
+# ── Summarizer wrappers ───────────────────────────────────────────────────
+
+def record_summarizer(summarizer, bundle, backend):
+    """Wrap a real summarizer so every LLM call (map, reduce or single) is recorded."""
+    real_generate = summarizer._generate
+    bundle.data["backend"] = backend
+
+    def _generate(prompt):
+        start = time.perf_counter()
+        text = real_generate(prompt)
+        bundle.put_llm(prompt, text, time.perf_counter() - start)
+        bundle.save()
+        return text
+
+    summarizer._generate = _generate
+    return summarizer
+
+
+class ReplaySummarizer(BaseReelSummarizer):
+    """
+    Offline stand-in for the recorded backend's ReelSummarizer. It builds the
+    same prompts, so prompts from an unchanged pipeline hit the recorded
+    responses. If a prompt was never recorded (e.g. refinement settings
+    changed), it either raises (strict) or returns a placeholder after the
+    bundle's median LLM latency.
+    """
+
+    backend_name = "Replay"
+
+    def __init__(self, bundle, latency=None, strict=False):
+        import importlib
+
+        backend = bundle.data.get("backend") or "gemini"
+        self._backend_class = importlib.import_module(BACKEND_MODULES[backend]).ReelSummarizer
+        self.bundle = bundle
+        self.latency = latency or LatencyModel()
+        self.strict = strict
+        self.hits = 0
+        self.misses = 0
+
+    def _build_prompt(self, metadata, transcript, frames_data):
+        return self._backend_class._build_prompt(self, metadata, transcript, frames_data)
+
+    def _generate(self, prompt):
+        entry = self.bundle.get_llm(prompt)
+        if entry is None:
+            if self.strict:
+                raise KeyError(f"No recorded LLM response for prompt {prompt_key(prompt)[:12]}")
+            self.misses += 1
+            self.latency.sleep(self.bundle.median_llm_latency())
+            return f"[replay] No recorded response for prompt {prompt_key(prompt)[:12]}."
+        self.hits += 1
+        self.latency.sleep(entry["latency_s"])
+        return entry["text"]
@@ -0,0 +1,329 @@
+"""
+Size-bounded retention of pipeline artifacts.
+
+Every job keeps its downloaded video and audio, keyframes and intermediate
+JSON in jobs/<id>/. Instead of deleting a whole tree at once, the artifacts are
+tracked in cache/retention.db with their size and when they were last used:
+
+    touch(path, root)   register or refresh an artifact (a stage wrote or reused it)
+    pin(job, workdir)   nothing under workdir is evicted while the job is in flight
+    enforce()           evict least-recently-used, unpinned artifacts until the
+                        total fits the quota (RETENTION_QUOTA_GB, default 20)
+    discard(path)       drop one artifact or a whole job directory now
+
+Deleting never blocks the caller: the path is moved into cache/trash/ (so it is
+gone from the tree at once and can be written again) and removed by a
+background thread. Trash left behind by a killed process is removed by the next
+one. An evicted artifact is simply produced again: job checkpoints and the stage
+DAG both re-run a stage whose outputs are missing.
+
+    python -m retention show
+    python -m retention enforce --quota-gb 5
+    python -m retention clear            # the ./ingestion + ./artifacts workspace, before a fresh run
+"""
+
+import os
+import sys
+import glob
+import time
+import uuid
+import queue
+import atexit
+import shutil
+import socket
+import sqlite3
+import argparse
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_PATH = "cache/retention.db"
+TRASH_DIR = "cache/trash"
+DEFAULT_QUOTA_GB = 20
+
+# What a fresh run in the shared workspace starts without (python main.py download / refine)
+WORKSPACE_PATHS = [
+    "ingestion/audio.mp3",
+    "ingestion/metadata.json",
+    "ingestion/video.mp4",
+    "ingestion/post",
+    "artifacts/video_frames",
+    "artifacts/transcription.txt",
+    "artifacts/transcription_segments.json",
+    "artifacts/refined_frames.jsonl",
+    "artifacts/stage_cache.json",
+    "artifacts/post_images.jsonl",
+    "artifacts/budget_plan.json",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    path       TEXT PRIMARY KEY,
+    root       TEXT,              -- the job's workdir, NULL for the workspace
+    kind       TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    last_used  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_lru ON artifacts (last_used);
+CREATE TABLE IF NOT EXISTS pins (
+    workdir    TEXT NOT NULL,
+    job        TEXT,
+    holder     TEXT NOT NULL,     -- <host>:<pid>, a pin dies with its process
+    since      REAL NOT NULL,
+    PRIMARY KEY (workdir, holder)
+);
+"""
+
+
+def _abs(path):
+    return os.path.normpath(os.path.abspath(path))
+
+
+def _under(path, root):
+    return path == root or path.startswith(root + os.sep)
+
+
+def disk_size(path):
+    """Bytes used by a file, or by everything below a directory."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass    # removed while walking
+    return total
+
+
+def artifact_kind(path):
+    """video | audio | frames | json | text | other"""
+    name = os.path.basename(path)
+    ext = os.path.splitext(name)[1].lower()
+    if ext in (".mp4", ".mov", ".webm"):
+        return "video"
+    if ext in (".mp3", ".wav", ".m4a"):
+        return "audio"
+    if ext in (".jpg", ".jpeg", ".png") or name.endswith("_frames") or name == "images":
+        return "frames"
+    if ext in (".json", ".jsonl"):
+        return "json"
+    if ext == ".txt":
+        return "text"
+    return "other"
+
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class RetentionManager:
+    """LRU index of artifacts on disk with a quota, job pins and background deletion."""
+
+    def __init__(self, db_path=DB_PATH, quota_bytes=None, trash_dir=TRASH_DIR):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        if quota_bytes is None:
+            quota_bytes = float(os.getenv("RETENTION_QUOTA_GB", DEFAULT_QUOTA_GB)) * 1024 ** 3
+        self.quota_bytes = int(quota_bytes)
+        self.trash_dir = trash_dir
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._trash = queue.Queue()
+        self._deleter = None
+        # Left behind by a process that was killed mid-delete
+        for path in glob.glob(os.path.join(trash_dir, "*")):
+            self._schedule(path)
+
+    # ── tracking ──────────────────────────────────────────────
+    def touch(self, path, root=None):
+        """Register path (or refresh its size and last use). Missing paths are ignored."""
+        if not os.path.exists(path):
+            return
+        path = _abs(path)
+        size = disk_size(path)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO artifacts (path, root, kind, size, last_used) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(path) DO UPDATE SET root = excluded.root, size = excluded.size,"
+                " last_used = excluded.last_used",
+                (path, _abs(root) if root else None, artifact_kind(path), size, time.time())
+            )
+
+    def touch_all(self, paths, root=None):
+        for path in paths:
+            self.touch(path, root)
+
+    def artifacts(self):
+        """Tracked artifacts, least recently used first."""
+        with self._lock:
+            return [dict(row) for row in self._db.execute("SELECT * FROM artifacts ORDER BY last_used")]
+
+    def usage(self):
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+
+    # ── pins ──────────────────────────────────────────────────
+    def pin(self, job_id, workdir):
+        """Protect everything under workdir from eviction until unpin() (or this process exits)."""
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO pins (workdir, job, holder, since) VALUES (?, ?, ?, ?)",
+                             (_abs(workdir), job_id, self.holder, time.time()))
+
+    def unpin(self, workdir):
+        with self._lock:
+            self._db.execute("DELETE FROM pins WHERE workdir = ? AND holder = ?", (_abs(workdir), self.holder))
+
+    def pinned(self):
+        """Workdirs pinned by live processes; pins of dead ones are dropped."""
+        from service.job_queue import _owner_alive
+
+        with self._lock:
+            rows = [dict(row) for row in self._db.execute("SELECT * FROM pins")]
+            stale = [row for row in rows if not _owner_alive(row["holder"])]
+            for row in stale:
+                self._db.execute("DELETE FROM pins WHERE workdir = ? AND holder = ?", (row["workdir"], row["holder"]))
+        return {row["workdir"] for row in rows if row not in stale}
+
+    # ── eviction ──────────────────────────────────────────────
+    def discard(self, path):
+        """Untrack path (and anything tracked below it) and delete it in the background."""
+        path = _abs(path)
+        with self._lock:
+            prefix = path + os.sep
+            self._db.execute("DELETE FROM artifacts WHERE path = ? OR substr(path, 1, ?) = ?",
+                             (path, len(prefix), prefix))
+        if not os.path.lexists(path):
+            return
+        os.makedirs(self.trash_dir, exist_ok=True)
+        trash = os.path.join(self.trash_dir, f"{uuid.uuid4().hex[:8]}-{os.path.basename(path)}")
+        try:
+            os.replace(path, trash)     # out of the tree at once, so it can be re-created right away
+        except OSError:
+            trash = path                # another filesystem: delete in place
+        self._schedule(trash)
+
+    def enforce(self, quota_bytes=None):
+        """Evict least-recently-used unpinned artifacts until the total fits the quota. Returns the evicted rows."""
+        quota = self.quota_bytes if quota_bytes is None else quota_bytes
+        rows = self.artifacts()
+        with self._lock:
+            for row in [row for row in rows if not os.path.exists(row["path"])]:
+                self._db.execute("DELETE FROM artifacts WHERE path = ?", (row["path"],))   # deleted by hand
+                rows.remove(row)
+        total = sum(row["size"] for row in rows)
+        if total <= quota:
+            return []
+
+        pins = self.pinned()
+        evicted = []
+        for row in rows:
+            if total <= quota:
+                break
+            if any(_under(row["path"], workdir) for workdir in pins):
+                continue
+            self.discard(row["path"])
+            total -= row["size"]
+            evicted.append(row)
+
+        # A job directory with nothing tracked left goes as a whole (checkpoints, stage cache, ...)
+        remaining = {row["root"] for row in self.artifacts()}
+        for root in {row["root"] for row in evicted if row["root"]} - remaining:
+            if not any(_under(root, workdir) for workdir in pins):
+                self.discard(root)
+        if evicted:
+            freed = sum(row["size"] for row in evicted)
+            print(f"🧹 Evicted {len(evicted)} artifact(s), {freed / 1024 ** 2:.1f} MB "
+                  f"({total / 1024 ** 2:.1f} MB of {quota / 1024 ** 2:.1f} MB in use)")
+        return evicted
+
+    # ── background deletion ───────────────────────────────────
+    def _schedule(self, path):
+        with self._lock:
+            if self._deleter is None:
+                self._deleter = threading.Thread(target=self._delete_loop, name="retention-deleter", daemon=True)
+                self._deleter.start()
+        self._trash.put(path)
+
+    def _delete_loop(self):
+        while True:
+            path = self._trash.get()
+            try:
+                _remove(path)
+            finally:
+                self._trash.task_done()
+
+    def drain(self):
+        """Wait until every scheduled deletion has finished."""
+        self._trash.join()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_manager():
+    """The process-wide RetentionManager; pending deletions finish before the process exits."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = RetentionManager()
+            atexit.register(_manager.drain)
+        return _manager
+
+
+def clear_workspace():
+    """Clear ./ingestion and ./artifacts for a fresh run; the files are deleted in the background."""
+    manager = get_manager()
+    paths = WORKSPACE_PATHS + glob.glob("artifacts/item_*")   # per-item artifacts of a post
+    for path in paths:
+        if os.path.exists(path):
+            manager.discard(path)
+            print(f"Removed: {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show or enforce the artifact retention quota.")
+    parser.add_argument("--db", default=DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("show", help="tracked artifacts, least recently used first")
+    enforce = sub.add_parser("enforce", help="evict least-recently-used artifacts down to the quota")
+    enforce.add_argument("--quota-gb", type=float, help="default: RETENTION_QUOTA_GB or 20")
+    sub.add_parser("clear", help="clear the ./ingestion + ./artifacts workspace")
+    args = parser.parse_args(argv)
+
+    if args.command == "clear":
+        clear_workspace()
+        get_manager().drain()
+        return 0
+
+    manager = RetentionManager(args.db)
+    if args.command == "enforce":
+        quota = None if args.quota_gb is None else int(args.quota_gb * 1024 ** 3)
+        if not manager.enforce(quota):
+            print("Within quota, nothing to evict.")
+        manager.drain()
+        return 0
+
+    pins = manager.pinned()
+    for row in manager.artifacts():
+        used = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["last_used"]))
+        pinned = " 📌" if any(_under(row["path"], workdir) for workdir in pins) else ""
+        print(f"{used}  {row['size'] / 1024 ** 2:9.1f} MB  {row['kind']:<6}  {os.path.relpath(row['path'])}{pinned}")
+    print(f"{manager.usage() / 1024 ** 2:.1f} MB of {manager.quota_bytes / 1024 ** 2:.1f} MB quota in use")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
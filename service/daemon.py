@@ -0,0 +1,238 @@
+"""
+Long-running SocialArchive service with warm models and a local job API.
+
+Models (Whisper, YOLO, BLIP, EasyOCR) and the summarizer are loaded once at
+startup and stay resident, so each job only pays for its own work. Jobs are
+stored in a durable SQLite queue (service/job_queue.py) and run by
+`concurrency` workers (service/worker.py) through the ingest → transcribe →
+extract_frames → analyze_frames → summarize stages, each job in its own working
+directory (jobs/<id>/ingestion, jobs/<id>/artifacts). Finished stages are
+checkpointed, so after a crash or restart a job resumes from its last finished
+stage; failed stages are retried with backoff and poison jobs end up 'dead'.
+Finished jobs' directories stay until the retention quota (retention.py)
+evicts their least recently used artifacts.
+Shared models are serialized by processing.model_cache locks, so one job's
+frame analysis overlaps with another job's download, transcription or summary.
+
+API (JSON over HTTP on 127.0.0.1, or over a Unix socket):
+    GET  /health          → service status, loaded models, job counts, artifact disk usage
+    POST /jobs            → {"url": "..."} or {"video_path": "/abs/local.mp4"}
+                            optional: "summarize" (default true), "mode" (default "auto"),
+                            "budget_s" + "budget_kind" ("wall" | "cpu"): fit model tiers to a budget
+    GET  /jobs            → all jobs
+    GET  /jobs/<id>       → one job: status, stage, attempts, checkpointed stages, result / error
+    POST /jobs/<id>/retry → move a dead job back to the queue
+
+    python main.py serve --port 8765 --concurrency 2
+    curl -X POST localhost:8765/jobs -d '{"url": "https://www.instagram.com/reel/<code>/"}'
+"""
+
+import os
+import json
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from processing import cpu_plan
+from retention import get_manager
+from tracing import span
+from .job_queue import DB_PATH, DEFAULT_MAX_ATTEMPTS, JobQueue
+from .worker import Worker
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_CONCURRENCY = 2
+DEFAULT_MAX_PENDING = 100
+JOBS_DIR = "jobs"
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobManager:
+    """Accepts jobs into the durable queue and runs them on `concurrency` worker threads."""
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, max_pending=DEFAULT_MAX_PENDING,
+                 jobs_dir=JOBS_DIR, summarizer_backend=None, db_path=DB_PATH,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.jobs_dir = jobs_dir
+        self.max_pending = max_pending
+        self.summarizer_backend = summarizer_backend
+        self.concurrency = concurrency
+        cpu_plan.configure(concurrent_jobs=concurrency)
+        self.queue = JobQueue(db_path, max_attempts=max_attempts)
+        self._summarizer = None
+        self._lock = threading.Lock()
+        self._workers = [Worker(self.queue, self.get_summarizer, name=f"job-{i}") for i in range(concurrency)]
+        self._threads = []
+
+    # ── startup ───────────────────────────────────────────────
+    def warm_up(self, summarizer=True):
+        from processing.model_cache import warm_up
+        from processing.registry import FRAME_ANALYSIS_PARAMS
+
+        with span("warm_up"):
+            warm_up(backend=FRAME_ANALYSIS_PARAMS["backend"])
+            if summarizer:
+                self.get_summarizer()
+
+    def get_summarizer(self):
+        with self._lock:
+            if self._summarizer is None:
+                from summarization.backends import get_summarizer
+                self._summarizer = get_summarizer(self.summarizer_backend)
+            return self._summarizer
+
+    def start(self):
+        """Resume jobs left over by a previous run, then start the workers."""
+        stale = self.queue.recover()
+        if stale:
+            print(f"♻️ Resuming {len(stale)} interrupted job(s): {', '.join(stale)}")
+        get_manager().enforce()     # the quota may have shrunk since the last run
+        for worker in self._workers:
+            thread = threading.Thread(target=worker.run_forever, name=worker.id, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    # ── jobs ──────────────────────────────────────────────────
+    def submit(self, request):
+        url = request.get("url")
+        video_path = request.get("video_path")
+        if bool(url) == bool(video_path):
+            raise ValueError("Provide exactly one of 'url' or 'video_path'.")
+        if video_path and not os.path.isfile(video_path):
+            raise ValueError(f"video_path not found: {video_path}")
+
+        with self._lock:
+            counts = self.queue.counts()
+            pending = counts.get("queued", 0) + counts.get("running", 0)
+            if pending >= self.max_pending:
+                raise QueueFullError(f"{pending} jobs pending; try again later.")
+
+            return self.queue.enqueue(
+                url or os.path.abspath(video_path),
+                source_type="url" if url else "video_path",
+                options={"summarize": bool(request.get("summarize", True)),
+                         "mode": request.get("mode", "auto"),
+                         "budget_s": request.get("budget_s"),
+                         "budget_kind": request.get("budget_kind", "wall")},
+                jobs_dir=self.jobs_dir
+            )
+
+    def get(self, job_id):
+        return self.queue.get(job_id)
+
+    def list(self):
+        return self.queue.list()
+
+    def retry(self, job_id):
+        return self.queue.retry(job_id)
+
+    def shutdown(self, timeout=5):
+        """Stop the workers; jobs they can't finish in time resume on the next start."""
+        for worker in self._workers:
+            worker.stop()
+        for worker, thread in zip(self._workers, self._threads):
+            thread.join(timeout)
+            if thread.is_alive() and worker.current:
+                # Interrupted by the shutdown, not the job's fault: keep its attempt count
+                self.queue.release(worker.current, worker.id)
+
+
+# ── HTTP API ──────────────────────────────────────────────────────────────
+
+class _Handler(BaseHTTPRequestHandler):
+    manager = None   # set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, indent=2).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        from processing.model_cache import loaded_models
+
+        if self.path == "/health":
+            retention = get_manager()
+            self._send(200, {"status": "ok", "models": loaded_models(),
+                             "concurrency": self.manager.concurrency, "jobs": self.manager.queue.counts(),
+                             "cpu_layout": cpu_plan.describe(cpu_plan.get_layout()),
+                             "disk": {"used_bytes": retention.usage(), "quota_bytes": retention.quota_bytes}})
+        elif self.path == "/jobs":
+            self._send(200, {"jobs": self.manager.list()})
+        elif self.path.startswith("/jobs/"):
+            job = self.manager.get(self.path[len("/jobs/"):])
+            if job is None:
+                self._send(404, {"error": "job not found"})
+            else:
+                self._send(200, job)
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path.startswith("/jobs/") and self.path.endswith("/retry"):
+            job_id = self.path[len("/jobs/"):-len("/retry")]
+            if self.manager.retry(job_id):
+                self._send(202, self.manager.get(job_id))
+            else:
+                self._send(404, {"error": "no dead or finished job with that id"})
+            return
+        if self.path != "/jobs":
+            self._send(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            job = self.manager.submit(request)
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send(400, {"error": str(e)})
+        except QueueFullError as e:
+            self._send(503, {"error": str(e)})
+        else:
+            self._send(202, job)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("local", 0)   # BaseHTTPRequestHandler expects (host, port)
+
+
+def make_server(manager, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    handler = type("Handler", (_Handler,), {"manager": manager})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return _UnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, concurrency=DEFAULT_CONCURRENCY,
+          warm=True, summarizer_backend=None, db_path=DB_PATH):
+    manager = JobManager(concurrency=concurrency, summarizer_backend=summarizer_backend, db_path=db_path)
+    if warm:
+        print("🔥 Loading models...")
+        manager.warm_up()
+    manager.start()
+
+    server = make_server(manager, host, port, socket_path)
+    where = socket_path or f"http://{host}:{port}"
+    print(f"✅ SocialArchive service listening on {where} (concurrency={concurrency})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        server.server_close()
+        manager.shutdown()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
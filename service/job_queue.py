@@ -0,0 +1,345 @@
+"""
+Durable, crash-resumable job queue backed by SQLite.
+
+Every job is a row in `jobs`; every finished stage of a job is a row in
+`stages` with the paths of the artifacts it wrote. A worker claims a job with a
+lease, runs the stages that are not checkpointed yet (service/worker.py), and
+renews the lease while it works. If the process dies, the lease runs out (or
+`recover()` notices the owning process is gone) and the next worker resumes the
+job from its last finished stage.
+
+A failed stage is retried with exponential backoff; once a job has failed
+`max_attempts` times on the same stage it is moved to the dead-letter state
+('dead') and stays there until retried by hand.
+
+    python -m service.job_queue list [--status dead]
+    python -m service.job_queue show <id>
+    python -m service.job_queue retry <id>
+    python -m service.job_queue enqueue <url>
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import argparse
+import threading
+
+DB_PATH = "jobs/queue.db"
+DEFAULT_MAX_ATTEMPTS = 3
+BACKOFF_BASE_S = 5        # 5s, 10s, 20s, ... between attempts of a stage
+BACKOFF_MAX_S = 300
+LEASE_S = 120             # a worker that stops heartbeating for this long is presumed dead
+
+# queued → running → done
+#            │  ↑
+#            ↓  │ (stage failed, retry after backoff)
+#           queued ... → dead (max_attempts reached)
+STATUSES = ("queued", "running", "done", "dead")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    source      TEXT NOT NULL,
+    source_type TEXT NOT NULL,
+    options     TEXT NOT NULL DEFAULT '{}',
+    status      TEXT NOT NULL DEFAULT 'queued',
+    stage       TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    next_run_at REAL NOT NULL DEFAULT 0,
+    locked_by   TEXT,
+    lease_until REAL,
+    error       TEXT,
+    workdir     TEXT,
+    result      TEXT,
+    created     REAL NOT NULL,
+    updated     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, next_run_at);
+CREATE TABLE IF NOT EXISTS stages (
+    job_id      TEXT NOT NULL,
+    stage       TEXT NOT NULL,
+    artifacts   TEXT NOT NULL,
+    attempts    INTEGER NOT NULL,
+    duration_s  REAL,
+    completed   REAL NOT NULL,
+    PRIMARY KEY (job_id, stage)
+);
+"""
+
+
+def worker_id(name="worker"):
+    """Identifies the claiming thread: <host>:<pid>:<name>."""
+    return f"{socket.gethostname()}:{os.getpid()}:{name}"
+
+
+def backoff_seconds(attempts):
+    return min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** max(0, attempts - 1))
+
+
+def _owner_alive(locked_by):
+    """False only if the owner ran on this host and its process no longer exists."""
+    host, _, rest = (locked_by or "").partition(":")
+    pid = rest.partition(":")[0]
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobQueue:
+    """SQLite job table with leases, stage checkpoints, backoff and a dead-letter state."""
+
+    def __init__(self, db_path=DB_PATH, max_attempts=DEFAULT_MAX_ATTEMPTS, lease_s=LEASE_S):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.lease_s = lease_s
+        self._lock = threading.Lock()
+        # Autocommit; writes that read-then-update use BEGIN IMMEDIATE so two
+        # processes sharing the file can't claim the same job.
+        self._db = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def _write(self, func):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return result
+
+    def _row(self, row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["options"] = json.loads(job["options"] or "{}")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    # ── producers ─────────────────────────────────────────────
+    def enqueue(self, source, source_type="url", options=None, workdir=None, jobs_dir="jobs"):
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        workdir = workdir or os.path.join(jobs_dir, job_id)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, source, source_type, options, workdir, created, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, source, source_type, json.dumps(options or {}), workdir, now, now)
+            )
+        return self.get(job_id)
+
+    def retry(self, job_id):
+        """Move a dead (or done) job back to the queue; finished stages stay checkpointed."""
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, next_run_at = 0, error = NULL,"
+                " updated = ? WHERE id = ? AND status IN ('dead', 'done')",
+                (time.time(), job_id)
+            )
+        return cur.rowcount == 1
+
+    # ── workers ───────────────────────────────────────────────
+    def claim(self, owner, job_id=None):
+        """
+        Lease the oldest runnable job (or `job_id`) to `owner`. Jobs whose
+        worker's lease ran out count that crash as a failed attempt.
+        """
+        def claim_tx(db):
+            now = time.time()
+            query = ("SELECT * FROM jobs WHERE ((status = 'queued' AND next_run_at <= ?)"
+                     " OR (status = 'running' AND lease_until < ?))")
+            params = [now, now]
+            if job_id:
+                query += " AND id = ?"
+                params.append(job_id)
+            for row in db.execute(query + " ORDER BY created", params).fetchall():
+                attempts = row["attempts"]
+                if row["status"] == "running":
+                    attempts += 1
+                    if attempts >= self.max_attempts:
+                        db.execute(
+                            "UPDATE jobs SET status = 'dead', attempts = ?, locked_by = NULL,"
+                            " lease_until = NULL, error = ?, updated = ? WHERE id = ?",
+                            (attempts, f"worker {row['locked_by']} died during '{row['stage']}'", now, row["id"])
+                        )
+                        continue
+                db.execute(
+                    "UPDATE jobs SET status = 'running', attempts = ?, locked_by = ?, lease_until = ?,"
+                    " updated = ? WHERE id = ?",
+                    (attempts, owner, now + self.lease_s, now, row["id"])
+                )
+                return row["id"]
+            return None
+
+        claimed = self._write(claim_tx)
+        return self.get(claimed) if claimed else None
+
+    def heartbeat(self, job_id, owner):
+        """Extend the lease; False if the job is no longer ours."""
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET lease_until = ?, updated = ? WHERE id = ? AND locked_by = ? AND status = 'running'",
+                (time.time() + self.lease_s, time.time(), job_id, owner)
+            )
+        return cur.rowcount == 1
+
+    def start_stage(self, job_id, stage):
+        with self._lock:
+            self._db.execute("UPDATE jobs SET stage = ?, updated = ? WHERE id = ?", (stage, time.time(), job_id))
+
+    def complete_stage(self, job_id, stage, artifacts, duration_s=None):
+        """Checkpoint a finished stage; the next stage starts with a fresh attempt count."""
+        def complete_tx(db):
+            attempts = db.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+            db.execute(
+                "INSERT OR REPLACE INTO stages (job_id, stage, artifacts, attempts, duration_s, completed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, stage, json.dumps(artifacts), attempts + 1, duration_s, time.time())
+            )
+            db.execute("UPDATE jobs SET attempts = 0, updated = ? WHERE id = ?", (time.time(), job_id))
+        self._write(complete_tx)
+
+    def invalidate_stage(self, job_id, stage):
+        """Forget a checkpoint (e.g. its artifacts were deleted)."""
+        with self._lock:
+            self._db.execute("DELETE FROM stages WHERE job_id = ? AND stage = ?", (job_id, stage))
+
+    def completed_stages(self, job_id):
+        """{stage: artifacts} of every checkpointed stage."""
+        with self._lock:
+            rows = self._db.execute("SELECT stage, artifacts FROM stages WHERE job_id = ?", (job_id,)).fetchall()
+        return {row["stage"]: json.loads(row["artifacts"]) for row in rows}
+
+    def fail_stage(self, job_id, stage, error):
+        """
+        Record a failed attempt. Returns 'queued' (retry after backoff) or
+        'dead' (max_attempts reached).
+        """
+        def fail_tx(db):
+            attempts = db.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()[0] + 1
+            now = time.time()
+            status = "dead" if attempts >= self.max_attempts else "queued"
+            next_run_at = now + backoff_seconds(attempts) if status == "queued" else 0
+            db.execute(
+                "UPDATE jobs SET status = ?, stage = ?, attempts = ?, next_run_at = ?, locked_by = NULL,"
+                " lease_until = NULL, error = ?, updated = ? WHERE id = ?",
+                (status, stage, attempts, next_run_at, error, now, job_id)
+            )
+            return status
+        return self._write(fail_tx)
+
+    def finish(self, job_id, result):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'done', stage = NULL, locked_by = NULL, lease_until = NULL,"
+                " error = NULL, result = ?, updated = ? WHERE id = ?",
+                (json.dumps(result), time.time(), job_id)
+            )
+
+    def release(self, job_id, owner):
+        """Give a job back without counting an attempt (clean shutdown)."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'queued', locked_by = NULL, lease_until = NULL, updated = ?"
+                " WHERE id = ? AND locked_by = ? AND status = 'running'",
+                (time.time(), job_id, owner)
+            )
+
+    def recover(self):
+        """
+        On startup: expire the leases of jobs whose worker process on this host
+        is gone, so they are resumed right away instead of after LEASE_S.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT id, locked_by FROM jobs WHERE status = 'running'").fetchall()
+            stale = [row["id"] for row in rows if not _owner_alive(row["locked_by"])]
+            for job_id in stale:
+                self._db.execute("UPDATE jobs SET lease_until = 0 WHERE id = ?", (job_id,))
+        return stale
+
+    # ── inspection ────────────────────────────────────────────
+    def get(self, job_id):
+        with self._lock:
+            job = self._row(self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+            if job is None:
+                return None
+            rows = self._db.execute(
+                "SELECT stage, artifacts, attempts, duration_s FROM stages WHERE job_id = ? ORDER BY completed",
+                (job_id,)
+            ).fetchall()
+        job["stages"] = {
+            row["stage"]: {"artifacts": json.loads(row["artifacts"]), "attempts": row["attempts"],
+                           "duration_s": row["duration_s"]}
+            for row in rows
+        }
+        return job
+
+    def list(self, status=None):
+        query, params = "SELECT * FROM jobs", ()
+        if status:
+            query, params = query + " WHERE status = ?", (status,)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY created", params).fetchall()
+        return [self._row(row) for row in rows]
+
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: n for status, n in rows}
+
+    def next_run_at(self, job_id=None):
+        """Earliest time a queued job becomes runnable (None if nothing is waiting)."""
+        query, params = "SELECT MIN(next_run_at) FROM jobs WHERE status = 'queued'", ()
+        if job_id:
+            query, params = query + " AND id = ?", (job_id,)
+        with self._lock:
+            return self._db.execute(query, params).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and manage the SocialArchive job queue.")
+    parser.add_argument("--db", default=DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_list = sub.add_parser("list")
+    p_list.add_argument("--status", choices=STATUSES)
+    sub.add_parser("show").add_argument("job_id")
+    sub.add_parser("retry").add_argument("job_id")
+    sub.add_parser("enqueue").add_argument("url")
+    args = parser.parse_args(argv)
+
+    queue = JobQueue(args.db)
+    if args.command == "list":
+        for job in queue.list(args.status):
+            stage = job["stage"] or "-"
+            print(f"{job['id']}  {job['status']:<8} {stage:<15} attempts={job['attempts']}  {job['source']}")
+            if job["status"] == "dead":
+                print(f"    {job['error']}")
+    elif args.command == "show":
+        job = queue.get(args.job_id)
+        print(json.dumps(job, indent=2) if job else f"No job {args.job_id}")
+    elif args.command == "retry":
+        print("Requeued." if queue.retry(args.job_id) else f"No dead/done job {args.job_id}")
+    elif args.command == "enqueue":
+        print(queue.enqueue(args.url)["id"])
+
+
+if __name__ == "__main__":
+    main()
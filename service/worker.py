@@ -0,0 +1,267 @@
+"""
+Runs queued jobs stage by stage, checkpointing each finished stage.
+
+    ingest → transcribe → extract_frames → analyze_frames → summarize
+
+Posts run through the same stages: each refinement stage covers every
+carousel item (processing/post.py) and writes the same merged artifacts.
+
+Every stage writes into the job's own directory (jobs/<id>/ingestion,
+jobs/<id>/artifacts) and returns the paths it wrote. A stage that is already
+checkpointed and whose artifacts still exist is skipped, so a resumed job
+continues where it stopped. Once a stage has to run again, every later stage
+runs again too, since its inputs may have changed.
+
+The job's workdir is pinned in the retention index (retention.py) while the
+job is in flight, and every stage's artifacts are registered there with their
+size; after each job the least recently used ones are evicted down to the quota.
+"""
+
+import os
+import json
+import time
+import shutil
+import threading
+
+from retention import get_manager
+from tracing import span
+from .job_queue import worker_id
+
+POLL_S = 1.0
+HEARTBEAT_S = 30
+
+
+# ── stages ────────────────────────────────────────────────────────────────
+
+def _ingest_local_video(video_path, ingestion_dir):
+    """Local MP4 jobs: copy the file in, extract its audio, write minimal metadata."""
+    from downloadRes.reel.audio import downloadAudio
+
+    target = os.path.join(ingestion_dir, "video.mp4")
+    shutil.copyfile(video_path, target)
+    downloadAudio(target, ingestion_dir)
+    with open(os.path.join(ingestion_dir, "metadata.json"), "w") as f:
+        json.dump({"source": video_path}, f, indent=2)
+
+
+def ingest_stage(job, ingestion_dir, artifacts_dir):
+    from downloadRes.download import download
+    from processing.post import load_post
+
+    os.makedirs(ingestion_dir, exist_ok=True)
+    if job["source_type"] == "url":
+        download(job["source"], ingestion_dir)
+    else:
+        _ingest_local_video(job["source"], ingestion_dir)
+
+    post = load_post(ingestion_dir)
+    if post is not None:
+        # Posts: every carousel item instead of one video + audio (see processing/post.py)
+        artifacts = {f"item_{item['index']:02d}": os.path.join(ingestion_dir, item["file"]) for item in post["items"]}
+        artifacts["metadata"] = os.path.join(ingestion_dir, "metadata.json")
+    else:
+        artifacts = {
+            "video": os.path.join(ingestion_dir, "video.mp4"),
+            "audio": os.path.join(ingestion_dir, "audio.mp3"),
+            "metadata": os.path.join(ingestion_dir, "metadata.json"),
+        }
+    missing = [path for path in artifacts.values() if not os.path.exists(path)]
+    if missing:
+        raise FileNotFoundError(f"Ingestion did not produce {', '.join(missing)}")
+    return artifacts
+
+
+def _refinement_stage(name):
+    # Memoized: a re-run after a later stage failed reuses outputs whose inputs didn't change
+    def run(job, ingestion_dir, artifacts_dir):
+        from processing.registry import run_stage
+        from processing.post import load_post
+
+        budget_s = job["options"].get("budget_s")
+        if budget_s is not None and load_post(ingestion_dir) is None:
+            # Model tiers planned once per job to fit its latency budget (processing/budget.py)
+            from processing.budget import run_budgeted_stage
+            return run_budgeted_stage(name, ingestion_dir, artifacts_dir, budget_s,
+                                      job["options"].get("budget_kind", "wall"))
+        return run_stage(name, ingestion_dir, artifacts_dir)
+    return run
+
+
+def _artifacts_exist(artifacts):
+    return all(os.path.exists(path) for path in artifacts.values())
+
+
+class Worker:
+    """
+    Claims jobs from a JobQueue and runs them. `get_summarizer` returns the
+    (shared) summarizer used by the summarize stage.
+    """
+
+    def __init__(self, queue, get_summarizer=None, name="worker", poll_s=POLL_S, heartbeat_s=HEARTBEAT_S,
+                 retention=None):
+        self.queue = queue
+        self.retention = retention or get_manager()
+        self.id = worker_id(name)
+        self.poll_s = poll_s
+        self.heartbeat_s = heartbeat_s
+        self._get_summarizer = get_summarizer or _default_summarizer
+        self._stop = threading.Event()
+        self.current = None   # id of the job being processed
+        self.stages = [
+            ("ingest", ingest_stage),
+            ("transcribe", _refinement_stage("transcribe")),
+            ("extract_frames", _refinement_stage("extract_frames")),
+            ("analyze_frames", _refinement_stage("analyze_frames")),
+            ("summarize", self.summarize_stage),
+        ]
+
+    def summarize_stage(self, job, ingestion_dir, artifacts_dir):
+        options = job["options"]
+        if not options.get("summarize", True):
+            return {}
+        summary = self._get_summarizer().generate_summary(
+            os.path.join(artifacts_dir, "transcription.txt"),
+            os.path.join(artifacts_dir, "refined_frames.jsonl"),
+            os.path.join(ingestion_dir, "metadata.json"),
+            mode=options.get("mode", "auto"),
+            raise_errors=True
+        )
+        summary_path = os.path.join(artifacts_dir, "summary.txt")
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write(summary)
+        return {"summary": summary_path}
+
+    # ── loops ─────────────────────────────────────────────────
+    def stop(self):
+        self._stop.set()
+
+    def run_forever(self):
+        """Service loop: process jobs until stop() is called."""
+        while not self._stop.is_set():
+            job = self.queue.claim(self.id)
+            if job is None:
+                self._stop.wait(self.poll_s)
+                continue
+            self.process(job)
+
+    def run_until_empty(self):
+        """Process every runnable job, waiting out backoffs. Returns the ids it worked on."""
+        processed = []
+        while not self._stop.is_set():
+            job = self.queue.claim(self.id)
+            if job is not None:
+                if job["id"] not in processed:
+                    processed.append(job["id"])
+                self.process(job)
+                continue
+            next_run_at = self.queue.next_run_at()
+            if next_run_at is None:
+                break
+            self._stop.wait(max(self.poll_s, next_run_at - time.time()))
+        return processed
+
+    def run_job(self, job_id):
+        """Run one job to completion (done or dead), including its retries."""
+        while not self._stop.is_set():
+            job = self.queue.get(job_id)
+            if job is None or job["status"] in ("done", "dead"):
+                return job
+            job = self.queue.claim(self.id, job_id)
+            if job is not None:
+                self.process(job)
+                continue
+            next_run_at = self.queue.next_run_at(job_id) or time.time() + self.poll_s
+            wait = max(self.poll_s, next_run_at - time.time())
+            print(f"⏳ Job {job_id} retrying in {wait:.0f}s...")
+            self._stop.wait(wait)
+        return self.queue.get(job_id)
+
+    # ── one job ───────────────────────────────────────────────
+    def process(self, job):
+        """Run the job's remaining stages. Returns its new status."""
+        job_id = job["id"]
+        ingestion_dir = os.path.join(job["workdir"], "ingestion")
+        artifacts_dir = os.path.join(job["workdir"], "artifacts")
+        checkpoints = self.queue.completed_stages(job_id)
+        artifacts = {}
+        rerun = False
+        status = "running"
+
+        lost = threading.Event()
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(self.heartbeat_s):
+                if not self.queue.heartbeat(job_id, self.id):
+                    lost.set()
+                    return
+
+        beat = threading.Thread(target=heartbeat, name=f"heartbeat-{job_id}", daemon=True)
+        beat.start()
+        self.current = job_id
+        self.retention.pin(job_id, job["workdir"])
+        try:
+            with span("job", job=job_id):
+                for name, func in self.stages:
+                    if lost.is_set():
+                        print(f"⚠️ Lost the lease on job {job_id}; another worker took it over.")
+                        status = "lost"
+                        return status
+                    if self._stop.is_set():
+                        self.queue.release(job_id, self.id)
+                        status = "queued"
+                        return status
+
+                    if not rerun and name in checkpoints and _artifacts_exist(checkpoints[name]):
+                        print(f"⏭️ Job {job_id}: '{name}' already done, skipping.")
+                        self.retention.touch_all(checkpoints[name].values(), job["workdir"])
+                        artifacts.update(checkpoints[name])
+                        continue
+                    rerun = True
+
+                    self.queue.start_stage(job_id, name)
+                    start = time.perf_counter()
+                    try:
+                        with span(name, job=job_id):
+                            stage_artifacts = func(job, ingestion_dir, artifacts_dir)
+                    except Exception as e:
+                        status = self.queue.fail_stage(job_id, name, f"{type(e).__name__}: {e}")
+                        verdict = "moved to dead-letter" if status == "dead" else "will retry"
+                        print(f"❌ Job {job_id} failed in '{name}' ({verdict}): {e}")
+                        return status
+
+                    self.queue.complete_stage(job_id, name, stage_artifacts, round(time.perf_counter() - start, 3))
+                    self.retention.touch_all(stage_artifacts.values(), job["workdir"])
+                    artifacts.update(stage_artifacts)
+
+            result = {"artifacts": artifacts, "summary": None}
+            if "summary" in artifacts:
+                with open(artifacts["summary"], encoding="utf-8") as f:
+                    result["summary"] = f.read()
+            self.queue.finish(job_id, result)
+            print(f"✅ Job {job_id} done.")
+            status = "done"
+            return status
+        except KeyboardInterrupt:
+            # Interrupted by the user, not the job's fault: keep its attempt count
+            self.queue.release(job_id, self.id)
+            status = "queued"
+            raise
+        finally:
+            done.set()
+            self.current = None
+            if status != "queued":
+                # A job waiting for its retry stays pinned; everything else is evictable now
+                self.retention.unpin(job["workdir"])
+            self.retention.enforce()
+
+
+_summarizer = None
+
+
+def _default_summarizer():
+    global _summarizer
+    if _summarizer is None:
+        from summarization.backends import get_summarizer
+        _summarizer = get_summarizer()
+    return _summarizer
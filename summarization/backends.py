@@ -0,0 +1,34 @@
+import os
+from dotenv import load_dotenv
+
+# Load environment variables from a .env file in project root (if present)
+load_dotenv()
+
+DEFAULT_BACKEND = "gemini"
+DEFAULT_GEMINI_MODEL = "gemini-2.5-flash"
+
+
+def get_summarizer(backend=None, **kwargs):
+    """
+    Return a ReelSummarizer for the configured backend.
+    The backend comes from the argument, else the SUMMARIZER_BACKEND env var:
+      'gemini' → summarization.gemini_summarizer (model: GEMINI_MODEL_NAME)
+      'ollama' → summarization.reel_summarizer   (model: OLLAMA_MODEL)
+      'llava'  → summarization.llava_summarizer  (model: LLAVA_MODEL; local, no server or API)
+    Every backend exposes the same generate_summary(...) interface.
+    """
+    backend = (backend or os.getenv("SUMMARIZER_BACKEND", DEFAULT_BACKEND)).strip().lower()
+
+    # Imported lazily so only the chosen backend's client library is loaded
+    if backend == "gemini":
+        from .gemini_summarizer import ReelSummarizer
+        kwargs.setdefault("model_name", os.getenv("GEMINI_MODEL_NAME", DEFAULT_GEMINI_MODEL))
+    elif backend == "ollama":
+        from .reel_summarizer import ReelSummarizer
+    elif backend == "llava":
+        from .llava_summarizer import DEFAULT_MODEL, ReelSummarizer
+        kwargs.setdefault("model_name", os.getenv("LLAVA_MODEL", DEFAULT_MODEL))
+    else:
+        raise ValueError(f"Unknown summarizer backend: {backend} (expected 'gemini', 'ollama' or 'llava')")
+
+    return ReelSummarizer(**kwargs)
@@ -0,0 +1,124 @@
+import os
+import json
+import time
+
+from .hierarchical import (
+    DEFAULT_MAX_WORKERS,
+    DEFAULT_WINDOW_SECONDS,
+    map_reduce_summary,
+    plan_windows,
+)
+
+
+class BaseReelSummarizer:
+    """
+    Shared behaviour of every summarizer backend: loading the three data files,
+    choosing single-prompt vs map-reduce, and saving the result to ./storage.
+
+    Backends implement `_build_prompt` and `_generate`, so any of them can be
+    used wherever a `ReelSummarizer` is expected.
+    """
+
+    backend_name = "LLM"
+    storage_dir = "./storage"
+
+    def _read_file_content(self, path):
+        """Helper to safely read file content."""
+        if not os.path.exists(path):
+            print(f"⚠️ Warning: File not found at {path}")
+            return "Data not available."
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                if path.endswith('.json'):
+                    return json.load(f) # Return dict/list
+                return f.read() # Return string
+        except Exception as e:
+            return f"Error reading file: {e}"
+
+    def _read_frames(self, path):
+        """The frame analysis as a FrameResults, streamed from disk when the prompt is built."""
+        from processing.video_transcription.frame_results import FrameResults
+
+        if not os.path.exists(path):
+            print(f"⚠️ Warning: File not found at {path}")
+            return "Data not available."
+        return FrameResults(path)
+
+    def _next_reel_filename(self, storage_dir="./storage", prefix="reel", ext=".txt"):
+        """Return next available filename like 'reel1.txt', 'reel2.txt', ..."""
+        try:
+            os.makedirs(storage_dir, exist_ok=True)
+            i = 1
+            while True:
+                candidate = os.path.join(storage_dir, f"{prefix}{i}{ext}")
+                if not os.path.exists(candidate):
+                    return candidate
+                i += 1
+        except Exception:
+            # Fallback to a timestamped file if anything unexpected happens
+            ts = int(time.time())
+            return os.path.join(storage_dir, f"{prefix}_{ts}{ext}")
+
+    def _build_prompt(self, metadata, transcript, frames_data):
+        """Single-prompt version of the summary request."""
+        raise NotImplementedError
+
+    def _generate(self, prompt):
+        """Send one prompt to the backend and return the generated text."""
+        raise NotImplementedError
+
+    def generate_summary(
+        self,
+        transcription_path,
+        frames_path,
+        metadata_path,
+        mode="single",
+        segments_path=None,
+        window_seconds=DEFAULT_WINDOW_SECONDS,
+        max_workers=DEFAULT_MAX_WORKERS,
+        raise_errors=False
+    ):
+        """
+        Reads the three data files and generates a detailed summary.
+        :param mode: 'single' (one prompt), 'hierarchical' (map-reduce over time
+                     windows) or 'auto' (hierarchical only for longer reels).
+        :param segments_path: Timed Whisper segments; defaults to the file next to the transcription.
+        :param raise_errors: Re-raise backend errors instead of returning an error string
+                             (the job queue needs them to schedule a retry).
+        """
+        # 1. Load Data
+        print(f"📂 Loading data from {frames_path}...")
+        transcript = self._read_file_content(transcription_path)
+        frames_data = self._read_frames(frames_path)
+        metadata = self._read_file_content(metadata_path)
+
+        # 2. Construct Prompt
+        prompt = self._build_prompt(metadata, transcript, frames_data)
+
+        # Long reels are summarized window by window (map-reduce)
+        windows = plan_windows(mode, transcription_path, frames_data, segments_path, window_seconds)
+
+        # 3. Generate Content
+        try:
+            print(f"✨ Sending data to {self.backend_name}...")
+            start_time = time.time()
+
+            if windows:
+                summary = map_reduce_summary(self._generate, metadata, windows, max_workers=max_workers)
+            else:
+                summary = self._generate(prompt)
+
+            elapsed = time.time() - start_time
+            print(f"✅ Summary generated in {elapsed:.2f} seconds.")
+
+            out_path = self._next_reel_filename(self.storage_dir)
+            with open(out_path, 'w', encoding='utf-8') as f:
+                f.write(summary)
+            print(f"💾 Summary saved to {out_path}")
+            return summary
+
+        except Exception as e:
+            if raise_errors:
+                raise
+            return f"❌ {self.backend_name} Error: {str(e)}"
@@ -1,7 +1,5 @@
 import os
 from dotenv import load_dotenv
-import google.generativeai as genai
-from google.api_core import retry
 
 # Load environment variables from a .env file in project root (if prese.nt)
 load_dotenv()
@@ -16,6 +14,8 @@ def configure_gemini(api_key=None):
     Sets up the Gemini API client.
     Prioritizes the passed api_key, then looks for GEMINI_API_KEY env var.
     """
+    import google.generativeai as genai  # imported on use: keeps CLI startup light
+
     if not api_key:
         api_key = os.getenv("GEMINI_API_KEY")
     
@@ -32,6 +32,8 @@ def get_gemini_model(model_name=DEFAULT_MODEL):
     """
     Returns a configured GenerativeModel object ready for generation.
     """
+    import google.generativeai as genai
+
     generation_config = {
         "temperature": 1,
         "top_p": 0.95,
@@ -1,12 +1,14 @@
-import os
 import json
-import time
+from .base import BaseReelSummarizer
+from .hierarchical import format_frames
 from .gemini_config import configure_gemini, get_gemini_model
 
 # NOTE: If running this file directly as __main__, you might need to fix imports
 # strictly for the test block at the bottom.
 
-class ReelSummarizer:
+class ReelSummarizer(BaseReelSummarizer):
+    backend_name = "Gemini API"
+
     def __init__(self, api_key=None, model_name="gemini-1.5-flash"):
         """
         Initialize the summarizer.
@@ -16,48 +18,14 @@ class ReelSummarizer:
         configure_gemini(api_key)
         self.model = get_gemini_model(model_name)
 
-    def _read_file_content(self, path):
-        """Helper to safely read file content."""
-        if not os.path.exists(path):
-            print(f"⚠️ Warning: File not found at {path}")
-            return "Data not available."
-        
-        try:
-            with open(path, 'r', encoding='utf-8') as f:
-                if path.endswith('.json'):
-                    return json.load(f) # Return dict/list
-                return f.read() # Return string
-        except Exception as e:
-            return f"Error reading file: {e}"
-
-    def _next_reel_filename(self, storage_dir="./storage", prefix="reel", ext=".txt"):
-        """Return next available filename like 'reel1.txt', 'reel2.txt', ..."""
-        try:
-            os.makedirs(storage_dir, exist_ok=True)
-            i = 1
-            while True:
-                candidate = os.path.join(storage_dir, f"{prefix}{i}{ext}")
-                if not os.path.exists(candidate):
-                    return candidate
-                i += 1
-        except Exception:
-            # Fallback to a timestamped file if anything unexpected happens
-            ts = int(time.time())
-            return os.path.join(storage_dir, f"{prefix}_{ts}{ext}")
-
-    def generate_summary(self, transcription_path, frames_path, metadata_path):
-        """
-        Reads the three data files and generates a detailed summary using Gemini.
-        """
-        # 1. Load Data
-        print(f"📂 Loading data from {frames_path}...")
-        transcript = self._read_file_content(transcription_path)
-        frames_data = self._read_file_content(frames_path)
-        metadata = self._read_file_content(metadata_path)
+    def _generate(self, prompt):
+        """Single Gemini call; used directly and as the map/reduce step."""
+        response = self.model.generate_content(prompt)
+        return response.text
 
-        # 2. Construct Prompt
+    def _build_prompt(self, metadata, transcript, frames_data):
         # Gemini handles large contexts well, so we can dump the JSONs directly.
-        prompt = f"""
+        return f"""
         You are an expert video analyst AI. I have processed an Instagram Reel into three data streams.
         Synthesize these into a highly detailed narrative summary.
 
@@ -70,7 +38,7 @@ class ReelSummarizer:
         {transcript}
 
         3. VISUAL ANALYSIS (Frame-by-Frame Description):
-        {json.dumps(frames_data, indent=2)}
+        {format_frames(frames_data)}
         
         --- END DATA ---
 
@@ -83,25 +51,6 @@ class ReelSummarizer:
         Output the summary in clear, professional markdown.
         """
 
-        # 3. Generate Content
-        try:
-            print("✨ Sending data to Gemini...")
-            start_time = time.time()
-            
-            response = self.model.generate_content(prompt)
-            
-            elapsed = time.time() - start_time
-            print(f"✅ Summary generated in {elapsed:.2f} seconds.")
-            
-            out_path = self._next_reel_filename()
-            with open(out_path, 'w', encoding='utf-8') as f:
-                f.write(response.text)
-            print(f"💾 Summary saved to {out_path}")
-            return response.text
-
-        except Exception as e:
-            return f"❌ Gemini API Error: {str(e)}"
-
 # --- Main block for testing ---
 if __name__ == "__main__":
     # 1. Dummy Data Creation for Testing
@@ -121,7 +70,7 @@ if __name__ == "__main__":
         
         summary = summarizer.generate_summary(
             "./artifacts/transcription.txt",
-            "./artifacts/refined_frames.json",
+            "./artifacts/refined_frames.jsonl",
             "./ingestion/metadata.json"
         )
         
@@ -0,0 +1,243 @@
+"""
+Hierarchical (map-reduce) summarization for long videos.
+
+The reel timeline is cut into fixed-length windows. Each window pairs the
+Whisper segments and analyzed frames that fall inside it and is summarized on
+its own, in parallel. The window summaries are then reduced (in groups if
+there are many of them) into the final narrative.
+
+Backends only need to provide a `generate(prompt) -> str` callable.
+"""
+
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+from tracing import span
+
+DEFAULT_WINDOW_SECONDS = 30
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_REDUCE_FANOUT = 8
+
+
+def parse_timestamp(value):
+    """Convert 'MM:SS' / 'HH:MM:SS' strings or plain numbers to seconds (None if unknown)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    try:
+        seconds = 0.0
+        for part in value.strip().split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds
+    except ValueError:
+        return None
+
+
+def _format_time(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+def format_frames(frames):
+    """Frame records for a prompt, one compact JSON line each (streamed from FrameResults)."""
+    if isinstance(frames, str):
+        return frames       # "Data not available." etc.
+    return "\n".join(json.dumps(frame, ensure_ascii=False) for frame in frames)
+
+
+def _frame_time(frame):
+    return parse_timestamp(frame.get("timestamp")) if isinstance(frame, dict) else None
+
+
+def build_windows(segments, frames, window_seconds=DEFAULT_WINDOW_SECONDS):
+    """
+    Split the timeline into windows of `window_seconds`.
+
+    Segments are assigned by their midpoint, frames by their timestamp.
+    Frames without a usable timestamp are spread over the timeline by position.
+    Empty windows are dropped. Returns a list of dicts:
+        {"start", "end", "segments": [...], "frames": [...]}
+    `frames` is a list or a FrameResults; it is read twice (timeline length,
+    then assignment), each frame going straight into its window.
+    """
+    from processing.video_transcription.frame_results import FrameResults
+
+    segments = segments or []
+    frames = frames if isinstance(frames, (list, FrameResults)) else []
+
+    duration = 0.0
+    frame_count = 0
+    for seg in segments:
+        duration = max(duration, float(seg.get("end", 0.0)))
+    for frame in frames:
+        frame_count += 1
+        t = _frame_time(frame)
+        if t is not None:
+            duration = max(duration, t)
+
+    num_windows = max(1, int(duration // window_seconds) + 1)
+    windows = [
+        {"start": i * window_seconds, "end": (i + 1) * window_seconds, "segments": [], "frames": []}
+        for i in range(num_windows)
+    ]
+
+    for seg in segments:
+        mid = (float(seg.get("start", 0.0)) + float(seg.get("end", 0.0))) / 2
+        idx = min(int(mid // window_seconds), num_windows - 1)
+        windows[idx]["segments"].append(seg)
+
+    for pos, frame in enumerate(frames):
+        t = _frame_time(frame)
+        if t is None:
+            idx = min(pos * num_windows // max(frame_count, 1), num_windows - 1)
+        else:
+            idx = min(int(t // window_seconds), num_windows - 1)
+        windows[idx]["frames"].append(frame)
+
+    return [w for w in windows if w["segments"] or w["frames"]]
+
+
+def default_segments_path(transcription_path):
+    """Segments are written next to the transcription by the refinement process."""
+    return os.path.join(os.path.dirname(transcription_path), "transcription_segments.json")
+
+
+def load_segments(path):
+    """Return the list of timed Whisper segments, or None if unavailable."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            segments = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return segments if isinstance(segments, list) else None
+
+
+def plan_windows(mode, transcription_path, frames_data, segments_path=None,
+                 window_seconds=DEFAULT_WINDOW_SECONDS):
+    """
+    Decide whether to summarize hierarchically.
+
+    mode: 'single'       → always one prompt (returns None)
+          'hierarchical' → always map-reduce when timed segments exist
+          'auto'         → map-reduce only if the reel spans more than one window
+    Returns the list of windows, or None for a single-prompt summary.
+    """
+    if mode == "single":
+        return None
+    if mode not in ("hierarchical", "auto"):
+        raise ValueError(f"Unknown summary mode: {mode}")
+
+    segments = load_segments(segments_path or default_segments_path(transcription_path))
+    if segments is None:
+        print("⚠️ Warning: No timed transcription segments found, using a single prompt.")
+        return None
+
+    windows = build_windows(segments, frames_data, window_seconds)
+    if mode == "auto" and len(windows) <= 1:
+        return None
+    return windows
+
+
+def build_window_prompt(window, metadata, index, total):
+    speech = "\n".join(
+        f"[{_format_time(seg.get('start', 0))}] {seg.get('text', '')}" for seg in window["segments"]
+    ) or "No speech in this part."
+
+    return f"""
+        You are an expert video analyst AI. You are looking at part {index + 1} of {total}
+        of an Instagram Reel, covering {_format_time(window['start'])}–{_format_time(window['end'])}.
+
+        --- START DATA ---
+
+        1. METADATA (Context):
+        {json.dumps(metadata, indent=2)}
+
+        2. AUDIO TRANSCRIPTION (Spoken Content in this part):
+        {speech}
+
+        3. VISUAL ANALYSIS (Frames in this part):
+        {format_frames(window['frames'])}
+
+        --- END DATA ---
+
+        ### INSTRUCTIONS:
+        1. Describe only what happens in this part of the video, in order.
+        2. Correlate what is seen in the frames with what is said.
+        3. Keep specific visual details (objects, on-screen text, colors).
+
+        Output a concise but detailed paragraph in plain markdown.
+        """
+
+
+def build_reduce_prompt(partial_summaries, metadata, final=True):
+    parts = "\n\n".join(
+        f"PART {i + 1}:\n{summary}" for i, summary in enumerate(partial_summaries)
+    )
+    if final:
+        instructions = """1. **Narrate**: Merge the parts into one summary that follows the flow of the video.
+        2. **Detail**: Keep the specific visual details and quotes mentioned in the parts.
+        3. **Context**: Use the metadata to explain the 'why' or the 'vibe' of the video.
+
+        Output the summary in clear, professional markdown."""
+    else:
+        instructions = """1. Merge these consecutive parts into one chronological description.
+        2. Keep every specific visual detail and quote; do not add a conclusion.
+
+        Output a detailed description in plain markdown."""
+
+    return f"""
+        You are an expert video analyst AI. An Instagram Reel was summarized part by part,
+        in chronological order. Combine the parts below.
+
+        --- START DATA ---
+
+        METADATA (Context):
+        {json.dumps(metadata, indent=2)}
+
+        PART SUMMARIES:
+        {parts}
+
+        --- END DATA ---
+
+        ### INSTRUCTIONS:
+        {instructions}
+        """
+
+
+def map_reduce_summary(
+    generate,
+    metadata,
+    windows,
+    max_workers=DEFAULT_MAX_WORKERS,
+    reduce_fanout=DEFAULT_REDUCE_FANOUT
+):
+    """
+    Summarize every window in parallel, then reduce the window summaries.
+    When there are more than `reduce_fanout` summaries they are reduced in
+    groups first, so no single prompt grows with the video length.
+    """
+    total = len(windows)
+    print(f"🧩 Summarizing {total} windows with {max_workers} workers...")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with span("map_windows", windows=total):
+            summaries = list(executor.map(
+                lambda item: generate(build_window_prompt(item[1], metadata, item[0], total)),
+                enumerate(windows)
+            ))
+
+        while len(summaries) > reduce_fanout:
+            groups = [summaries[i:i + reduce_fanout] for i in range(0, len(summaries), reduce_fanout)]
+            print(f"🧩 Reducing {len(summaries)} partial summaries into {len(groups)}...")
+            with span("reduce_partial", groups=len(groups)):
+                summaries = list(executor.map(
+                    lambda group: generate(build_reduce_prompt(group, metadata, final=False)),
+                    groups
+                ))
+
+    print("🧩 Reducing window summaries into the final narrative...")
+    with span("reduce"):
+        return generate(build_reduce_prompt(summaries, metadata, final=True))
@@ -0,0 +1,212 @@
+import os
+import json
+import threading
+
+from .base import BaseReelSummarizer
+from .hierarchical import format_frames
+
+DEFAULT_MODEL = "llava-hf/llava-onevision-qwen2-0.5b-ov-hf"
+DEFAULT_NUM_FRAMES = 8
+DEFAULT_MAX_NEW_TOKENS = 512       # summaries are a few paragraphs; never generate unbounded
+DEFAULT_MAX_PROMPT_TOKENS = 6000   # text part of the prompt; the keyframes add ~200 tokens each
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_llava(model_name=DEFAULT_MODEL, device="cpu"):
+    """(processor, model) loaded on first use and cached for the life of the process."""
+    key = (model_name, device)
+    with _models_lock:
+        if key not in _models:
+            import torch
+            from transformers import AutoProcessor, LlavaOnevisionForConditionalGeneration
+
+            print(f"Loading {model_name}...")
+            processor = AutoProcessor.from_pretrained(model_name)
+            model = LlavaOnevisionForConditionalGeneration.from_pretrained(
+                model_name, torch_dtype=torch.float32, low_cpu_mem_usage=True
+            ).to(device)
+            model.eval()
+            _models[key] = (processor, model)
+        return _models[key]
+
+
+def evenly_spaced(count, num):
+    """`num` indices spread over range(count), first and last included."""
+    if count <= num:
+        return list(range(count))
+    return sorted({round(i * (count - 1) / (num - 1)) for i in range(num)}) if num > 1 else [0]
+
+
+def keyframe_images(frames_dir, num_frames=DEFAULT_NUM_FRAMES):
+    """RGB arrays of `num_frames` keyframes spread over the reel, from the keyframe store or JPEG files."""
+    import cv2
+    from processing.video_frame_extraction.keyframe_store import frame_names, open_store
+
+    if not os.path.isdir(frames_dir):
+        return []
+    names = frame_names(frames_dir)
+    store = open_store(frames_dir)
+    images = []
+    for i in evenly_spaced(len(names), num_frames):
+        if store is not None:
+            image = store.frame(names[i])
+        else:
+            image = cv2.imread(os.path.join(frames_dir, names[i]))
+        if image is not None:
+            images.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    return images
+
+
+def video_images(video_path, num_frames=DEFAULT_NUM_FRAMES):
+    """
+    RGB arrays of `num_frames` frames spread over a video. Seeks to each one;
+    if the container can't seek, decodes once and keeps the wanted indices.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return []
+    wanted = evenly_spaced(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), num_frames)
+    images = []
+    for index in wanted:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ok, frame = cap.read()
+        if not ok:
+            break
+        images.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+    if len(images) == len(wanted):
+        return images
+
+    # Seeking failed: one sequential pass, grabbing (not converting) the frames we skip
+    cap = cv2.VideoCapture(video_path)
+    remaining = set(wanted)
+    images = []
+    index = -1
+    while remaining and cap.grab():
+        index += 1
+        if index in remaining:
+            remaining.discard(index)
+            _, frame = cap.retrieve()
+            images.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+    return images
+
+
+class ReelSummarizer(BaseReelSummarizer):
+    """
+    Fully local backend: LLaVA-OneVision looks at a handful of keyframes
+    together with the transcript and frame analysis. Same interface as the
+    Gemini `ReelSummarizer`.
+
+    The model is loaded on the first summary and cached for the process
+    (get_llava), so a batch of reels loads it once. Frames come from the
+    keyframes extract_frames already wrote (<frames json dir>/video_frames),
+    falling back to a post's images (<metadata dir>/post/images) or to seeking
+    in <metadata dir>/video.mp4. Generation is capped at
+    max_new_tokens, and the text prompt at max_prompt_tokens.
+    """
+
+    backend_name = "LLaVA (local)"
+
+    def __init__(
+        self,
+        model_name=DEFAULT_MODEL,
+        device="cpu",
+        num_frames=DEFAULT_NUM_FRAMES,
+        max_new_tokens=DEFAULT_MAX_NEW_TOKENS,
+        max_prompt_tokens=DEFAULT_MAX_PROMPT_TOKENS
+    ):
+        """
+        :param num_frames: Keyframes shown to the model with the single-prompt summary.
+        :param max_new_tokens: Upper bound on the generated tokens per call.
+        :param max_prompt_tokens: The text prompt is truncated to this many tokens.
+        """
+        self.model_name = model_name
+        self.device = device
+        self.num_frames = num_frames
+        self.max_new_tokens = max_new_tokens
+        self.max_prompt_tokens = max_prompt_tokens
+        self._call = threading.local()       # frames of the summary being generated on this thread
+        self._generate_lock = threading.Lock()
+
+    def generate_summary(self, transcription_path, frames_path, metadata_path, **kwargs):
+        frames_dir = os.path.join(os.path.dirname(frames_path), "video_frames")
+        images = keyframe_images(frames_dir, self.num_frames)
+        if not images:     # a post's images are its keyframes
+            images = keyframe_images(os.path.join(os.path.dirname(metadata_path), "post", "images"), self.num_frames)
+        if not images:
+            images = video_images(os.path.join(os.path.dirname(metadata_path), "video.mp4"), self.num_frames)
+        print(f"🖼️ Using {len(images)} frames for {self.backend_name}")
+        self._call.images = images
+        self._call.prompt = None
+        try:
+            return super().generate_summary(transcription_path, frames_path, metadata_path, **kwargs)
+        finally:
+            self._call.images = self._call.prompt = None
+
+    def _fit_budget(self, processor, text):
+        """`text` cut to max_prompt_tokens tokens."""
+        ids = processor.tokenizer(text, add_special_tokens=False).input_ids
+        if len(ids) <= self.max_prompt_tokens:
+            return text
+        print(f"⚠️ Prompt is {len(ids)} tokens, truncating to {self.max_prompt_tokens}")
+        return processor.tokenizer.decode(ids[:self.max_prompt_tokens]) + "\n[... truncated]"
+
+    def _generate(self, prompt):
+        """One LLaVA call. Only the single-prompt summary sees the frames; map/reduce calls are text-only."""
+        import torch
+        import numpy as np
+
+        processor, model = get_llava(self.model_name, self.device)
+        images = getattr(self._call, "images", None) if prompt is getattr(self._call, "prompt", None) else None
+
+        content = [{"type": "text", "text": self._fit_budget(processor, prompt)}]
+        if images:
+            content.insert(0, {"type": "video"})
+        chat = processor.apply_chat_template([{"role": "user", "content": content}], add_generation_prompt=True)
+        videos = [np.stack(images)] if images else None
+        inputs = processor(text=chat, videos=videos, return_tensors="pt").to(self.device)
+
+        with self._generate_lock, torch.no_grad():      # one model: calls from map/reduce threads take turns
+            generated_ids = model.generate(**inputs, max_new_tokens=self.max_new_tokens, do_sample=False)
+        new_tokens = generated_ids[0][inputs["input_ids"].shape[1]:]
+        return processor.decode(new_tokens, skip_special_tokens=True).strip()
+
+    def _build_prompt(self, metadata, transcript, frames_data):
+        prompt = f"""
+        You are an expert video analyst. You are given keyframes of an Instagram Reel and three
+        data streams decoded from it. Synthesize them into a detailed summary of the reel.
+
+        1. METADATA (Context, Caption, Hashtags):
+        {json.dumps(metadata, indent=2)}
+
+        2. AUDIO TRANSCRIPTION (Spoken words):
+        {transcript}
+
+        3. VISUAL ANALYSIS (Frame-by-frame details):
+        {format_frames(frames_data)}
+
+        ### INSTRUCTIONS:
+        - Describe what happens in the video, what is said, and the overall message.
+        - Match what is seen in the frames with what is said.
+        - Include specific visual details (objects, text on screen).
+        """
+        self._call.prompt = prompt      # _generate attaches the frames to this prompt only
+        return prompt
+
+
+# --- Main block for testing ---
+if __name__ == "__main__":
+    # Summarizes the artifacts of the last refinement run:
+    #   python -m summarization.llava_summarizer
+    summary = ReelSummarizer().generate_summary(
+        "./artifacts/transcription.txt",
+        "./artifacts/refined_frames.jsonl",
+        "./ingestion/metadata.json"
+    )
+    print("\n--- 📝 GENERATED SUMMARY ---")
+    print(summary)
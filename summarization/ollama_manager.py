@@ -1,25 +1,67 @@
 import subprocess
+import threading
 import time
 import requests
+from requests.adapters import HTTPAdapter
 import sys
 import os
 
 # Configuration
-OLLAMA_HOST = "http://localhost:11434"
-DEFAULT_MODEL = "gpt-oss:120b-cloud  .2:1b"  # Change to 'mistral', 'gemma', etc. as needed
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+DEFAULT_MODEL = os.getenv("OLLAMA_MODEL", "gpt-oss:120b-cloud")  # Change to 'mistral', 'gemma', etc. as needed
+DEFAULT_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")       # keep the model loaded across a batch of reels
 
-def is_server_running():
+CONNECT_TIMEOUT = 3     # seconds to establish a connection
+READ_TIMEOUT = 600      # seconds between streamed chunks (model load + first token)
+POOL_SIZE = 8           # parallel map-reduce calls share this many connections
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide pooled HTTP session so every call reuses keep-alive connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def is_server_running(host=OLLAMA_HOST):
     """Checks if the Ollama server is reachable."""
     try:
-        response = requests.get(OLLAMA_HOST)
+        response = get_session().get(host, timeout=CONNECT_TIMEOUT)
         return response.status_code == 200
-    except requests.exceptions.ConnectionError:
+    except requests.exceptions.RequestException:
         return False
 
-def start_ollama_serve():
+
+def wait_until_ready(host=OLLAMA_HOST, timeout=30.0, initial_delay=0.1, max_delay=2.0):
+    """
+    Poll the server with exponential backoff until it answers.
+    Returns True once ready, False if `timeout` seconds pass first.
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        if is_server_running(host):
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+
+
+def start_ollama_serve(host=OLLAMA_HOST, timeout=30.0):
     """Starts the Ollama server as a subprocess if not running."""
-    if is_server_running():
-        print(f"✅ Ollama is already running at {OLLAMA_HOST}")
+    if is_server_running(host):
+        print(f"✅ Ollama is already running at {host}")
         return
 
     print("⏳ Starting Ollama server...")
@@ -27,53 +69,76 @@ def start_ollama_serve():
         # Start ollama serve in a non-blocking way, redirecting output to prevent clutter
         # logic works for Linux/Mac/Windows if 'ollama' is in PATH
         subprocess.Popen(
-            ["ollama", "serve"], 
-            stdout=subprocess.DEVNULL, 
+            ["ollama", "serve"],
+            stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
             start_new_session=True # Detach from current process group
         )
-        
-        # Wait for the server to spin up
-        retries = 0
-        while not is_server_running():
-            time.sleep(1)
-            retries += 1
-            if retries > 10:
-                raise TimeoutError("Ollama server failed to start after 10 seconds.")
-        
-        print(f"✅ Ollama server started successfully at {OLLAMA_HOST}")
-
     except FileNotFoundError:
         print("❌ Error: 'ollama' command not found. Is Ollama installed?")
         sys.exit(1)
 
-def ensure_model_pulled(model_name=DEFAULT_MODEL):
+    # Wait for the server to spin up
+    if not wait_until_ready(host, timeout=timeout):
+        raise TimeoutError(f"Ollama server failed to start after {timeout:.0f} seconds.")
+
+    print(f"✅ Ollama server started successfully at {host}")
+
+
+def ensure_model_pulled(model_name=DEFAULT_MODEL, host=OLLAMA_HOST):
     """Checks if the requested model exists; pulls it if missing."""
-    import ollama
-    
+    session = get_session()
     try:
-        # List available models
-        models_info = ollama.list()
-        # Handle difference in return structure between versions
-        existing_models = [m['name'] for m in models_info.get('models', [])]
-        
-        # Check for exact match or match with tag (e.g. gpt-oss:120b-cloud  :latest)
-        if not any(model_name in m for m in existing_models):
+        response = session.get(f"{host}/api/tags", timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        response.raise_for_status()
+        existing_models = {
+            name
+            for m in response.json().get("models", [])
+            for name in (m.get("name"), m.get("model"))
+            if name
+        }
+
+        # Check for exact match or match with the implicit ':latest' tag
+        if model_name not in existing_models and f"{model_name}:latest" not in existing_models:
             print(f"⬇️ Model '{model_name}' not found locally. Pulling now (this may take a while)...")
-            ollama.pull(model_name)
+            pull = session.post(
+                f"{host}/api/pull",
+                json={"model": model_name, "stream": False},
+                timeout=(CONNECT_TIMEOUT, None)
+            )
+            pull.raise_for_status()
             print(f"✅ Model '{model_name}' downloaded.")
         else:
             print(f"✅ Model '{model_name}' is ready.")
-            
+
     except Exception as e:
         print(f"❌ Failed to check/pull model: {e}")
 
-def initialize_ollama(model_name=DEFAULT_MODEL):
+
+def load_model(model_name=DEFAULT_MODEL, keep_alive=DEFAULT_KEEP_ALIVE, host=OLLAMA_HOST):
+    """
+    Load the model into memory and keep it resident for `keep_alive`
+    (an empty generate request only loads the model). Use keep_alive=0 to unload.
+    """
+    response = get_session().post(
+        f"{host}/api/generate",
+        json={"model": model_name, "keep_alive": keep_alive},
+        timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+    )
+    response.raise_for_status()
+
+
+def initialize_ollama(model_name=DEFAULT_MODEL, keep_alive=DEFAULT_KEEP_ALIVE, host=OLLAMA_HOST):
     """Master function to prepare the environment."""
-    start_ollama_serve()
-    ensure_model_pulled(model_name)
+    start_ollama_serve(host)
+    ensure_model_pulled(model_name, host)
+    try:
+        load_model(model_name, keep_alive, host)
+        print(f"✅ Model '{model_name}' loaded (keep_alive={keep_alive}).")
+    except requests.exceptions.RequestException as e:
+        print(f"⚠️ Warning: Could not preload model: {e}")
     return model_name
 
 if __name__ == "__main__":
     # Test the initialization independently
-    initialize_ollama()
\ No newline at end of file
+    initialize_ollama()
@@ -0,0 +1,106 @@
+"""
+Minimal local stand-in for the Ollama HTTP API.
+
+Implements just enough of `/`, `/api/tags`, `/api/pull`, `/api/generate` and a
+streaming `/api/chat` to exercise the Ollama backend without a real server or
+model. It counts accepted TCP connections so connection pooling can be checked.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, so pooled connections are reused
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        payload = json.loads(body) if body else {}
+        self.server.requests.append((self.command, self.path, payload))
+        return payload
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, payload):
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/":
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/api/tags":
+            self._send_json({"models": [{"name": m, "model": m} for m in sorted(self.server.models)]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        payload = self._read_json()
+        if self.path == "/api/pull":
+            self.server.models.add(payload.get("model"))
+            self._send_json({"status": "success"})
+        elif self.path == "/api/generate":
+            self.server.keep_alive[payload.get("model")] = payload.get("keep_alive")
+            self._send_json({"model": payload.get("model"), "response": "", "done": True})
+        elif self.path == "/api/chat":
+            self.server.keep_alive[payload.get("model")] = payload.get("keep_alive")
+            prompt = payload["messages"][-1]["content"]
+            tokens = self.server.reply(prompt).split(" ")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i, token in enumerate(tokens):
+                text = token if i == 0 else " " + token
+                self._send_chunk({"model": payload.get("model"), "message": {"role": "assistant", "content": text}, "done": False})
+            self._send_chunk({"model": payload.get("model"), "message": {"role": "assistant", "content": ""}, "done": True})
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+
+class StubOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, models=(), reply=None, port=0):
+        super().__init__(("127.0.0.1", port), _StubHandler)
+        self.models = set(models)
+        self.reply = reply or (lambda prompt: f"Stub summary of a {len(prompt)} character prompt.")
+        self.requests = []
+        self.keep_alive = {}
+        self.connections = 0
+        self._thread = None
+
+    @property
+    def host(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -1,47 +1,105 @@
-import os
+import sys
 import json
-import ollama
-from ollama_manager import initialize_ollama 
+import threading
+from .base import BaseReelSummarizer
+from .hierarchical import format_frames
+from .ollama_manager import (
+    CONNECT_TIMEOUT,
+    DEFAULT_KEEP_ALIVE,
+    DEFAULT_MODEL,
+    OLLAMA_HOST,
+    READ_TIMEOUT,
+    get_session,
+    initialize_ollama,
+    load_model,
+)
 # NOTE: If running this file directly as __main__, remove the '.' before ollama_manager import
 # or run as a module: python -m your_package.reel_summarizer
 
-class ReelSummarizer:
-    def __init__(self, model_name="gpt-oss:120b-cloud  "):
-        self.model_name = initialize_ollama(model_name)
-
-    def _read_text(self, path):
-        if not os.path.exists(path):
-            return "No transcription available."
-        with open(path, 'r', encoding='utf-8') as f:
-            return f.read()
-
-    def _read_json(self, path):
-        if not os.path.exists(path):
-            return {}
-        with open(path, 'r', encoding='utf-8') as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return {"error": "File corrupted"}
-
-    def generate_detailed_summary(self, transcription_path, frames_path, metadata_path):
+
+def _echo_token(token):
+    """Stream tokens to the console, but only for calls made on the main thread
+    (parallel map-reduce window calls would interleave)."""
+    if threading.current_thread() is threading.main_thread():
+        sys.stdout.write(token)
+        sys.stdout.flush()
+
+
+class ReelSummarizer(BaseReelSummarizer):
+    """
+    Local LLM backend. Same interface as the Gemini `ReelSummarizer`.
+
+    All calls share one pooled HTTP session, responses are streamed token by
+    token, and every request carries `keep_alive` so the model stays loaded
+    across a batch of reels. Call `release()` to unload it afterwards.
+    """
+
+    backend_name = "Ollama"
+
+    def __init__(
+        self,
+        model_name=DEFAULT_MODEL,
+        host=OLLAMA_HOST,
+        keep_alive=DEFAULT_KEEP_ALIVE,
+        options=None,
+        on_token=_echo_token
+    ):
         """
-        Ingests processed reel data and generates a detailed summary using Ollama.
+        :param keep_alive: How long Ollama keeps the model loaded after a request ('30m', -1 = forever).
+        :param options: Ollama model options, e.g. {'temperature': 0.7, 'num_ctx': 8192}.
+        :param on_token: Called with each streamed token (None to disable).
         """
-        # 1. Load Data
-        transcript = self._read_text(transcription_path)
-        frames_data = self._read_json(frames_path)
-        metadata = self._read_json(metadata_path)
+        self.host = host
+        self.keep_alive = keep_alive
+        self.options = options or {}
+        self.on_token = on_token
+        self.session = get_session()
+        self.model_name = initialize_ollama(model_name, keep_alive, host)
+
+    def _generate(self, prompt):
+        """Streamed Ollama chat call; used directly and as the map/reduce step."""
+        payload = {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": True,
+            "keep_alive": self.keep_alive,
+        }
+        if self.options:
+            payload["options"] = self.options
 
-        # 2. Construct the Prompt
-        # We explicitly label the data sources to help the model distinguish 
+        parts = []
+        with self.session.post(
+            f"{self.host}/api/chat",
+            json=payload,
+            stream=True,
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                token = chunk.get("message", {}).get("content", "")
+                if token:
+                    parts.append(token)
+                    if self.on_token:
+                        self.on_token(token)
+
+        if self.on_token is _echo_token and threading.current_thread() is threading.main_thread():
+            print()
+        return "".join(parts)
+
+    def _build_prompt(self, metadata, transcript, frames_data):
+        # We explicitly label the data sources to help the model distinguish
         # between what was 'heard' (audio) and what was 'seen' (frames).
-        prompt = f"""
-        You are an expert video content analyst. I have decoded an Instagram Reel into three raw data streams. 
+        return f"""
+        You are an expert video content analyst. I have decoded an Instagram Reel into three raw data streams.
         Your task is to synthesize these streams into a single, highly detailed summary of the video.
 
         ### DATA STREAMS:
-        
+
         1. METADATA (Context, Caption, Hashtags):
         {json.dumps(metadata, indent=2)}
 
@@ -49,76 +107,74 @@ class ReelSummarizer:
         {transcript}
 
         3. VISUAL ANALYSIS (Frame-by-frame details):
-        {json.dumps(frames_data, indent=2)}
+        {format_frames(frames_data)}
 
         ### INSTRUCTIONS:
         - Analyze the correlation between the visual events and the spoken audio.
         - Capture the "vibe" and intent of the video based on the metadata.
         - Provide a comprehensive summary that describes exactly what happens in the video, what is said, and the overall message.
         - Do not leave out small details found in the visual analysis.
-        
+
         ### OUTPUT:
         Provide the response in a structured, very detailed narrative format.
         """
 
-        # 3. Call Ollama
-        try:
-            print("🧠 Generating summary... (this depends on your GPU/CPU speed)")
-            response = ollama.chat(model=self.model_name, messages=[
-                {
-                    'role': 'user',
-                    'content': prompt,
-                },
-            ])
-            
-            return response['message']['content']
-
-        except Exception as e:
-            return f"Error during generation: {str(e)}"
+    def generate_detailed_summary(self, transcription_path, frames_path, metadata_path, **kwargs):
+        """Kept for older callers; same as `generate_summary`."""
+        return self.generate_summary(transcription_path, frames_path, metadata_path, **kwargs)
+
+    def release(self):
+        """Unload the model now instead of waiting for keep_alive to expire."""
+        load_model(self.model_name, keep_alive=0, host=self.host)
 
 # --- Main block for testing ---
 if __name__ == "__main__":
-    # Mock data generation for testing purposes
-    # In production, you would point these to your actual file paths
-    
+    # Runs against a local stub of the Ollama API, no real server or model needed:
+    #   python -m summarization.reel_summarizer
+    # The regression check is tests/test_summarizer_session.py.
+    import os
+    import tempfile
+    from .ollama_stub import StubOllamaServer
+
+    stub = StubOllamaServer().start()
+    tmp = tempfile.mkdtemp()
+
     # 1. Create dummy files
-    with open("dummy_transcription.txt", "w") as f:
+    transcription_path = os.path.join(tmp, "transcription.txt")
+    frames_path = os.path.join(tmp, "refined_frames.json")
+    metadata_path = os.path.join(tmp, "metadata.json")
+
+    with open(transcription_path, "w") as f:
         f.write("Hey guys, today I'm showing you how to build a custom keyboard. First, lube the switches.")
-    
-    with open("dummy_frames.json", "w") as f:
+
+    with open(os.path.join(tmp, "transcription_segments.json"), "w") as f:
+        json.dump([
+            {"start": 0.0, "end": 4.0, "text": "Hey guys, today I'm showing you how to build a custom keyboard."},
+            {"start": 40.0, "end": 44.0, "text": "First, lube the switches."}
+        ], f)
+
+    with open(frames_path, "w") as f:
         json.dump([
-            {"timestamp": "00:01", "description": "Person holding a mechanical switch"},
-            {"timestamp": "00:05", "description": "Close up of applying lube with a brush"},
-            {"timestamp": "00:10", "description": "Assembling the keycaps onto the board"}
+            {"timestamp": "00:01", "caption": "Person holding a mechanical switch"},
+            {"timestamp": "00:41", "caption": "Close up of applying lube with a brush"},
+            {"timestamp": "01:10", "caption": "Assembling the keycaps onto the board"}
         ], f)
-        
-    with open("dummy_metadata.json", "w") as f:
+
+    with open(metadata_path, "w") as f:
         json.dump({
             "caption": "Thocky goodness! #mechanicalkeyboard #tech",
-            "author": "TechUser123"
+            "Creator": "TechUser123"
         }, f)
 
     # 2. Initialize and Run
-    # Note: We change the import for local testing if files are in the same dir
-    try:
-        from ollama_manager import initialize_ollama
-    except ImportError:
-        pass # Assuming the class handles import or file structure is different
-
-    summarizer = ReelSummarizer(model_name="gpt-oss:120b-cloud  ")
-    
+    summarizer = ReelSummarizer(model_name="stub-model", host=stub.host, keep_alive="10m")
+    summarizer.storage_dir = tmp
+
     print("\n--- TEST RUN START ---")
-    summary = summarizer.generate_detailed_summary(
-        "./artifacts/transction.txt", 
-        "./artifacts/refined_frames.json", 
-        "./ingestion/metadata.json"
-    )
-    
+    summary = summarizer.generate_summary(transcription_path, frames_path, metadata_path, mode="hierarchical")
+    summarizer.release()
+
     print("\n--- FINAL SUMMARY ---")
     print(summary)
-
-    # Cleanup dummy files
-    import os
-    os.remove("dummy_transcription.txt")
-    os.remove("dummy_frames.json")
-    os.remove("dummy_metadata.json")
\ No newline at end of file
+    print(f"({len(stub.requests)} requests over {stub.connections} connections)")
+    stub.stop()
@@ -0,0 +1,62 @@
+"""
+The Ollama backend against a local stub of the Ollama API (no real server or model):
+every call streams over the shared pooled session with keep_alive, and the
+model is unloaded by release().
+
+    python -m pytest tests
+"""
+
+import json
+
+import pytest
+
+from summarization.ollama_stub import StubOllamaServer
+from summarization.reel_summarizer import ReelSummarizer
+
+
+@pytest.fixture
+def stub():
+    server = StubOllamaServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def reel(tmp_path):
+    transcription_path = tmp_path / "transcription.txt"
+    frames_path = tmp_path / "refined_frames.json"
+    metadata_path = tmp_path / "metadata.json"
+
+    transcription_path.write_text(
+        "Hey guys, today I'm showing you how to build a custom keyboard. First, lube the switches.")
+    (tmp_path / "transcription_segments.json").write_text(json.dumps([
+        {"start": 0.0, "end": 4.0, "text": "Hey guys, today I'm showing you how to build a custom keyboard."},
+        {"start": 40.0, "end": 44.0, "text": "First, lube the switches."}
+    ]))
+    frames_path.write_text(json.dumps([
+        {"timestamp": "00:01", "caption": "Person holding a mechanical switch"},
+        {"timestamp": "00:41", "caption": "Close up of applying lube with a brush"},
+        {"timestamp": "01:10", "caption": "Assembling the keycaps onto the board"}
+    ]))
+    metadata_path.write_text(json.dumps({
+        "caption": "Thocky goodness! #mechanicalkeyboard #tech",
+        "Creator": "TechUser123"
+    }))
+    return str(transcription_path), str(frames_path), str(metadata_path)
+
+
+def test_calls_reuse_pooled_connections(stub, reel, tmp_path):
+    summarizer = ReelSummarizer(model_name="stub-model", host=stub.host, keep_alive="10m", on_token=None)
+    summarizer.storage_dir = str(tmp_path)
+
+    single = summarizer.generate_summary(*reel)
+    hierarchical = summarizer.generate_summary(*reel, mode="hierarchical")
+    summarizer.release()
+
+    chats = [r for r in stub.requests if r[1] == "/api/chat"]
+    assert single.startswith("Stub summary"), single
+    assert hierarchical.startswith("Stub summary"), hierarchical
+    assert len(chats) == 1 + 3 + 1, len(chats)      # single + 3 windows + reduce
+    assert all(r[2]["keep_alive"] == "10m" and r[2]["stream"] for r in chats)
+    assert stub.keep_alive["stub-model"] == 0        # released at the end
+    assert stub.connections < len(stub.requests), "HTTP connections were not reused"
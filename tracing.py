@@ -0,0 +1,211 @@
+"""
+Per-stage tracing for the pipeline.
+
+    from tracing import span
+
+    with span("transcription", model="base"):
+        ...
+
+Spans nest per thread. Each finished span records wall time, CPU time and the
+process's peak RSS, and is appended to a JSON-lines file for the run
+(artifacts/traces/run_<timestamp>.jsonl) when a run has been started with
+`start_run()`. `print_summary()` prints a table aggregated by span path, so a
+regression shows up as one stage's row getting slower between runs.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_TRACE_DIR = "artifacts/traces"
+
+_local = threading.local()
+_lock = threading.Lock()
+_run = {"id": None, "path": None, "file": None, "start": time.perf_counter(), "records": [], "keep": True}
+
+
+def _peak_rss_mb():
+    """High-water mark of this process's resident memory, in MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def start_run(trace_dir=DEFAULT_TRACE_DIR, run_id=None, keep_records=True):
+    """
+    Begin a new trace run; spans from now on go to <trace_dir>/run_<id>.jsonl.
+    Long-running processes pass keep_records=False so spans are only written to
+    the file, not also kept in memory.
+    """
+    end_run()
+    run_id = run_id or time.strftime("%Y%m%d_%H%M%S") + f"_{uuid.uuid4().hex[:6]}"
+    os.makedirs(trace_dir, exist_ok=True)
+    path = os.path.join(trace_dir, f"run_{run_id}.jsonl")
+    with _lock:
+        _run.update(id=run_id, path=path, file=open(path, "a", encoding="utf-8"),
+                    start=time.perf_counter(), records=[], keep=keep_records)
+    return path
+
+
+def end_run():
+    """Close the current trace file (spans keep being collected in memory)."""
+    with _lock:
+        if _run["file"] is not None:
+            _run["file"].close()
+            _run["file"] = None
+
+
+def _emit(record):
+    with _lock:
+        if _run["keep"]:
+            _run["records"].append(record)
+        if _run["file"] is not None:
+            _run["file"].write(json.dumps(record) + "\n")
+            _run["file"].flush()
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time a block of code as a (nested) span. Extra keyword args are stored with
+    it; more can be added inside the block via the yielded span's "attrs".
+    """
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    span_id = uuid.uuid4().hex[:12]
+    path = f"{parent['path']}/{name}" if parent else name
+    current = {"id": span_id, "path": path, "attrs": dict(attrs)}
+    stack.append(current)
+
+    peak_before = _peak_rss_mb()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        peak_after = _peak_rss_mb()
+        stack.pop()
+
+        record = {
+            "run": _run["id"],
+            "id": span_id,
+            "parent": parent["id"] if parent else None,
+            "name": name,
+            "path": path,
+            "depth": len(stack),
+            "thread": threading.current_thread().name,
+            "start_s": round(wall_start - _run["start"], 6),
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "peak_rss_mb": peak_after,
+            "peak_rss_growth_mb": (
+                round(peak_after - peak_before, 1) if peak_after is not None else None
+            ),
+        }
+        if current["attrs"]:
+            record["attrs"] = current["attrs"]
+        if error:
+            record["error"] = error
+        _emit(record)
+
+
+def annotate(**attrs):
+    """Attach attrs to the innermost open span of this thread (no-op outside spans)."""
+    stack = _stack()
+    if stack:
+        stack[-1]["attrs"].update(attrs)
+
+
+def traced(name=None):
+    """Decorator form of `span`."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def load_trace(path):
+    """Read the span records of a trace file."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(records=None):
+    """Aggregate span records by path, ordered as a tree by first start time."""
+    records = _run["records"] if records is None else records
+    rows = {}
+    first_start = {}
+    for r in records:
+        first_start[r["path"]] = min(first_start.get(r["path"], r["start_s"]), r["start_s"])
+        row = rows.setdefault(r["path"], {
+            "path": r["path"], "depth": r["depth"], "count": 0,
+            "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mb": None, "errors": 0
+        })
+        row["count"] += 1
+        row["wall_s"] += r["wall_s"]
+        row["cpu_s"] += r["cpu_s"]
+        if r.get("peak_rss_mb") is not None:
+            row["peak_rss_mb"] = max(row["peak_rss_mb"] or 0, r["peak_rss_mb"])
+        if r.get("error"):
+            row["errors"] += 1
+
+    def tree_key(row):
+        # Parents are written after their children; sort each level by when it started
+        parts = row["path"].split("/")
+        prefixes = ["/".join(parts[:i + 1]) for i in range(len(parts))]
+        return [first_start.get(p, 0.0) for p in prefixes]
+
+    return sorted(rows.values(), key=tree_key)
+
+
+def print_summary(records=None):
+    """Print a per-stage timing table for the run."""
+    rows = summarize(records)
+    if not rows:
+        return
+    print("\n----- Trace Summary -----")
+    print(f"{'stage':<44} {'calls':>5} {'wall s':>9} {'cpu s':>9} {'peak MB':>9}")
+    for row in rows:
+        label = "  " * row["depth"] + row["path"].rsplit("/", 1)[-1]
+        if row["errors"]:
+            label += f" ({row['errors']} failed)"
+        peak = f"{row['peak_rss_mb']:.0f}" if row["peak_rss_mb"] is not None else "-"
+        print(f"{label:<44} {row['count']:>5} {row['wall_s']:>9.2f} {row['cpu_s']:>9.2f} {peak:>9}")
+    if records is None and _run["path"]:
+        print(f"Trace written to {_run['path']}")
+
+
+if __name__ == "__main__":
+    # Print the summary table of an existing trace file:
+    #   python tracing.py artifacts/traces/run_<id>.jsonl
+    if len(sys.argv) != 2:
+        print("Usage: python tracing.py <trace.jsonl>")
+        sys.exit(1)
+    print_summary(load_trace(sys.argv[1]))